@@ -1,6 +1,9 @@
+import argparse
+import logging
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+from visualizations import load_pyplot, show_or_save
+
+logger = logging.getLogger(__name__)
 
 def load_and_clean_data(file_path):
     """
@@ -19,7 +22,7 @@ def load_and_clean_data(file_path):
 
     df = df.dropna(subset=["Date"])
 
-    print(f"Loaded data from {file_path}")
+    logger.info("Loaded data from %s", file_path)
 
     # Drop rows where Date or Price are missing
     df = df.dropna(subset=["Date", "Price"])
@@ -30,12 +33,15 @@ def load_and_clean_data(file_path):
     # Select only the 'Close' column
     df = df[['Close']].rename(columns={"Close": "Price"})
 
-    print(f"Cleaned data: {len(df)} rows remaining")
+    logger.info("Cleaned data: %d rows remaining", len(df))
     return df
 
-def analyze_data():
+def analyze_data(plot=True, save_path=None):
     """
     Load, clean, and visualize the gold and silver price data.
+
+    plot=False skips the chart. With save_path the chart is drawn headless
+    (Agg backend) and written to that file instead of opening a window.
     """
 
     # Load and clean data
@@ -44,8 +50,8 @@ def analyze_data():
 
     # Combine the two datasets based on Date
     combined_data = gold_data.join(silver_data, how='inner', lsuffix="_gold", rsuffix="_silver")
-    print("Combined data:")
-    print(combined_data.head())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Combined data:\n%s", combined_data.head())
 
     # Calculate daily returns for both assets
     combined_data['Gold Returns'] = combined_data['Price_gold'].pct_change()
@@ -56,7 +62,19 @@ def analyze_data():
 
     # Save cleaned and processed data to new CSV
     combined_data.to_csv("data/processed_data.csv")
-    print("Processed data saved to data/processed_data.csv")
+    logger.info("Processed data saved to data/processed_data.csv")
+
+    if plot:
+        plot_prices(combined_data, save_path=save_path)
+    return combined_data
+
+
+def plot_prices(combined_data, save_path=None):
+    """
+    Plot gold and silver prices on twin y-axes.
+    """
+    plt = load_pyplot(headless=save_path is not None)
+    import matplotlib.dates as mdates
 
     # Visualize the price trends with a secondary y-axis
     fig, ax1 = plt.subplots(figsize=(10, 6))
@@ -80,8 +98,16 @@ def analyze_data():
     # Title and legend
     fig.suptitle("Gold vs Silver Prices")
     fig.tight_layout()
-    plt.show()
+    show_or_save(fig, save_path)
 
 
 if __name__ == "__main__":
-    analyze_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Combine the gold and silver prices and plot them.")
+    parser.add_argument("--no-plot", action="store_true", help="skip the chart")
+    parser.add_argument("--save-plot", metavar="PATH", help="write the chart to PATH without opening a window")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="DEBUG adds a preview of the combined frame (default: INFO)")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format="%(message)s")
+
+    analyze_data(plot=not args.no_plot, save_path=args.save_plot)
\ No newline at end of file
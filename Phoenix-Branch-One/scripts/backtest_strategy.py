@@ -1,9 +1,7 @@
+import argparse
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.stattools import adfuller
-import yfinance as yf
-import matplotlib.pyplot as plt
-from visualizations import plot_results
+from performance import compute_metrics, per_bar_rates
 
 def calculate_spread(df):
     """
@@ -16,12 +14,12 @@ def calculate_spread(df):
     return df
 
 
-def calculate_zscore(df):
+def calculate_zscore(df, window=30):
     """
     Calculate the Z-score of the spread using a rolling mean and std dev.
     """
-    df['Spread_Mean'] = df['Spread'].rolling(window=30).mean()
-    df['Spread_Std'] = df['Spread'].rolling(window=30).std()
+    df['Spread_Mean'] = df['Spread'].rolling(window=window).mean()
+    df['Spread_Std'] = df['Spread'].rolling(window=window).std()
     df['Z_Score'] = (df['Spread'] - df['Spread_Mean']) / df['Spread_Std']
     
     return df
@@ -30,14 +28,19 @@ def calculate_zscore(df):
 def engle_granger_test(df):
     """
     Perform the Engle-Granger test to check for cointegration.
+
+    The ADF test comes from fast_coint.adf_batch, which gives the same
+    statistic, p-value and critical values as statsmodels' adfuller.
     """
+    from statarb_common.fast_coint import adf_batch
+
     # Run the Augmented Dickey-Fuller test on the spread
-    result = adfuller(df['Spread'].dropna())  # Drop NaN values before testing, "result" is a tuple btw
+    result = adf_batch(df['Spread'].dropna().to_numpy())  # Drop NaN values before testing
 
     # Extract results
-    test_statistic = result[0]
-    p_value = result[1]
-    critical_values = result[4]
+    test_statistic = result.statistic[0]
+    p_value = result.pvalue[0]
+    critical_values = dict(zip(["1%", "5%", "10%"], result.critical_values[0]))
 
     print("Engle-Granger Test (ADF on Spread):")
     print(f"Test Statistic: {test_statistic:.4f}")
@@ -53,35 +56,105 @@ def engle_granger_test(df):
         print("Result: The spread is not stationary, indicating the pairs may not be cointegrated.")
 
 
-def backtest_strategy(df, z_entry, z_exit):
+def compute_positions(z_score, z_entry, z_exit):
     """
-    Backtest the mean reversion strategy based on Z-score thresholds.
-    """
-    df['Position'] = 0  # initialize position
+    Run the entry/hold/exit hysteresis over an array of Z-scores.
 
-    for i in range(1, len(df)):
-        prev_position = df['Position'].iloc[i-1]
-        z_score = df['Z_Score'].iloc[i]
-        
-        if prev_position == 0:  # No position, check for new entry
+    Returns an int64 array of positions (1 long, -1 short, 0 flat). The first
+    bar is always flat. When z_exit <= z_entry the entry and exit bands can't
+    overlap, so positions are built as a forward-fill of exit and first-entry
+    events; otherwise we fall back to a single pass over the array.
+    """
+    z = np.asarray(z_score, dtype=np.float64)
+    n = len(z)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if z_exit > z_entry:
+        return _compute_positions_loop(z, z_entry, z_exit)
+
+    # NaN compares False everywhere, so a NaN bar neither enters nor exits
+    exits = (z < z_exit) & (z > -z_exit)
+    exits[0] = True  # start flat
+    entries = np.zeros(n, dtype=np.int64)
+    entries[z > z_entry] = -1  # Short, sell gold buy silver
+    entries[z < -z_entry] = 1  # Long, buy gold sell silver
+    entries[0] = 0
+
+    # Only the first entry after an exit opens a position; later entry signals
+    # while already in a trade are ignored until the next exit
+    event_idx = np.flatnonzero(exits | (entries != 0))
+    event_is_exit = exits[event_idx]
+    prev_is_exit = np.empty(len(event_idx), dtype=bool)
+    prev_is_exit[0] = True
+    prev_is_exit[1:] = event_is_exit[:-1]
+    opens = event_idx[~event_is_exit & prev_is_exit]
+    closes = event_idx[event_is_exit]
+
+    # Forward-fill the value of the most recent open/close event
+    marks = np.zeros(n, dtype=np.int64)
+    marks[closes] = 0
+    marks[opens] = entries[opens]
+    last_event = np.full(n, -1, dtype=np.int64)
+    last_event[closes] = closes
+    last_event[opens] = opens
+    np.maximum.accumulate(last_event, out=last_event)
+    return marks[last_event]
+
+
+def _compute_positions_loop(z, z_entry, z_exit):
+    """
+    Reference single pass over the Z-score array, used when the entry and
+    exit bands overlap.
+    """
+    positions = np.zeros(len(z), dtype=np.int64)
+    position = 0
+    for i in range(1, len(z)):
+        z_score = z[i]
+        if position == 0:
             if z_score > z_entry:
-                df['Position'].iloc[i] = -1 # Short, sell gold buy silver
+                position = -1
             elif z_score < -z_entry:
-                df['Position'].iloc[i] = 1 # Long, buy gold sell silver
-            else:
-                df['Position'].iloc[i] = 0
-        
-        elif prev_position == 1:  # Long position
-            if z_score < z_exit and z_score > -z_exit:  # Exit long
-                df['Position'].iloc[i] = 0
-            else:  # Maintain long
-                df['Position'].iloc[i] = 1
-        
-        elif prev_position == -1:  # Short position
-            if z_score < z_exit and z_score > -z_exit:  # Exit short
-                df['Position'].iloc[i] = 0
-            else:  # Maintain short
-                df['Position'].iloc[i] = -1
+                position = 1
+        elif z_score < z_exit and z_score > -z_exit:
+            position = 0
+        positions[i] = position
+    return positions
+
+
+def compute_positions_batch(z_score, z_entry, z_exit):
+    """
+    Run the hysteresis for many rows at once.
+
+    z_score is either one series shared by every row or a (rows, bars) array
+    with a series per row (e.g. one per pair); z_entry and z_exit are scalars
+    or one threshold per row. Returns an int8 array of shape (rows, bars).
+    The loop walks the bars once and updates the state of every row together.
+    """
+    z = np.asarray(z_score, dtype=np.float64)
+    z_entry = np.asarray(z_entry, dtype=np.float64)
+    z_exit = np.asarray(z_exit, dtype=np.float64)
+    rows = max(z.shape[0] if z.ndim == 2 else 1, z_entry.size, z_exit.size)
+    z = np.broadcast_to(z, (rows, z.shape[-1]))
+
+    positions = np.zeros(z.shape, dtype=np.int8)
+    position = np.zeros(rows, dtype=np.int8)
+    for i in range(1, z.shape[1]):
+        # NaN compares False everywhere, so a NaN bar neither enters nor exits
+        z_score = z[:, i]
+        flat = position == 0
+        exiting = ~flat & (z_score < z_exit) & (z_score > -z_exit)
+        position[flat & (z_score > z_entry)] = -1
+        position[flat & (z_score < -z_entry)] = 1
+        position[exiting] = 0
+        positions[:, i] = position
+    return positions
+
+
+def backtest_strategy(df, z_entry, z_exit):
+    """
+    Backtest the mean reversion strategy based on Z-score thresholds.
+    """
+    df['Position'] = compute_positions(df['Z_Score'].to_numpy(), z_entry, z_exit)
 
     # Calculate strategy returns
     df['Strategy_Return'] = df['Position'].shift(1) * df['Spread']
@@ -92,35 +165,52 @@ def backtest_strategy(df, z_entry, z_exit):
     return df
 
 
-def calculate_performance_metrics(df):
+def get_risk_free_rate():
     """
-    Calculate performance metrics for the strategy.
+    Get the latest 10-year US Treasury yield (risk free rate) to calculate Sharpe.
+    Comes from the local cache in risk_free_rate.py; the network is only used
+    when the cache is older than a day.
     """
-    cumulative_return = df['Cumulative_Return'].iloc[-1]
-    days_held = df['Strategy_Return'].count()
-    annualized_return = (1 + cumulative_return) ** (252 / days_held) - 1
-    annualized_volatility = df['Strategy_Return'].std() * np.sqrt(252)
-    max_drawdown = (((1 + df['Strategy_Return']).cumprod() - (1 + df['Strategy_Return']).cumprod().cummax()) /
-                (1 + df['Strategy_Return']).cumprod().cummax()).min()
+    from risk_free_rate import default_provider
+
+    return default_provider().latest()
 
+
+def calculate_performance_metrics(df, risk_free_rate=None):
     """
-    Get the latest 10-year US Treasury yield (risk free rate) from Yahoo Finance to calculate Sharpe.
+    Calculate performance metrics for the strategy.
+
+    risk_free_rate is an annual rate, or a per-bar series of annual rates
+    (e.g. RiskFreeRate.series(df.index)), in which case each bar's rate is
+    taken out of that bar's return (see performance.compute_metrics).
+    Defaults to the latest rate.
+    Returns a performance.PerformanceMetrics.
     """
-    ticker = "^TNX"  # Yahoo Finance ticker for 10-Year Treasury Yield
-    data = yf.download(ticker, period="1d", interval="1d")
-    # Convert yield from percentage to decimal
-    risk_free_rate = (data['Close'] / 100).values[0].item()
-    sharpe_ratio = (annualized_return - risk_free_rate) / annualized_volatility
+    if risk_free_rate is None:
+        risk_free_rate = get_risk_free_rate()
+    risk_free_rate = per_bar_rates(risk_free_rate, df.index)
+
+    metrics = compute_metrics(df['Strategy_Return'].to_numpy(), df['Position'].to_numpy(), risk_free_rate)
 
     print("Performance Metrics:")
-    print(f"Cumulative Return: {cumulative_return:.4%}")
-    print(f"Annualized Return: {annualized_return:.4%}")
-    print(f"Annualized Volatility: {annualized_volatility:.2%}")
-    print(f"Max Drawdown: {max_drawdown:.2%}")
-    print(f"Sharpe Ratio: {sharpe_ratio:.4f}")
+    print(f"Cumulative Return: {metrics.cumulative_return:.4%}")
+    print(f"Annualized Return: {metrics.annualized_return:.4%}")
+    print(f"Annualized Volatility: {metrics.annualized_volatility:.2%}")
+    print(f"Max Drawdown: {metrics.max_drawdown:.2%} ({metrics.max_drawdown_duration} bars)")
+    print(f"Sharpe Ratio: {metrics.sharpe_ratio:.4f}")
+    print(f"Sortino Ratio: {metrics.sortino_ratio:.4f}")
+    print(f"Hit Rate: {metrics.hit_rate:.2%}")
+    print(f"Turnover: {metrics.turnover:.2f} per year")
+
+    return metrics
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the gold/silver mean reversion strategy.")
+    parser.add_argument("--no-plot", action="store_true", help="skip the results chart")
+    parser.add_argument("--save-plot", metavar="PATH", help="write the chart to PATH without opening a window")
+    args = parser.parse_args()
+
     # Load the cleaned and combined data
     df = pd.read_csv("data/processed_data.csv", index_col="Date", parse_dates=True)
 
@@ -138,5 +228,7 @@ if __name__ == "__main__":
     calculate_performance_metrics(df)
 
     # Plot the results
-    plot_results(df) #the actual plot_results function is in the visualizations.py script
+    if not args.no_plot:
+        from visualizations import plot_results  # the actual plot_results function is in the visualizations.py script
+        plot_results(df, save_path=args.save_plot)
 
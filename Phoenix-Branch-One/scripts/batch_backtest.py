@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from backtest_strategy import compute_positions_batch, get_risk_free_rate
+from parameter_sweep import batch_performance_metrics
+from performance import per_bar_rates
+
+
+def batch_spread(prices_a, prices_b):
+    """
+    calculate_spread for many pairs: the difference of the two legs' simple
+    returns, row by row. The first column is NaN like pct_change().
+    """
+    spread = np.full(prices_a.shape, np.nan)
+    spread[:, 1:] = (prices_a[:, 1:] / prices_a[:, :-1] - 1) - (prices_b[:, 1:] / prices_b[:, :-1] - 1)
+    return spread
+
+
+def batch_zscore(spread, window=30):
+    """
+    calculate_zscore for many pairs: rolling mean and sample std dev of each
+    row over the last `window` bars, from differences of cumulative sums.
+    Windows containing a NaN give NaN, as with pandas rolling().
+    """
+    rows, bars = spread.shape
+    z = np.full(spread.shape, np.nan)
+    if bars < window:
+        return z
+
+    missing = np.isnan(spread)
+    values = np.where(missing, 0.0, spread)
+    zeros = np.zeros((rows, 1))
+    sums = np.concatenate((zeros, np.cumsum(values, axis=1)), axis=1)
+    squares = np.concatenate((zeros, np.cumsum(values * values, axis=1)), axis=1)
+    gaps = np.concatenate((zeros, np.cumsum(missing, axis=1)), axis=1)
+
+    window_sum = sums[:, window:] - sums[:, :-window]
+    window_sq = squares[:, window:] - squares[:, :-window]
+    complete = (gaps[:, window:] - gaps[:, :-window]) == 0
+
+    mean = window_sum / window
+    variance = np.maximum(window_sq - window_sum * mean, 0) / (window - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z[:, window - 1:] = np.where(complete, (spread[:, window - 1:] - mean) / np.sqrt(variance), np.nan)
+    return z
+
+
+def batch_backtest(prices_a, prices_b, window=30, z_entry=1.7, z_exit=0.04, risk_free_rate=None, chunk_size=256):
+    """
+    Backtest the mean reversion strategy on many pairs at once.
+
+    prices_a and prices_b are (pairs, bars) arrays or DataFrames holding the
+    two legs of each pair (the gold and silver roles). Spread, Z-score,
+    positions, returns and metrics are computed for chunk_size pairs at a time
+    as whole-array NumPy operations, so memory stays bounded for any number of
+    pairs. Returns one row of performance metrics per pair. risk_free_rate may
+    be a per-bar series of annual rates (aligned to the DataFrame columns) or
+    an array with one rate per bar.
+    """
+    if risk_free_rate is None:
+        risk_free_rate = get_risk_free_rate()
+    index = prices_a.index if isinstance(prices_a, pd.DataFrame) else None
+    if isinstance(prices_a, pd.DataFrame):
+        risk_free_rate = per_bar_rates(risk_free_rate, prices_a.columns)
+    prices_a = np.asarray(prices_a, dtype=np.float64)
+    prices_b = np.asarray(prices_b, dtype=np.float64)
+
+    results = []
+    for start in range(0, len(prices_a), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        spread = batch_spread(prices_a[chunk], prices_b[chunk])
+        z_score = batch_zscore(spread, window=window)
+        positions = compute_positions_batch(z_score, z_entry, z_exit)
+        results.append(pd.DataFrame(batch_performance_metrics(positions, spread, risk_free_rate)))
+
+    results = pd.concat(results, ignore_index=True)
+    if index is not None:
+        results.index = index
+    return results
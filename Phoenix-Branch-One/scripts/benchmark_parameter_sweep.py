@@ -0,0 +1,56 @@
+import contextlib
+import io
+import time
+import numpy as np
+import pandas as pd
+from backtest_strategy import calculate_spread, calculate_zscore, backtest_strategy, calculate_performance_metrics
+from parameter_sweep import sweep_parameters
+
+
+def make_price_frame(n, seed=0):
+    """
+    Synthetic gold/silver closes that share a common random-walk factor.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2021-01-04", periods=n)
+    factor = 0.01 * rng.standard_normal(n).cumsum()
+    gold = 1800 * np.exp(factor + 0.005 * rng.standard_normal(n))
+    silver = 25 * np.exp(factor + 0.01 * rng.standard_normal(n))
+    return pd.DataFrame({'Price_gold': gold, 'Price_silver': silver}, index=pd.Index(dates, name="Date"))
+
+
+if __name__ == "__main__":
+    df = make_price_frame(756)  # ~3 years of daily bars
+    risk_free_rate = 0.04
+
+    windows = list(range(10, 110, 5))
+    z_entries = np.linspace(0.5, 3.0, 50)
+    z_exits = np.linspace(0.0, 1.0, 50)
+
+    start = time.perf_counter()
+    results = sweep_parameters(df, windows, z_entries, z_exits, risk_free_rate=risk_free_rate)
+    elapsed = time.perf_counter() - start
+    print(f"Swept {len(results):,} parameter sets in {elapsed:.2f}s")
+
+    # Spot-check a few grid points against the one-at-a-time path
+    metric_columns = ["Cumulative_Return", "Annualized_Return", "Annualized_Volatility", "Max_Drawdown", "Sharpe_Ratio"]
+    for row in results.sample(20, random_state=0).itertuples():
+        single = calculate_zscore(calculate_spread(df.copy()), window=row.window)
+        single = backtest_strategy(single, z_entry=row.z_entry, z_exit=row.z_exit)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = calculate_performance_metrics(single, risk_free_rate=risk_free_rate)
+        actual = [getattr(row, column) for column in metric_columns]
+        expected = [expected.cumulative_return, expected.annualized_return, expected.annualized_volatility,
+                    expected.max_drawdown, expected.sharpe_ratio]
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, equal_nan=True)
+    print("Sweep metrics match backtest_strategy + calculate_performance_metrics")
+
+    start = time.perf_counter()
+    for window in windows[:2]:
+        for z_entry in z_entries[:10]:
+            for z_exit in z_exits[:10]:
+                single = calculate_zscore(calculate_spread(df.copy()), window=window)
+                single = backtest_strategy(single, z_entry=z_entry, z_exit=z_exit)
+    per_run = (time.perf_counter() - start) / 200
+    print(f"One-at-a-time path: {per_run * 1000:.2f}ms per parameter set, "
+          f"~{per_run * len(results):.0f}s for the full grid")
@@ -0,0 +1,66 @@
+import time
+import numpy as np
+import pandas as pd
+from performance import compute_metrics, MetricsAccumulator
+
+
+def legacy_metrics(df, risk_free_rate):
+    """
+    The original pandas formulas from calculate_performance_metrics.
+    """
+    cumulative_return = df['Cumulative_Return'].iloc[-1]
+    days_held = df['Strategy_Return'].count()
+    annualized_return = (1 + cumulative_return) ** (252 / days_held) - 1
+    annualized_volatility = df['Strategy_Return'].std() * np.sqrt(252)
+    max_drawdown = (((1 + df['Strategy_Return']).cumprod() - (1 + df['Strategy_Return']).cumprod().cummax()) /
+                (1 + df['Strategy_Return']).cumprod().cummax()).min()
+    sharpe_ratio = (annualized_return - risk_free_rate) / annualized_volatility
+    return [cumulative_return, annualized_return, annualized_volatility, max_drawdown, sharpe_ratio]
+
+
+def make_returns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    position = np.repeat(rng.choice([-1, 0, 1], size=n // 10 + 1), 10)[:n]
+    spread = 0.01 * rng.standard_normal(n)
+    returns = np.concatenate(([np.nan], position[:-1] * spread[1:]))
+    return pd.DataFrame({'Position': position, 'Strategy_Return': returns,
+                         'Cumulative_Return': (1 + pd.Series(returns)).cumprod() - 1})
+
+
+if __name__ == "__main__":
+    risk_free_rate = 0.04
+    for seed in range(5):
+        df = make_returns(5_000, seed=seed)
+        expected = legacy_metrics(df, risk_free_rate)
+
+        batch = compute_metrics(df['Strategy_Return'], df['Position'], risk_free_rate)
+        accumulator = MetricsAccumulator(risk_free_rate)
+        for strategy_return, position in zip(df['Strategy_Return'], df['Position']):
+            accumulator.update(strategy_return, position)
+        streamed = accumulator.result()
+
+        for metrics in (batch, streamed):
+            actual = [metrics.cumulative_return, metrics.annualized_return, metrics.annualized_volatility,
+                      metrics.max_drawdown, metrics.sharpe_ratio]
+            np.testing.assert_allclose(actual, expected, rtol=1e-9)
+        np.testing.assert_allclose(streamed, batch, rtol=1e-9)
+    print("Batch and incremental metrics match the pandas formulas")
+
+    print(f"{'Rows':>12} {'pandas (s)':>12} {'compute_metrics (s)':>20} {'per-bar update (us)':>20}")
+    for n in [100_000, 1_000_000, 10_000_000]:
+        df = make_returns(n)
+        start = time.perf_counter()
+        legacy_metrics(df, risk_free_rate)
+        legacy = time.perf_counter() - start
+        returns, positions = df['Strategy_Return'].to_numpy(), df['Position'].to_numpy()
+        start = time.perf_counter()
+        compute_metrics(returns, positions, risk_free_rate)
+        batch = time.perf_counter() - start
+
+        accumulator = MetricsAccumulator(risk_free_rate)
+        sample = min(n, 200_000)
+        start = time.perf_counter()
+        for strategy_return, position in zip(returns[:sample].tolist(), positions[:sample].tolist()):
+            accumulator.update(strategy_return, position)
+        per_bar = (time.perf_counter() - start) / sample * 1e6
+        print(f"{n:>12,} {legacy:>12.4f} {batch:>20.4f} {per_bar:>20.2f}")
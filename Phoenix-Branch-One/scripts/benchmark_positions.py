@@ -0,0 +1,80 @@
+import time
+import numpy as np
+import pandas as pd
+from backtest_strategy import compute_positions
+
+
+def legacy_backtest_positions(df, z_entry, z_exit):
+    """
+    The original per-row position loop from backtest_strategy, kept here as the
+    reference. It writes with .iat because the old chained
+    df['Position'].iloc[i] = ... assignment is dropped under copy-on-write.
+    """
+    df['Position'] = 0
+    col = df.columns.get_loc('Position')
+
+    for i in range(1, len(df)):
+        prev_position = df['Position'].iloc[i-1]
+        z_score = df['Z_Score'].iloc[i]
+
+        if prev_position == 0:
+            if z_score > z_entry:
+                df.iat[i, col] = -1
+            elif z_score < -z_entry:
+                df.iat[i, col] = 1
+            else:
+                df.iat[i, col] = 0
+        elif prev_position == 1:
+            if z_score < z_exit and z_score > -z_exit:
+                df.iat[i, col] = 0
+            else:
+                df.iat[i, col] = 1
+        elif prev_position == -1:
+            if z_score < z_exit and z_score > -z_exit:
+                df.iat[i, col] = 0
+            else:
+                df.iat[i, col] = -1
+
+    return df['Position'].to_numpy()
+
+
+def make_zscores(n, window=30, seed=0):
+    """
+    Z-scores of a random-walk spread, with the leading NaNs of a rolling window.
+    """
+    rng = np.random.default_rng(seed)
+    spread = pd.Series(rng.standard_normal(n).cumsum())
+    mean = spread.rolling(window=window).mean()
+    std = spread.rolling(window=window).std()
+    return ((spread - mean) / std).to_numpy()
+
+
+def time_call(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    thresholds = [(1.7, 0.04), (2.5, 0.5), (1.0, 1.0), (0.5, 1.5)]
+
+    # Check the engine against the legacy loop
+    z = make_zscores(20_000)
+    for z_entry, z_exit in thresholds:
+        expected = legacy_backtest_positions(pd.DataFrame({'Z_Score': z}), z_entry, z_exit)
+        actual = compute_positions(z, z_entry, z_exit)
+        assert np.array_equal(expected, actual), f"Mismatch for z_entry={z_entry}, z_exit={z_exit}"
+    print("compute_positions matches the legacy loop")
+
+    print(f"{'Rows':>12} {'Legacy loop (s)':>16} {'Engine (s)':>12}")
+    for n in [10_000, 100_000, 1_000_000, 10_000_000]:
+        z = make_zscores(n)
+        engine = time_call(compute_positions, z, 1.7, 0.04)
+        if n <= 100_000:
+            legacy = time_call(legacy_backtest_positions, pd.DataFrame({'Z_Score': z}), 1.7, 0.04, repeat=1)
+            print(f"{n:>12,} {legacy:>16.4f} {engine:>12.4f}")
+        else:
+            print(f"{n:>12,} {'-':>16} {engine:>12.4f}")
@@ -0,0 +1,64 @@
+import time
+import numpy as np
+import pandas as pd
+from benchmark_live_signal import make_prices
+from parameter_sweep import sweep_parameters, batch_performance_metrics
+from walk_forward import evaluate_out_of_sample, make_folds, walk_forward
+
+RISK_FREE_RATE = 0.04
+
+
+def serial_walk_forward(df, windows, z_entries, z_exits, train_size, test_size, objective="Sharpe_Ratio"):
+    """
+    Reference walk-forward: a plain loop over the folds in this process,
+    slicing df directly instead of going through shared memory.
+    """
+    prices = df[['Price_gold', 'Price_silver']].reset_index(drop=True)
+    folds, returns = [], pd.Series(np.nan, index=df.index, name="Strategy_Return")
+    for k, (train_start, train_end, test_end) in enumerate(make_folds(len(df), train_size, test_size)):
+        results = sweep_parameters(prices.iloc[train_start:train_end], windows, z_entries, z_exits,
+                                   risk_free_rate=RISK_FREE_RATE)
+        best = results.loc[results[objective].idxmax()]
+        window = int(best["window"])
+        warmup_start = max(train_end - window - 1, 0)
+        positions, spread, fold_returns = evaluate_out_of_sample(
+            prices.iloc[warmup_start:test_end].reset_index(drop=True), train_end - warmup_start, window,
+            best["z_entry"], best["z_exit"])
+        metrics = batch_performance_metrics(positions[None, :], spread, RISK_FREE_RATE)
+        fold = {"Fold": k, "Train_Start": df.index[train_start], "Test_Start": df.index[train_end],
+                "Test_End": df.index[min(test_end, len(df) - 1)], "window": window, "z_entry": best["z_entry"],
+                "z_exit": best["z_exit"], f"Train_{objective}": best[objective]}
+        fold.update({name: values[0] for name, values in metrics.items()})
+        folds.append(fold)
+        returns.iloc[train_end:test_end] = fold_returns
+    return pd.DataFrame(folds), returns.iloc[train_size:]
+
+
+if __name__ == "__main__":
+    df = make_prices(3_000, seed=3)
+    grid = dict(windows=range(10, 70, 10), z_entries=np.linspace(1.0, 3.0, 21), z_exits=np.linspace(0.0, 1.0, 11))
+
+    start = time.perf_counter()
+    expected_folds, expected_returns = serial_walk_forward(df, **grid, train_size=504, test_size=63)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    result = walk_forward(df, **grid, train_size=504, test_size=63, risk_free_rate=RISK_FREE_RATE)
+    parallel = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(result.folds, expected_folds, check_dtype=False)
+    pd.testing.assert_series_equal(result.returns, expected_returns)
+    print(f"Shared-memory walk-forward matches the in-process loop on {len(result.folds)} folds "
+          f"(serial {serial:.2f}s, parallel {parallel:.2f}s)")
+
+    # Thresholds no Z-score reaches: nothing trades, so every fold is NaN and nothing is traded out of sample
+    result = walk_forward(df, windows=[20], z_entries=[50.0], z_exits=[0.5], train_size=504, test_size=63,
+                          risk_free_rate=RISK_FREE_RATE)
+    assert result.folds["window"].isna().all() and result.returns.isna().all()
+    print("Folds without a defined objective are reported as NaN")
+
+    try:
+        walk_forward(df.iloc[:500], **grid, train_size=504, test_size=63, risk_free_rate=RISK_FREE_RATE)
+    except ValueError as e:
+        print(f"Short history: {e}")
+    else:
+        raise AssertionError("walk_forward should reject a history shorter than one fold")
@@ -0,0 +1,64 @@
+import math
+import pandas as pd
+from statarb_common.rolling_moments import RollingMoments
+
+
+class StreamingSignal:
+    """
+    Incremental version of calculate_spread -> calculate_zscore -> backtest_strategy.
+
+    Each call to update() takes the latest gold and silver prices and returns
+    the new Z-score and position in constant time. The rolling mean and
+    variance of the spread are kept by a rolling_moments.RollingMoments over
+    the last `window` spreads, so memory is fixed as well. A missing price
+    gives NaN Z-scores until it has left the window, as in the batch path,
+    and the sums are rebuilt every resync bars.
+    """
+
+    def __init__(self, z_entry, z_exit, window=30, resync=10_000):
+        self.z_entry = z_entry
+        self.z_exit = z_exit
+        self.window = window
+        self.position = 0
+        self.z_score = math.nan
+
+        self._moments = RollingMoments(window, resync=resync)
+        self._prev_gold = None
+        self._prev_silver = None
+
+    def update(self, price_gold, price_silver):
+        """
+        Feed one bar and return (z_score, position) for it.
+        """
+        if self._prev_gold is None:
+            # First bar: no return yet, and backtest_strategy starts flat
+            self._prev_gold, self._prev_silver = price_gold, price_silver
+            return self.z_score, self.position
+
+        spread = (price_gold / self._prev_gold - 1) - (price_silver / self._prev_silver - 1)
+        self._prev_gold, self._prev_silver = price_gold, price_silver
+
+        self._moments.push(spread)
+        self.z_score = self._moments.zscore(spread)
+        self._step_position(self.z_score)
+        return self.z_score, self.position
+
+    def _step_position(self, z_score):
+        # Same hysteresis as compute_positions; NaN neither enters nor exits
+        if self.position == 0:
+            if z_score > self.z_entry:
+                self.position = -1  # Short, sell gold buy silver
+            elif z_score < -self.z_entry:
+                self.position = 1  # Long, buy gold sell silver
+        elif z_score < self.z_exit and z_score > -self.z_exit:
+            self.position = 0
+
+
+def replay(df, z_entry, z_exit, window=30, resync=10_000):
+    """
+    Push every bar of df through a StreamingSignal and return its Z-scores and positions.
+    """
+    signal = StreamingSignal(z_entry, z_exit, window=window, resync=resync)
+    rows = [signal.update(gold, silver) for gold, silver in zip(df['Price_gold'], df['Price_silver'])]
+    return pd.DataFrame(rows, index=df.index, columns=['Z_Score', 'Position'])
+
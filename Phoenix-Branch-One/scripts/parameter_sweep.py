@@ -0,0 +1,91 @@
+import itertools
+import numpy as np
+import pandas as pd
+from backtest_strategy import calculate_spread, calculate_zscore, compute_positions_batch, get_risk_free_rate
+from performance import per_bar_rates
+
+
+def batch_performance_metrics(positions, spread, risk_free_rate):
+    """
+    Calculate the calculate_performance_metrics numbers for a batch of position
+    rows, against one shared spread or a (rows, bars) spread per row. Returns
+    a dict of arrays, one value per row.
+
+    risk_free_rate is an annual rate, or an array of annual rates aligned with
+    the bars of spread; then each return is charged its own bar's rate, as in
+    performance.compute_metrics.
+    """
+    # Strategy_Return = Position.shift(1) * Spread, NaN where either is missing
+    returns = positions[:, :-1] * spread[..., 1:]
+    valid = ~np.isnan(returns)
+    days_held = valid.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        wealth = np.nancumprod(1 + returns, axis=1)
+        cumulative_return = wealth[:, -1] - 1
+        annualized_return = (1 + cumulative_return) ** (252 / days_held) - 1
+        annualized_volatility = np.nanstd(returns, axis=1, ddof=1) * np.sqrt(252)
+        peak = np.maximum.accumulate(wealth, axis=1)
+        max_drawdown = np.where(valid, (wealth - peak) / peak, np.nan)
+        max_drawdown = np.nanmin(max_drawdown, axis=1)
+        excess_volatility = annualized_volatility
+        if np.ndim(risk_free_rate):
+            rates = np.where(valid, np.asarray(risk_free_rate, dtype=np.float64)[..., 1:], np.nan)
+            excess_volatility = np.nanstd(returns - rates / 252, axis=1, ddof=1) * np.sqrt(252)
+            risk_free_rate = np.where(valid, rates, 0.0).sum(axis=1) / days_held
+        # No trades means no volatility; report NaN rather than +/-inf
+        sharpe_ratio = np.where(excess_volatility > 0,
+                                (annualized_return - risk_free_rate) / excess_volatility, np.nan)
+
+    return {
+        "Cumulative_Return": cumulative_return,
+        "Annualized_Return": annualized_return,
+        "Annualized_Volatility": annualized_volatility,
+        "Max_Drawdown": max_drawdown,
+        "Sharpe_Ratio": sharpe_ratio,
+        "Trades": ((positions[:, 1:] != 0) & (positions[:, :-1] == 0)).sum(axis=1),
+    }
+
+
+def sweep_parameters(df, windows, z_entries, z_exits, risk_free_rate=None):
+    """
+    Backtest every (window, z_entry, z_exit) combination and return one row of
+    performance metrics per combination.
+
+    The spread is computed once, the rolling mean/std once per window, and all
+    threshold pairs for a window are evaluated together as one batch.
+    risk_free_rate may be a per-bar series of annual rates, or an array with
+    one rate per row of df.
+    """
+    if risk_free_rate is None:
+        risk_free_rate = get_risk_free_rate()
+    risk_free_rate = per_bar_rates(risk_free_rate, df.index)
+
+    df = calculate_spread(df.copy())
+    spread = df['Spread'].to_numpy(dtype=np.float64)
+    thresholds = np.array(list(itertools.product(z_entries, z_exits)), dtype=np.float64).reshape(-1, 2)
+
+    results = []
+    for window in windows:
+        z_score = calculate_zscore(df, window=window)['Z_Score'].to_numpy()
+        positions = compute_positions_batch(z_score, thresholds[:, 0], thresholds[:, 1])
+        metrics = batch_performance_metrics(positions, spread, risk_free_rate)
+        table = pd.DataFrame({"window": window, "z_entry": thresholds[:, 0], "z_exit": thresholds[:, 1]})
+        results.append(table.assign(**metrics))
+
+    return pd.concat(results, ignore_index=True)
+
+
+if __name__ == "__main__":
+    # Load the cleaned and combined data
+    df = pd.read_csv("data/processed_data.csv", index_col="Date", parse_dates=True)
+
+    results = sweep_parameters(
+        df,
+        windows=range(10, 110, 5),
+        z_entries=np.linspace(0.5, 3.0, 50),
+        z_exits=np.linspace(0.0, 1.0, 50),
+    )
+
+    print("Top 10 parameter sets by Sharpe ratio:")
+    print(results.sort_values("Sharpe_Ratio", ascending=False).head(10).to_string(index=False))
@@ -0,0 +1,168 @@
+import math
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+PerformanceMetrics = namedtuple("PerformanceMetrics", [
+    "cumulative_return",
+    "annualized_return",
+    "annualized_volatility",
+    "sharpe_ratio",
+    "sortino_ratio",
+    "max_drawdown",
+    "max_drawdown_duration",  # longest run of bars below a previous peak
+    "hit_rate",  # share of bars in the market with a positive return
+    "turnover",  # total absolute position change per year
+    "bars",
+])
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator else math.nan
+
+
+def per_bar_rates(risk_free_rate, index):
+    """
+    A risk_free_rate argument in the form the metrics functions take: an
+    annual rate stays a scalar, and a Series of annual rates (e.g.
+    RiskFreeRate.series) becomes an array aligned to index, the last known
+    rate carried forward.
+    """
+    if isinstance(risk_free_rate, pd.Series):
+        rates = risk_free_rate.reindex(risk_free_rate.index.union(index)).ffill().reindex(index).bfill()
+        return rates.to_numpy(dtype=np.float64)
+    return risk_free_rate
+
+
+def _finish(bars, growth, m2, downside_sq, max_drawdown, max_duration, wins, active, turnover,
+            risk_free_rate, periods_per_year, excess_m2=None):
+    if bars == 0:
+        return PerformanceMetrics(*[math.nan] * 9, bars=0)
+    cumulative_return = growth - 1
+    annualized_return = (1 + cumulative_return) ** (periods_per_year / bars) - 1
+    annualized_volatility = math.sqrt(m2 / (bars - 1)) * math.sqrt(periods_per_year) if bars > 1 else math.nan
+    downside_deviation = math.sqrt(downside_sq / bars) * math.sqrt(periods_per_year)
+    # With a per-bar rate the Sharpe ratio uses the volatility of the excess returns
+    excess_volatility = annualized_volatility
+    if excess_m2 is not None:
+        excess_volatility = math.sqrt(excess_m2 / (bars - 1)) * math.sqrt(periods_per_year) if bars > 1 else math.nan
+    return PerformanceMetrics(
+        cumulative_return=cumulative_return,
+        annualized_return=annualized_return,
+        annualized_volatility=annualized_volatility,
+        sharpe_ratio=_ratio(annualized_return - risk_free_rate, excess_volatility),
+        sortino_ratio=_ratio(annualized_return - risk_free_rate, downside_deviation),
+        max_drawdown=max_drawdown,
+        max_drawdown_duration=max_duration,
+        hit_rate=_ratio(wins, active),
+        turnover=turnover * periods_per_year / bars,
+        bars=bars,
+    )
+
+
+def compute_metrics(returns, positions=None, risk_free_rate=0.0, periods_per_year=252):
+    """
+    Performance metrics for an array of per-bar strategy returns (NaN bars are
+    skipped, like pandas does). positions, if given, is used for turnover.
+
+    risk_free_rate is an annual rate, or an array of annual rates, one per
+    bar (see per_bar_rates). Each bar's rate is then taken out of that bar's
+    return: the Sharpe ratio is the annualized return less the average rate
+    over the bars held, over the volatility of the excess returns. A constant
+    array gives the same metrics as the scalar rate.
+
+    The growth curve and its running peak are built once and shared by the
+    cumulative return, drawdown and drawdown duration.
+    """
+    r = np.asarray(returns, dtype=np.float64)
+    valid = ~np.isnan(r)
+    r = r[valid]
+    bars = len(r)
+    if bars == 0:
+        return _finish(0, 1, 0, 0, 0, 0, 0, 0, 0, risk_free_rate, periods_per_year)
+
+    excess_m2 = None
+    if np.ndim(risk_free_rate):
+        rates = np.asarray(risk_free_rate, dtype=np.float64)[valid]
+        excess = r - rates / periods_per_year
+        excess_m2 = float(((excess - excess.mean()) ** 2).sum())
+        risk_free_rate = float(rates.mean())
+
+    wealth = np.cumprod(1 + r)
+    peak = np.maximum.accumulate(wealth)
+    drawdown = wealth / peak - 1
+
+    # Longest stretch of consecutive bars spent below the running peak
+    underwater = np.concatenate(([False], drawdown < 0, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(underwater))
+    max_duration = int((edges[1::2] - edges[::2]).max()) if len(edges) else 0
+
+    mean = r.mean()
+    turnover = 0.0
+    if positions is not None:
+        p = np.asarray(positions, dtype=np.float64)
+        p = p[~np.isnan(p)]
+        turnover = float(np.abs(np.diff(p, prepend=0.0)).sum())
+
+    return _finish(
+        bars, float(wealth[-1]), float(((r - mean) ** 2).sum()), float((np.minimum(r, 0) ** 2).sum()),
+        float(drawdown.min()), max_duration, int((r > 0).sum()), int((r != 0).sum()), turnover,
+        risk_free_rate, periods_per_year, excess_m2,
+    )
+
+
+class MetricsAccumulator:
+    """
+    Incremental version of compute_metrics for live use: feed one bar at a
+    time with update() and read the metrics so far with result(). Every
+    statistic is a running value, so each update is O(1).
+    """
+
+    def __init__(self, risk_free_rate=0.0, periods_per_year=252):
+        self.risk_free_rate = risk_free_rate
+        self.periods_per_year = periods_per_year
+        self.bars = 0
+        self.growth = 1.0
+        self.peak = None  # like cummax(), the peak starts at the first bar
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.downside_sq = 0.0
+        self.max_drawdown = 0.0
+        self.duration = 0
+        self.max_duration = 0
+        self.wins = 0
+        self.active = 0
+        self.turnover = 0.0
+        self.position = 0.0
+
+    def update(self, strategy_return, position=None):
+        if position is not None and not math.isnan(position):
+            self.turnover += abs(position - self.position)
+            self.position = position
+        if math.isnan(strategy_return):
+            return
+
+        self.bars += 1
+        delta = strategy_return - self.mean
+        self.mean += delta / self.bars
+        self.m2 += delta * (strategy_return - self.mean)
+        if strategy_return < 0:
+            self.downside_sq += strategy_return * strategy_return
+        if strategy_return != 0:
+            self.active += 1
+            self.wins += strategy_return > 0
+
+        self.growth *= 1 + strategy_return
+        if self.peak is None or self.growth >= self.peak:
+            self.peak = self.growth
+            self.duration = 0
+        else:
+            self.duration += 1
+            self.max_duration = max(self.max_duration, self.duration)
+            self.max_drawdown = min(self.max_drawdown, self.growth / self.peak - 1)
+
+    def result(self):
+        return _finish(
+            self.bars, self.growth, self.m2, self.downside_sq, self.max_drawdown, self.max_duration,
+            self.wins, self.active, self.turnover, self.risk_free_rate, self.periods_per_year,
+        )
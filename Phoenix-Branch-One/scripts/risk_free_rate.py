@@ -0,0 +1,128 @@
+import datetime
+import os
+import time
+import pandas as pd
+
+TICKER = "^TNX"  # Yahoo Finance ticker for 10-Year Treasury Yield
+CACHE_PATH = os.path.join("data", "risk_free_rate.csv")
+HISTORY_START = "2000-01-01"
+
+
+def download_yields(start, end, ticker=TICKER):
+    """
+    Daily 10-year Treasury yields from Yahoo Finance, as decimals indexed by date.
+    """
+    import yfinance as yf
+
+    data = yf.Ticker(ticker).history(start=start, end=end, raise_errors=True)
+    rates = (data['Close'] / 100).rename("Rate")
+    rates.index = pd.DatetimeIndex(rates.index.tz_localize(None).normalize(), name="Date")
+    return rates
+
+
+class RiskFreeRate:
+    """
+    Source of the risk free rate used for the Sharpe ratio.
+
+    - fixed: always return this annual rate (no I/O at all)
+    - path: read a Date,Rate CSV once and never touch the network
+    - otherwise: daily yields are kept in a local CSV cache. The cache is
+      refreshed from Yahoo Finance once it is older than ttl_hours, and the
+      stale copy is used if the refresh fails.
+
+    Rates are loaded at most once per process and memoized, so repeated
+    metrics calculations are pure CPU.
+    """
+
+    def __init__(self, fixed=None, path=None, cache_path=CACHE_PATH, ttl_hours=24, fetch=download_yields):
+        self.fixed = fixed
+        self.path = path
+        self.cache_path = cache_path
+        self.ttl_hours = ttl_hours
+        self.fetch = fetch
+        self._rates = None
+
+    def latest(self):
+        """
+        The most recent annual rate, as a decimal.
+        """
+        if self.fixed is not None:
+            return self.fixed
+        return float(self.rates().iloc[-1])
+
+    def series(self, index):
+        """
+        The annual rate in effect on each date of index (last known value
+        carried forward, earliest value for dates before the history), for
+        per-bar use in backtests.
+        """
+        if self.fixed is not None:
+            return pd.Series(self.fixed, index=index, name="Rate")
+        rates = self.rates()
+        return rates.reindex(rates.index.union(index)).ffill().reindex(index).bfill()
+
+    def rates(self):
+        """
+        The full daily rate history, loaded once per process.
+        """
+        if self._rates is None:
+            self._rates = self._load()
+        return self._rates
+
+    def _load(self):
+        if self.path is not None:
+            return self._read_csv(self.path)
+
+        cached = self._read_csv(self.cache_path) if os.path.exists(self.cache_path) else None
+        if cached is not None and self._cache_age_hours() < self.ttl_hours:
+            return cached
+
+        # Cache missing or stale: fetch only what is newer than the cache
+        start = HISTORY_START if cached is None else (cached.index[-1] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        end = (datetime.date.today() + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+        try:
+            fresh = self.fetch(start, end)
+        except Exception as e:
+            if cached is None:
+                raise RuntimeError(f"No cached risk free rate and the download failed: {e}") from e
+            print(f"Warning: could not refresh the risk free rate ({e}); using the cached rates")
+            return cached
+        if cached is None and fresh.empty:
+            raise RuntimeError(f"No risk free rate data returned for {start} to {end}")
+
+        rates = fresh if cached is None else pd.concat([cached, fresh[~fresh.index.isin(cached.index)]]).sort_index()
+        self._write_cache(rates)
+        return rates
+
+    def _cache_age_hours(self):
+        return (time.time() - os.path.getmtime(self.cache_path)) / 3600
+
+    def _write_cache(self, rates):
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        rates.to_frame("Rate").to_csv(tmp_path)
+        os.replace(tmp_path, self.cache_path)
+
+    @staticmethod
+    def _read_csv(path):
+        df = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+        return df['Rate'].astype(float).sort_index()
+
+
+_default = None
+
+
+def default_provider():
+    """
+    The process-wide provider. Set RISK_FREE_RATE (e.g. 0.04) for a fixed rate,
+    or RISK_FREE_RATE_FILE for a Date,Rate CSV, to run offline.
+    """
+    global _default
+    if _default is None:
+        if os.environ.get("RISK_FREE_RATE"):
+            _default = RiskFreeRate(fixed=float(os.environ["RISK_FREE_RATE"]))
+        elif os.environ.get("RISK_FREE_RATE_FILE"):
+            _default = RiskFreeRate(path=os.environ["RISK_FREE_RATE_FILE"])
+        else:
+            _default = RiskFreeRate()
+    return _default
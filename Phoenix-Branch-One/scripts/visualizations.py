@@ -1,10 +1,33 @@
-import matplotlib.pyplot as plt
+def load_pyplot(headless=False):
+    """
+    Import matplotlib.pyplot on first use. headless=True selects the Agg
+    backend, which draws to files and never opens a window.
+    """
+    import matplotlib
+    if headless:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def show_or_save(fig, save_path=None):
+    """
+    Show the figure, or write it to save_path and close it in headless mode.
+    """
+    plt = load_pyplot()
+    if save_path is None:
+        plt.show()
+    else:
+        fig.savefig(save_path)
+        plt.close(fig)
+        print(f"Figure saved to {save_path}")
 
 
-def plot_results(df):
+def plot_results(df, save_path=None):
     """
     Plot the Spread and Z-Score with signals.
     """
+    plt = load_pyplot(headless=save_path is not None)
     fig, axes = plt.subplots(3, 1, figsize=(12, 10))  # 3 rows, 1 column
 
     # Plot the Spread
@@ -30,5 +53,5 @@ def plot_results(df):
     axes[2].set_title("Cumulative Returns of Mean Reversion Strategy")
     axes[2].legend()
 
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    show_or_save(fig, save_path)
@@ -0,0 +1,167 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from backtest_strategy import calculate_spread, calculate_zscore, compute_positions, get_risk_free_rate
+from parameter_sweep import sweep_parameters, batch_performance_metrics
+from performance import per_bar_rates
+
+WalkForwardResult = namedtuple("WalkForwardResult", ["folds", "returns", "equity"])
+
+# Worker-side view of the shared price block, set up by _attach_prices
+_prices = None
+_shm = None
+
+
+def make_folds(n_bars, train_size, test_size, step=None):
+    """
+    Rolling (train_start, train_end, test_end) index triples. Each test slice
+    starts where its train slice ends; folds advance by step bars (test_size
+    by default, so the test slices tile the history without overlap).
+    """
+    step = step or test_size
+    return [
+        (start, start + train_size, min(start + train_size + test_size, n_bars))
+        for start in range(0, n_bars - train_size - 1, step)
+    ]
+
+
+def _attach_prices(name, shape):
+    """
+    Pool initializer: map the parent's shared price block into this worker.
+    """
+    global _prices, _shm
+    # Workers share the parent's resource tracker, so attaching here doesn't
+    # take ownership; the parent unlinks the block when the pool is done
+    _shm = shared_memory.SharedMemory(name=name)
+    _prices = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+
+
+def _price_frame(start, end):
+    return pd.DataFrame({'Price_gold': _prices[start:end, 0], 'Price_silver': _prices[start:end, 1]})
+
+
+def _rates(risk_free_rate, start, end):
+    # Per-bar rates travel as a third column of the shared block
+    return _prices[start:end, 2] if _prices.shape[1] > 2 else risk_free_rate
+
+
+def evaluate_out_of_sample(prices, test_start, window, z_entry, z_exit):
+    """
+    Run fixed parameters over prices and return the strategy returns for the
+    bars from test_start on. Earlier bars only warm up the rolling Z-score;
+    the strategy starts flat on the first test bar.
+    """
+    df = calculate_zscore(calculate_spread(prices), window=window)
+    spread = df['Spread'].to_numpy()[test_start:]
+    positions = compute_positions(df['Z_Score'].to_numpy()[test_start:], z_entry, z_exit)
+    returns = np.full(len(spread), np.nan)
+    returns[1:] = positions[:-1] * spread[1:]
+    return positions, spread, returns
+
+
+def _run_fold(args):
+    fold_id, (train_start, train_end, test_end), windows, z_entries, z_exits, risk_free_rate, objective = args
+
+    # Optimize on the train slice
+    results = sweep_parameters(_price_frame(train_start, train_end), windows, z_entries, z_exits,
+                               risk_free_rate=_rates(risk_free_rate, train_start, train_end))
+    if results[objective].isna().all():
+        # No parameter set has a defined objective (e.g. none of them trades):
+        # sit the test slice out and report the fold as NaN
+        fold = {"Fold": fold_id, "Train_Start": train_start, "Test_Start": train_end, "Test_End": test_end}
+        fold.update({"window": np.nan, "z_entry": np.nan, "z_exit": np.nan, f"Train_{objective}": np.nan})
+        fold.update({name: np.nan for name in results.columns if name not in fold})
+        return fold, np.full(test_end - train_end, np.nan)
+    best = results.loc[results[objective].idxmax()]
+    window = int(best["window"])
+
+    # Score on the following test slice, warming up on the end of the train slice
+    warmup_start = max(train_end - window - 1, 0)
+    positions, spread, returns = evaluate_out_of_sample(
+        _price_frame(warmup_start, test_end), train_end - warmup_start, window, best["z_entry"], best["z_exit"])
+    metrics = batch_performance_metrics(positions[None, :], spread, _rates(risk_free_rate, train_end, test_end))
+
+    fold = {
+        "Fold": fold_id,
+        "Train_Start": train_start,
+        "Test_Start": train_end,
+        "Test_End": test_end,
+        "window": window,
+        "z_entry": best["z_entry"],
+        "z_exit": best["z_exit"],
+        f"Train_{objective}": best[objective],
+    }
+    fold.update({name: values[0] for name, values in metrics.items()})
+    return fold, returns
+
+
+def walk_forward(df, windows, z_entries, z_exits, train_size=504, test_size=63, step=None,
+                 objective="Sharpe_Ratio", risk_free_rate=None, workers=None):
+    """
+    Walk-forward optimization of window/z_entry/z_exit.
+
+    For every fold the parameters with the best objective on the train slice
+    are scored on the next test slice. Folds run in parallel; the gold/silver
+    prices sit in one shared-memory block that each worker maps instead of
+    receiving a pickled copy (a per-bar risk_free_rate series rides along as
+    a third column). Returns the per-fold table, the stitched
+    out-of-sample returns and the out-of-sample cumulative return curve.
+    A fold whose train slice gives no defined objective is not traded and
+    shows NaN parameters and metrics. Raises ValueError if df is too short
+    for a single fold.
+    """
+    if risk_free_rate is None:
+        risk_free_rate = get_risk_free_rate()
+
+    prices = df[['Price_gold', 'Price_silver']].to_numpy(dtype=np.float64)
+    risk_free_rate = per_bar_rates(risk_free_rate, df.index)
+    if np.ndim(risk_free_rate):
+        prices = np.column_stack((prices, risk_free_rate))
+        risk_free_rate = None  # workers read it from the shared block
+    folds = make_folds(len(prices), train_size, test_size, step)
+    if not folds:
+        raise ValueError(f"{len(prices)} bars is too short to walk forward with train_size={train_size}: "
+                         f"at least {train_size + 2} are needed")
+    tasks = [(k, fold, windows, z_entries, z_exits, risk_free_rate, objective) for k, fold in enumerate(folds)]
+
+    shm = shared_memory.SharedMemory(create=True, size=prices.nbytes)
+    try:
+        np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_attach_prices,
+                                 initargs=(shm.name, prices.shape)) as pool:
+            outputs = list(pool.map(_run_fold, tasks))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    fold_table = pd.DataFrame([fold for fold, _ in outputs])
+    for column in ["Train_Start", "Test_Start", "Test_End"]:
+        fold_table[column] = df.index[np.minimum(fold_table[column], len(df) - 1)]
+
+    # Stitch the test slices together (later folds win if they overlap)
+    returns = pd.Series(np.nan, index=df.index, name="Strategy_Return")
+    for (_, train_end, test_end), (_, fold_returns) in zip(folds, outputs):
+        returns.iloc[train_end:test_end] = fold_returns
+    returns = returns.iloc[folds[0][1]:]
+    equity = ((1 + returns).cumprod() - 1).rename("Cumulative_Return")
+
+    return WalkForwardResult(fold_table, returns, equity)
+
+
+if __name__ == "__main__":
+    # Load the cleaned and combined data
+    df = pd.read_csv("data/processed_data.csv", index_col="Date", parse_dates=True)
+
+    result = walk_forward(
+        df,
+        windows=range(10, 70, 10),
+        z_entries=np.linspace(1.0, 3.0, 21),
+        z_exits=np.linspace(0.0, 1.0, 11),
+    )
+
+    print("Walk-forward folds:")
+    print(result.folds.to_string(index=False))
+    print(f"Out-of-sample cumulative return: {result.equity.iloc[-1]:.4%}")
@@ -1,30 +1,130 @@
+import argparse
 import os
+import sys
+from contextlib import nullcontext
 
-def run_cointegration_test():
-    """
-    Run the Engle-Granger cointegration test script.
-    """
-    print("Running cointegration test...")
-    os.system("python scripts/test_cointegration.py")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+
+from costs import CostModel
+from instrumentation import configure_logging, profiling
+from intraday import periods_per_year, run_intraday_pipeline
+from pipeline import run_basket_pipeline, run_pipeline
+from price_store import ticker_key
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the statistical arbitrage pipeline in one process.")
+    parser.add_argument("--no-backtest", action="store_true",
+                        help="only run the cointegration test")
+    parser.add_argument("--scaling-factor", type=float, default=1,
+                        help="hedge ratio used for the spread (default: 1)")
+    parser.add_argument("--window", type=int, default=30,
+                        help="rolling window for the Z-score (default: 30)")
+    parser.add_argument("--z-entry", type=float, default=2,
+                        help="Z-score that opens a position (default: 2)")
+    parser.add_argument("--z-exit", type=float, default=0.5,
+                        help="Z-score that closes a position (default: 0.5)")
+    parser.add_argument("--commission-bps", type=float, default=0,
+                        help="commission in basis points of traded notional")
+    parser.add_argument("--slippage-bps", type=float, default=0,
+                        help="slippage in basis points of traded notional")
+    parser.add_argument("--spread-bps", type=float, default=0,
+                        help="half bid-ask spread in basis points, paid on each fill")
+    parser.add_argument("--borrow-rate", type=float, default=0,
+                        help="annual borrow rate on the short leg, e.g. 0.02")
+    parser.add_argument("--interval", default="1d",
+                        help="bar interval of the stored prices, e.g. 1d, 1h, 5m, 1m (default: 1d)")
+    parser.add_argument("--chunk-rows", type=int, metavar="N",
+                        help="backtest out of core, N bars at a time, for long intraday histories "
+                             "(histories of up to 500,000 bars per ticker still run in memory)")
+    parser.add_argument("--stability-window", type=int, metavar="N",
+                        help="only open positions while an N-bar rolling cointegration test passes")
+    parser.add_argument("--paper-trade", nargs="*", metavar="CSV",
+                        help="paper trade a replay of the stored prices (or the given CSVs) instead of backtesting")
+    parser.add_argument("--speed", type=float,
+                        help="replay speed in seconds of market time per second (default: as fast as possible)")
+    parser.add_argument("--basket", nargs="+", metavar="TICKER",
+                        help="trade a Johansen-weighted basket of these stored tickers, e.g. GC=F SI=F PL=F GDX")
+    parser.add_argument("--k-ar-diff", type=int, default=1,
+                        help="lagged differences in the basket's Johansen test (default: 1)")
+    parser.add_argument("--feature-cache", action="store_true",
+                        help="reuse the spread and Z-score from earlier runs on unchanged prices and parameters")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="DEBUG adds frame previews and per-stage records (default: INFO)")
+    parser.add_argument("--profile", nargs="?", const="", metavar="PATH",
+                        help="time each stage and print a report; with PATH also write it as JSON")
+    return parser.parse_args(argv)
 
-def run_backtest():
-    """
-    Run the mean reversion backtest strategy script.
-    """
-    print("\nRunning backtest strategy...")
-    os.system("python scripts/backtest_strategy.py")
 
 if __name__ == "__main__":
+    args = parse_args()
+    configure_logging(args.log_level)
     print("=== Statistical Arbitrage Project ===\n")
 
-    # Step 1: Cointegration Test
-    run_cointegration_test()
+    bars_per_year = periods_per_year(args.interval)
+    costs = None
+    if args.commission_bps or args.slippage_bps or args.spread_bps or args.borrow_rate:
+        costs = CostModel(commission_bps=args.commission_bps, slippage_bps=args.slippage_bps,
+                          spread_bps=args.spread_bps, borrow_rate=args.borrow_rate,
+                          periods_per_year=bars_per_year)
+
+    feature_cache = None
+    if args.feature_cache:
+        from feature_cache import FeatureCache
+        feature_cache = FeatureCache()
 
-    # Step 2: Ask if the user wants to proceed with backtesting
-    proceed = input("\nProceed to backtest strategy? (yes/no): ").strip().lower()
+    profiler_context = profiling(report_path=args.profile or None) if args.profile is not None else nullcontext()
+    with profiler_context as profiler:
+        if args.paper_trade is not None:
+            from paper_trading import run_paper_trading
+            run_paper_trading(
+                paths=args.paper_trade or None,
+                speed=args.speed,
+                scaling_factor=args.scaling_factor,
+                window=args.window,
+                z_entry=args.z_entry,
+                z_exit=args.z_exit,
+                costs=costs,
+            )
+        elif args.basket:
+            run_basket_pipeline(
+                legs={ticker_key(ticker): ticker for ticker in args.basket},
+                k_ar_diff=args.k_ar_diff,
+                window=args.window,
+                z_entry=args.z_entry,
+                z_exit=args.z_exit,
+                costs=costs,
+                periods_per_year=bars_per_year,
+            )
+        elif args.chunk_rows:
+            # The cointegration test needs the whole series in memory, so it is skipped here
+            run_intraday_pipeline(
+                interval=args.interval,
+                window=args.window,
+                z_entry=args.z_entry,
+                z_exit=args.z_exit,
+                scaling_factor=args.scaling_factor,
+                costs=costs,
+                chunk_rows=args.chunk_rows,
+            )
+        else:
+            run_pipeline(
+                run_backtest=not args.no_backtest,
+                scaling_factor=args.scaling_factor,
+                window=args.window,
+                z_entry=args.z_entry,
+                z_exit=args.z_exit,
+                costs=costs,
+                periods_per_year=bars_per_year,
+                stability_window=args.stability_window,
+                feature_cache=feature_cache,
+            )
 
-    if proceed in ["yes", "y"]:
-        run_backtest()
-    else:
-        print("Exiting... You can rerun this later to backtest your strategy.")
+    if feature_cache is not None:
+        feature_cache.print_stats()
 
+    if profiler is not None:
+        print()
+        profiler.print_report()
+        if args.profile:
+            print(f"Profile written to {args.profile}")
@@ -1,7 +1,14 @@
+import argparse
+import logging
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+from instrumentation import configure_logging, instrumented, stage
+from price_store import read_ticker, read_combined, write_combined
+from plotting import load_pyplot, show_or_save
 
+logger = logging.getLogger(__name__)
+
+@instrumented()
 def clean_data(file_path):
     """
     Load the data from a CSV file, clean it, and return the cleaned dataframe.
@@ -9,17 +16,15 @@ def clean_data(file_path):
 
     # Skip the first two rows and set the correct column names
     column_names = ["Date", "Price", "Adj Close", "Close", "High", "Low", "Open", "Volume"]
-    df = pd.read_csv(
-        file_path, 
-        skiprows=2, 
-        names=column_names, 
-        parse_dates=["Date"], 
-        date_parser=lambda x: pd.to_datetime(x, format='%Y-%m-%d', errors='coerce')
-    )
+    df = pd.read_csv(file_path, skiprows=2, names=column_names)
+    # Daily files have plain dates, intraday ones timestamps with a UTC offset
+    # ("2024-01-02 09:30:00-05:00"); keep the exchange-local wall time like
+    # the price store does
+    df["Date"] = pd.to_datetime(df["Date"].astype(str).str[:19], format='ISO8601', errors='coerce')
 
     df = df.dropna(subset=["Date"])
 
-    print(f"Loaded data from {file_path}")
+    logger.info("Loaded data from %s", file_path)
 
     # Drop rows where Date or Price are missing
     df = df.dropna(subset=["Date", "Price"])
@@ -30,33 +35,99 @@ def clean_data(file_path):
     # Select only the 'Close' column
     df = df[['Close']].rename(columns={"Close": "Price"})
 
-    print(f"Cleaned data: {len(df)} rows remaining")
+    logger.info("Cleaned data: %d rows remaining", len(df))
     return df
 
-def analyze_data():
+@instrumented()
+def load_prices(ticker):
     """
-    Load, clean, and visualize the gold and silver price data.
+    Load the closing prices for a ticker from the price store as a 'Price' column.
     """
+    df = read_ticker(ticker, columns=["Close"]).dropna()
+    df = df.rename(columns={"Close": "Price"})
 
-    # Load and clean data
-    gold_data = clean_data("data/GC.csv")
-    silver_data = clean_data("data/SI.csv")
+    logger.info("Loaded %d rows for %s", len(df), ticker)
+    return df
 
+@instrumented()
+def combine_prices(gold_data, silver_data):
+    """
+    Join the gold and silver prices on Date and add their per-bar returns.
+    Prices keep their stored dtype (float32 or float64); returns are float64.
+    """
     # Combine the two datasets based on Date
-    combined_data = gold_data.join(silver_data, how='inner', lsuffix="_gold", rsuffix="_silver")
-    print("Combined data:")
-    print(combined_data.head())
+    with stage("join") as joined:
+        combined_data = gold_data.join(silver_data, how='inner', lsuffix="_gold", rsuffix="_silver")
+        joined.rows = len(combined_data)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Combined data:\n%s", combined_data.head())
 
-    # Calculate daily returns for both assets
-    combined_data['Gold Returns'] = combined_data['Price_gold'].pct_change()
-    combined_data['Silver Returns'] = combined_data['Price_silver'].pct_change()
+    # Calculate per-bar returns for both assets
+    combined_data['Gold Returns'] = combined_data['Price_gold'].astype(np.float64).pct_change()
+    combined_data['Silver Returns'] = combined_data['Price_silver'].astype(np.float64).pct_change()
 
     # Drop rows with NaN values caused by pct_change()
-    combined_data = combined_data.dropna()
+    return combined_data.dropna()
 
-    # Save cleaned and processed data to new CSV
-    combined_data.to_csv("data/processed_data.csv")
-    print("Processed data saved to data/processed_data.csv")
+@instrumented()
+def combine_legs(legs):
+    """
+    Join the prices of any number of legs on Date, the basket version of
+    combine_prices. legs maps a leg name to its price frame or to a ticker
+    to load from the price store, e.g. {"gold": "GC=F", "silver": "SI=F",
+    "platinum": "PL=F", "miners": "GDX"}. Each leg gets a 'Price_<name>'
+    column and a '<Name> Returns' column, as gold and silver do.
+    """
+    frames = {name: load_prices(data) if isinstance(data, str) else data for name, data in legs.items()}
+    with stage("join") as joined:
+        combined_data = pd.concat({f"Price_{name}": frame['Price'] for name, frame in frames.items()},
+                                  axis=1, join='inner')
+        joined.rows = len(combined_data)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Combined data:\n%s", combined_data.head())
+
+    for name in frames:
+        combined_data[f'{name.title()} Returns'] = combined_data[f'Price_{name}'].astype(np.float64).pct_change()
+    return combined_data.dropna()
+
+def analyze_data(plot=True, save_path=None, chunk_rows=None):
+    """
+    Load, clean, and visualize the gold and silver price data.
+
+    plot=False skips the chart. With save_path the chart is drawn headless
+    (Agg backend) and written to that file instead of opening a window.
+    With chunk_rows the join runs out of core, chunk_rows bars at a time (see
+    intraday.combine_prices_chunked), for histories too large for memory;
+    the chart then reads back only the two price columns.
+    """
+    if chunk_rows is not None:
+        from intraday import combine_prices_chunked
+        combine_prices_chunked("GC=F", "SI=F", chunk_rows=chunk_rows)
+        if not plot:
+            return None
+        combined_data = read_combined(columns=["Price_gold", "Price_silver"])
+        plot_prices(combined_data, save_path=save_path)
+        return combined_data
+
+    # Load and clean data
+    gold_data = load_prices("GC=F")
+    silver_data = load_prices("SI=F")
+    combined_data = combine_prices(gold_data, silver_data)
+
+    # Save cleaned and processed data to the price store
+    path = write_combined(combined_data)
+    logger.info("Processed data saved to %s", path)
+
+    if plot:
+        plot_prices(combined_data, save_path=save_path)
+    return combined_data
+
+def plot_prices(combined_data, save_path=None):
+    """
+    Plot gold and silver prices on twin y-axes.
+    """
+    plt = load_pyplot(headless=save_path is not None)
+    import matplotlib.dates as mdates
 
     # Visualize the price trends with a secondary y-axis
     fig, ax1 = plt.subplots(figsize=(10, 6))
@@ -80,8 +151,16 @@ def analyze_data():
     # Title and legend
     fig.suptitle("Gold vs Silver Prices")
     fig.tight_layout()
-    plt.show()
+    show_or_save(fig, save_path)
 
 
 if __name__ == "__main__":
-    analyze_data()
+    parser = argparse.ArgumentParser(description="Combine the gold and silver prices and plot them.")
+    parser.add_argument("--no-plot", action="store_true", help="skip the chart")
+    parser.add_argument("--save-plot", metavar="PATH", help="write the chart to PATH without opening a window")
+    parser.add_argument("--chunk-rows", type=int, metavar="N",
+                        help="join the prices out of core, N bars at a time (for intraday history)")
+    args = parser.parse_args()
+
+    configure_logging()
+    analyze_data(plot=not args.no_plot, save_path=args.save_plot, chunk_rows=args.chunk_rows)
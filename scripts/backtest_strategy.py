@@ -1,16 +1,44 @@
+import logging
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from instrumentation import configure_logging, instrumented
+from price_store import read_combined
 
+logger = logging.getLogger(__name__)
+
+@instrumented()
 def calculate_spread(df, scaling_factor=1):
     """
     Calculate the spread between Gold and Silver prices.
+
+    scaling_factor can be a fixed number or a time-varying hedge ratio, e.g.
+    the 'Hedge_Ratio' column from hedge_ratio.calculate_hedge_ratio. Prices
+    stored as float32 are widened to float64 first.
+    """
+    df['Spread'] = df['Price_gold'].astype(np.float64) - scaling_factor * df['Price_silver'].astype(np.float64)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Inside calculate_spread:\n%s", df.head())
+    return df
+
+@instrumented()
+def calculate_basket_spread(df, weights):
+    """
+    Calculate the spread of a basket of any number of legs: the sum of each
+    price column times its weight.
+
+    weights maps price columns to weights, e.g. johansen.basket_weights for
+    a Johansen cointegrating vector. {'Price_gold': 1, 'Price_silver': -k}
+    gives the same spread as calculate_spread with scaling_factor=k.
     """
-    df['Spread'] = df['Price_gold'] - scaling_factor * df['Price_silver']
-    print("Inside calculate_spread:")
-    print(df.head())
+    spread = 0.0
+    for column, weight in dict(weights).items():
+        spread = spread + weight * df[column].astype(np.float64)
+    df['Spread'] = spread
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Inside calculate_basket_spread:\n%s", df.head())
     return df
 
+@instrumented()
 def calculate_zscore(df, window=30):
     """
     Calculate the Z-score of the spread using a rolling mean and std dev.
@@ -20,9 +48,31 @@ def calculate_zscore(df, window=30):
     df['Z_Score'] = (df['Spread'] - df['Spread_Mean']) / df['Spread_Std']
     return df
     
-def backtest_strategy(df, z_entry=2, z_exit=0.5):
+def gate_entries(position, trade_enabled):
+    """
+    Only let positions be opened on bars where trade_enabled is True.
+
+    A position is a run of bars with the same signal. A run is entered on its
+    first enabled bar and then held until the signal changes, even if the
+    flag turns off meanwhile; exits are never blocked.
+    """
+    position = np.asarray(position)
+    enabled = np.asarray(trade_enabled, dtype=bool)
+    bars = np.arange(len(position))
+    run_start = np.maximum.accumulate(np.where(np.r_[True, position[1:] != position[:-1]], bars, 0))
+    last_enabled = np.maximum.accumulate(np.where(enabled, bars, -1))
+    return np.where(last_enabled >= run_start, position, 0)
+
+@instrumented()
+def backtest_strategy(df, z_entry=2, z_exit=0.5, costs=None, trade_enabled=None):
     """
     Backtest the mean reversion strategy based on Z-score thresholds.
+
+    With a costs.CostModel, trading and borrow costs are deducted into
+    'Net_Strategy_Return' and 'Net_Cumulative_Return' alongside the gross columns.
+    With trade_enabled (e.g. the 'Trade_Enabled' column from
+    cointegration_monitor.calculate_stability), positions are only opened
+    while the flag is True.
     """
     df['Position'] = 0  # Initialize position: 1 for Long, -1 for Short
     
@@ -31,27 +81,57 @@ def backtest_strategy(df, z_entry=2, z_exit=0.5):
     df.loc[df['Z_Score'] < -z_entry, 'Position'] = 1  # Long spread
     df.loc[abs(df['Z_Score']) < z_exit, 'Position'] = 0  # Exit position
 
+    if trade_enabled is not None:
+        df['Position'] = gate_entries(df['Position'].to_numpy(), trade_enabled)
+
     # Calculate strategy returns
     df['Strategy_Return'] = df['Position'].shift(1) * df['Spread'].pct_change()
     df['Cumulative_Return'] = (1 + df['Strategy_Return']).cumprod() - 1
+
+    if costs is not None:
+        df['Cost'] = costs.return_costs(df['Position'].to_numpy())
+        df['Net_Strategy_Return'] = df['Strategy_Return'] - df['Cost']
+        df['Net_Cumulative_Return'] = (1 + df['Net_Strategy_Return']).cumprod() - 1
     return df
 
-def calculate_performance_metrics(df):
+@instrumented()
+def calculate_performance_metrics(df, net=False, periods_per_year=252):
     """
-    Calculate performance metrics for the strategy.
+    Calculate performance metrics for the strategy, after costs if net=True.
+
+    periods_per_year annualizes the per-bar returns: 252 for daily bars, or
+    intraday.periods_per_year(interval) for minute and hourly bars.
     """
-    cumulative_return = df['Cumulative_Return'].iloc[-1]
-    annualized_return = df['Strategy_Return'].mean() * 252
-    annualized_volatility = df['Strategy_Return'].std() * np.sqrt(252)
+    prefix = "Net_" if net else ""
+    returns = df[f'{prefix}Strategy_Return']
+    cumulative = df[f'{prefix}Cumulative_Return']
+
+    cumulative_return = cumulative.iloc[-1]
+    annualized_return = returns.mean() * periods_per_year
+    annualized_volatility = returns.std() * np.sqrt(periods_per_year)
     sharpe_ratio = annualized_return / annualized_volatility
-    max_drawdown = (df['Cumulative_Return'].cummax() - df['Cumulative_Return']).max()
+    max_drawdown = (cumulative.cummax() - cumulative).max()
 
-    print("Performance Metrics:")
-    print(f"Cumulative Return: {cumulative_return:.2%}")
-    print(f"Annualized Return: {annualized_return:.2%}")
-    print(f"Annualized Volatility: {annualized_volatility:.2%}")
-    print(f"Sharpe Ratio: {sharpe_ratio:.2f}")
-    print(f"Max Drawdown: {max_drawdown:.2%}")
+    metrics = {
+        "Cumulative_Return": cumulative_return,
+        "Annualized_Return": annualized_return,
+        "Annualized_Volatility": annualized_volatility,
+        "Sharpe_Ratio": sharpe_ratio,
+        "Max_Drawdown": max_drawdown,
+    }
+    print_performance_metrics(metrics, net=net)
+    return metrics
+
+def print_performance_metrics(metrics, net=False):
+    """
+    Print a metrics dict as returned by calculate_performance_metrics.
+    """
+    print("Net Performance Metrics:" if net else "Performance Metrics:")
+    print(f"Cumulative Return: {metrics['Cumulative_Return']:.2%}")
+    print(f"Annualized Return: {metrics['Annualized_Return']:.2%}")
+    print(f"Annualized Volatility: {metrics['Annualized_Volatility']:.2%}")
+    print(f"Sharpe Ratio: {metrics['Sharpe_Ratio']:.2f}")
+    print(f"Max Drawdown: {metrics['Max_Drawdown']:.2%}")
 
 '''
 def plot_results(df):
@@ -90,57 +170,163 @@ def plot_results(df):
     plt.show()
 '''
 
-def simulate_trades(df, gold_units=1, silver_units=1, cash=100000):
+@instrumented()
+def simulate_trades(df, gold_units=1, silver_units=1, cash=100000, record_trades=False, costs=None):
     """
     Simulate trades based on the trading signal.
+
+    Each bar with signal 1 buys gold_units of gold and sells silver_units of
+    silver, signal -1 does the opposite, and signal 0 closes everything out.
+    Cash, holdings and portfolio value are computed with cumulative sums over
+    the price arrays instead of a row loop. With record_trades=True a ledger
+    of the bars where the holdings or cash changed is returned as well. With a
+    costs.CostModel, 'Trading_Costs' and 'Net_Portfolio_Value' are added.
     """
-    # Initialize portfolio variables
-    gold_position = 0  # Units of gold held
-    silver_position = 0  # Units of silver held
-    # cash = 100000
-
-    # Track portfolio value over time
-    portfolio_values = []
-
-    for index, row in df.iterrows():
-        signal = row['Position']
-        gold_price = row['Price_gold']
-        silver_price = row['Price_silver']
-
-        # Execute trades based on the signal
-        if signal == 1:  # Long spread: Buy Gold, Sell Silver
-            cash -= gold_price * gold_units
-            cash += silver_price * silver_units
-            gold_position += gold_units
-            silver_position -= silver_units
-        elif signal == -1:  # Short spread: Sell Gold, Buy Silver
-            cash += gold_price * gold_units
-            cash -= silver_price * silver_units
-            gold_position -= gold_units
-            silver_position += silver_units
-        elif signal == 0:  # Exit position
-            cash += gold_position * gold_price  # Sell all gold
-            cash += silver_position * silver_price  # Buy back all silver
-            gold_position = 0
-            silver_position = 0
-        
-        # Calculate portfolio value
-        portfolio_value = cash + (gold_position * gold_price) + (silver_position * silver_price)
-        portfolio_values.append(portfolio_value)
-        print(f"Date: {index}, Signal: {signal}, Cash: {cash:.2f}, Gold Position: {gold_position}, Silver Position: {silver_position}, Portfolio Value: {portfolio_value:.2f}")
-    
+    signal = df['Position'].to_numpy(dtype=np.float64)
+    gold_price = df['Price_gold'].to_numpy(dtype=np.float64)
+    silver_price = df['Price_silver'].to_numpy(dtype=np.float64)
+    n = len(df)
+
+    is_long = signal == 1
+    is_short = signal == -1
+    is_exit = signal == 0
+    direction = is_long.astype(np.int64) - is_short.astype(np.int64)
+
+    # Holdings are a running sum of unit changes that resets on every exit bar
+    gold_change = np.cumsum(direction * gold_units)
+    silver_change = np.cumsum(-direction * silver_units)
+    last_exit = np.where(is_exit, np.arange(n), -1)
+    np.maximum.accumulate(last_exit, out=last_exit)
+    has_exit = last_exit >= 0
+    gold_position = gold_change - np.where(has_exit, gold_change[last_exit], 0)
+    silver_position = silver_change - np.where(has_exit, silver_change[last_exit], 0)
+
+    # Positions held going into each bar, liquidated on exit bars
+    gold_before = np.concatenate(([0], gold_position[:-1]))
+    silver_before = np.concatenate(([0], silver_position[:-1]))
+
+    # Two cash flows per bar (gold leg, then silver leg), summed in the same
+    # order as the bar-by-bar loop so the totals match it exactly
+    flows = np.zeros((n, 2))
+    flows[:, 0] = np.where(is_exit, gold_before * gold_price, -direction * (gold_price * gold_units))
+    flows[:, 1] = np.where(is_exit, silver_before * silver_price, direction * (silver_price * silver_units))
+    flows[~(is_long | is_short | is_exit)] = 0
+    running_cash = np.cumsum(np.concatenate(([cash], flows.ravel())))
+    cash_values = running_cash[2::2]
+
+    portfolio_values = cash_values + (gold_position * gold_price) + (silver_position * silver_price)
+
     # Add portfolio values to the dataframe
     df['Portfolio_Value'] = portfolio_values
-    print(f"Final portfolio value: ${portfolio_value:.2f}")
-    return df
+    if n:
+        print(f"Final portfolio value: ${portfolio_values[-1]:.2f}")
+
+    if costs is not None:
+        trading_costs = costs.dollar_costs(gold_position, silver_position, gold_price, silver_price)
+        df['Trading_Costs'] = trading_costs
+        df['Net_Portfolio_Value'] = portfolio_values - np.cumsum(trading_costs)
+        if n:
+            print(f"Final portfolio value after costs: ${df['Net_Portfolio_Value'].iloc[-1]:.2f}")
+
+    if not record_trades:
+        return df
+
+    # Only keep the bars where something changed
+    changed = (flows != 0).any(axis=1)
+    trades = pd.DataFrame({
+        'Signal': df['Position'].to_numpy(),
+        'Cash': cash_values,
+        'Gold_Position': gold_position,
+        'Silver_Position': silver_position,
+        'Portfolio_Value': portfolio_values,
+    }, index=df.index)
+    if costs is not None:
+        trades['Net_Portfolio_Value'] = df['Net_Portfolio_Value'].to_numpy()
+    trades = trades[changed]
+    return df, trades
+
+def _leg_name(column):
+    # 'Price_gold' -> 'Gold', the naming of simulate_trades' ledger columns
+    return column.removeprefix('Price_').title()
+
+@instrumented()
+def simulate_basket_trades(df, units, cash=100000, record_trades=False, costs=None):
+    """
+    Simulate trades of a basket of any number of legs based on the trading signal.
+
+    units maps price columns to signed units per signal: each bar with signal
+    1 adds those units to the holdings (buying the positive legs and selling
+    the negative ones), signal -1 subtracts them, and signal 0 closes
+    everything out. With units {'Price_gold': g, 'Price_silver': -s} this is
+    simulate_trades with gold_units=g and silver_units=s, to the cent. The
+    ledger and cost columns are those of simulate_trades, with one
+    '<Leg>_Position' column per leg.
+    """
+    units = dict(units)
+    columns = list(units)
+    signal = df['Position'].to_numpy(dtype=np.float64)
+    prices = np.column_stack([df[column].to_numpy(dtype=np.float64) for column in columns])
+    n, legs = prices.shape
+
+    is_long = signal == 1
+    is_short = signal == -1
+    is_exit = signal == 0
+    direction = is_long.astype(np.int64) - is_short.astype(np.int64)
+
+    # Holdings are a running sum of unit changes that resets on every exit bar
+    change = np.cumsum(direction[:, None] * np.array([units[column] for column in columns]), axis=0)
+    last_exit = np.where(is_exit, np.arange(n), -1)
+    np.maximum.accumulate(last_exit, out=last_exit)
+    has_exit = last_exit >= 0
+    positions = change - np.where(has_exit[:, None], change[last_exit], 0)
+    before = np.concatenate((np.zeros((1, legs)), positions[:-1]))
+
+    # One cash flow per leg and bar, summed leg by leg in bar order
+    flows = np.zeros((n, legs))
+    for leg, column in enumerate(columns):
+        flows[:, leg] = np.where(is_exit, before[:, leg] * prices[:, leg],
+                                 -direction * (prices[:, leg] * units[column]))
+    flows[~(is_long | is_short | is_exit)] = 0
+    running_cash = np.cumsum(np.concatenate(([cash], flows.ravel())))
+    cash_values = running_cash[legs::legs]
+
+    portfolio_values = cash_values
+    for leg in range(legs):
+        portfolio_values = portfolio_values + (positions[:, leg] * prices[:, leg])
+
+    df['Portfolio_Value'] = portfolio_values
+    if n:
+        print(f"Final portfolio value: ${portfolio_values[-1]:.2f}")
+
+    if costs is not None:
+        trading_costs = costs.leg_dollar_costs(positions, prices)
+        df['Trading_Costs'] = trading_costs
+        df['Net_Portfolio_Value'] = portfolio_values - np.cumsum(trading_costs)
+        if n:
+            print(f"Final portfolio value after costs: ${df['Net_Portfolio_Value'].iloc[-1]:.2f}")
+
+    if not record_trades:
+        return df
+
+    changed = (flows != 0).any(axis=1)
+    trades = pd.DataFrame({'Signal': df['Position'].to_numpy(), 'Cash': cash_values}, index=df.index)
+    for leg, column in enumerate(columns):
+        trades[f'{_leg_name(column)}_Position'] = positions[:, leg]
+    trades['Portfolio_Value'] = portfolio_values
+    if costs is not None:
+        trades['Net_Portfolio_Value'] = df['Net_Portfolio_Value'].to_numpy()
+    trades = trades[changed]
+    return df, trades
 
 if __name__ == "__main__":
+    configure_logging()
+
     # Load the cleaned and combined data
-    df = pd.read_csv("data/processed_data.csv", index_col="Date", parse_dates=True)
+    df = read_combined(columns=["Price_gold", "Price_silver"])
 
-    # Calculate spread and Z-score
-    df = calculate_spread(df, scaling_factor=1)
-    df = calculate_zscore(df, window=30)
+    # Calculate spread and Z-score, reusing the last run's if the data hasn't changed
+    from feature_cache import FeatureCache, cached_zscore
+    df = cached_zscore(df, scaling_factor=1, window=30, cache=FeatureCache())
 
     # Backtest strategy
     df = backtest_strategy(df, z_entry=2, z_exit=0.5)
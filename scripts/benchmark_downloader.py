@@ -0,0 +1,67 @@
+import datetime
+import logging
+import tempfile
+import threading
+import time
+from benchmark_incremental_fetch import FakeDownloader
+from fetch_data import REPORT_COLUMNS, RateLimitError, fetch_stock_data, fetch_universe
+
+
+class FlakyDownloader(FakeDownloader):
+    """
+    Fake provider with a fixed per-request latency that fails the first
+    request for some tickers, rate-limits others once, and always fails a few.
+    """
+
+    def __init__(self, latency=0.05):
+        super().__init__(seconds_per_row=0.0)
+        self.latency = latency
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def download(self, ticker, start, end):
+        time.sleep(self.latency)
+        with self._lock:
+            first_try = ticker not in self._seen
+            self._seen.add(ticker)
+        number = int(ticker[1:])
+        if number % 50 == 49:
+            raise ConnectionError(f"{ticker}: no such symbol")
+        if first_try and number % 10 == 3:
+            raise TimeoutError(f"{ticker}: timed out")
+        if first_try and number % 25 == 7:
+            raise RateLimitError("Too many requests")
+        return super().download(ticker, start, end)
+
+
+if __name__ == "__main__":
+    tickers = [f"T{k:03d}" for k in range(200)]
+    today = datetime.date(2026, 10, 16)
+
+    for workers in [1, 16, 32]:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            report = fetch_universe(tickers, save_dir=tmp, downloader=FlakyDownloader(), max_workers=workers,
+                                    retries=2, backoff=0.05, today=today)
+            elapsed = time.perf_counter() - start
+        ok = (report["Status"] == "ok").sum()
+        print(f"RESULT {workers:>3} workers: {elapsed:6.2f}s, {len(tickers) / elapsed:6.1f} symbols/s, "
+              f"{ok} ok, {len(report) - ok} failed")
+
+    # An empty universe gives an empty report with the usual columns
+    report = fetch_universe([], downloader=FlakyDownloader())
+    assert report.empty and list(report.columns) == REPORT_COLUMNS
+
+    # A pair with a ticker that always fails is reported as a warning, not as saved
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("fetch_data")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        fetch_stock_data("T001", "T049", save_dir=tmp, downloader=FlakyDownloader(latency=0))
+    messages = [(r.levelno, r.getMessage()) for r in records]
+    assert any(level == logging.WARNING and "Could not update T049" in m for level, m in messages), messages
+    assert not any(m.startswith("Data saved") for _, m in messages), messages
+    print("Empty universe and failed tickers are reported correctly")
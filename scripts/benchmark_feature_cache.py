@@ -0,0 +1,86 @@
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from backtest_strategy import calculate_spread, calculate_zscore
+from feature_cache import FeatureCache, cached_zscore, FEATURE_COLUMNS
+from synthetic_data import cointegrated_pair
+
+
+def best_time(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    n = 1_000_000
+    prices = cointegrated_pair(n, interval="1m")
+    expected = calculate_zscore(calculate_spread(prices.copy(), scaling_factor=70), window=60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, "features")
+
+        cache = FeatureCache(cache_dir=cache_dir)
+        start = time.perf_counter()
+        first = cached_zscore(prices.copy(), scaling_factor=70, window=60, cache=cache)
+        miss = time.perf_counter() - start
+        pd.testing.assert_frame_equal(first, expected)
+
+        recompute = best_time(lambda: calculate_zscore(calculate_spread(prices.copy(), scaling_factor=70), window=60))
+        memory_hit = best_time(lambda: cached_zscore(prices.copy(), scaling_factor=70, window=60, cache=cache))
+        # A new process: only the disk tier is warm
+        disk_hit = best_time(lambda: cached_zscore(prices.copy(), scaling_factor=70, window=60,
+                                                   cache=FeatureCache(cache_dir=cache_dir)))
+        copy_only = best_time(lambda: prices.copy())
+        pd.testing.assert_frame_equal(cached_zscore(prices.copy(), scaling_factor=70, window=60,
+                                                    cache=FeatureCache(cache_dir=cache_dir)), expected)
+        print(f"{n:,} bars: recompute {recompute * 1e3:.1f} ms, first call {miss * 1e3:.1f} ms, "
+              f"memory hit {memory_hit * 1e3:.1f} ms, disk hit {disk_hit * 1e3:.1f} ms "
+              f"(frame copy alone {copy_only * 1e3:.1f} ms)")
+
+        # Different parameters or prices are different entries
+        cached_zscore(prices.copy(), scaling_factor=70, window=30, cache=cache)
+        shifted = prices.copy()
+        shifted.iloc[-1, 0] += 1.0
+        cached_zscore(shifted, scaling_factor=70, window=60, cache=cache)
+        assert cache.stats["misses"] == 3, cache.stats
+
+        # A time-varying hedge ratio is part of the key too
+        ratio = pd.Series(np.linspace(69, 71, n), index=prices.index)
+        varying = cached_zscore(prices.copy(), scaling_factor=ratio, window=60, cache=cache)
+        pd.testing.assert_frame_equal(varying, calculate_zscore(calculate_spread(prices.copy(), scaling_factor=ratio),
+                                                                window=60))
+        assert cache.stats["misses"] == 4
+
+        # Nothing watches the price files: the same prices from a fresh load or a new
+        # process are still served from the cache
+        reloaded = prices.copy(deep=True)
+        cached_zscore(reloaded, scaling_factor=70, window=60, cache=cache)
+        assert cache.stats["misses"] == 4 and cache.stats["memory_hits"] >= 1, cache.stats
+        fresh = FeatureCache(cache_dir=cache_dir)
+        cached_zscore(prices.copy(), scaling_factor=70, window=60, cache=fresh)
+        assert fresh.stats["disk_hits"] == 1, fresh.stats
+        cache.print_stats()
+
+        # Size-based eviction: least recently used entries go first on both tiers
+        entry_bytes = len(FEATURE_COLUMNS) * 8 * 10_000
+        small = FeatureCache(cache_dir=os.path.join(tmp, "small"),
+                             max_memory_bytes=2 * entry_bytes, max_disk_bytes=3 * entry_bytes + 1024)
+        sample = prices.iloc[:10_000]
+        for window in [10, 20, 30]:
+            cached_zscore(sample.copy(), window=window, cache=small)
+        cached_zscore(sample.copy(), window=10, cache=small)  # from disk, now the most recently used
+        cached_zscore(sample.copy(), window=40, cache=small)  # pushes out window 20
+        assert small.stats["disk_hits"] == 1 and small.stats["disk_evictions"] == 1, small.stats
+        assert small.stats["memory_evictions"] == 3, small.stats
+        assert small.disk_bytes() <= small.max_disk_bytes
+        later = FeatureCache(cache_dir=os.path.join(tmp, "small"))
+        for window in [10, 30, 40, 20]:
+            cached_zscore(sample.copy(), window=window, cache=later)
+        assert later.stats["disk_hits"] == 3 and later.stats["misses"] == 1, later.stats
+        small.print_stats()
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+
+# Modules the core backtest must not pull in until a plot or download is asked for
+HEAVY_MODULES = ["matplotlib", "yfinance", "statsmodels", "curl_cffi"]
+IMPORT_BUDGET = 1.0  # seconds, including interpreter start-up
+
+
+def time_import(module, repeat=5):
+    """
+    Best-of-N wall time to start a fresh interpreter and import module, plus
+    which of HEAVY_MODULES ended up loaded.
+    """
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(elapsed, ','.join(loaded))\n"
+    )
+    best, loaded = float("inf"), ""
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+        best = min(best, float(output[0]))
+        loaded = output[1] if len(output) > 1 else ""
+    return best, loaded
+
+
+if __name__ == "__main__":
+    for module in ["backtest_strategy", "pipeline", "fetch_data"]:
+        elapsed, loaded = time_import(module)
+        print(f"import {module}: {elapsed:.3f}s")
+        assert not loaded, f"{module} imports {loaded} at startup"
+        assert elapsed < IMPORT_BUDGET, f"{module} took {elapsed:.3f}s to import (budget {IMPORT_BUDGET}s)"
+    print("No plotting, network or statsmodels modules imported, within budget")
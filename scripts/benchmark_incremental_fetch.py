@@ -0,0 +1,51 @@
+import datetime
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import fetch_data
+from fetch_data import update_ticker
+from price_store import read_ticker
+
+
+class FakeDownloader:
+    """
+    Stand-in for YahooDownloader that generates business-day bars locally and
+    sleeps in proportion to the number of rows, like a network transfer would.
+    """
+
+    def __init__(self, seconds_per_row=20e-6):
+        self.seconds_per_row = seconds_per_row
+        self.rows_served = 0
+
+    def download(self, ticker, start, end):
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        close = 1800 + np.arange(len(dates)) * 0.1
+        time.sleep(len(dates) * self.seconds_per_row)
+        self.rows_served += len(dates)
+        return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1.0}, index=dates)
+
+
+if __name__ == "__main__":
+    fetch_data.HISTORY_DAYS = 40 * 365  # long history so the full download is noticeable
+    today = datetime.date(2026, 10, 16)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        downloader = FakeDownloader()
+        start = time.perf_counter()
+        update_ticker("GC=F", downloader, save_dir=tmp, today=today - datetime.timedelta(days=1))
+        full = time.perf_counter() - start
+        full_rows = downloader.rows_served
+
+        downloader = FakeDownloader()
+        start = time.perf_counter()
+        update_ticker("GC=F", downloader, save_dir=tmp, today=today)
+        incremental = time.perf_counter() - start
+
+        stored = read_ticker("GC=F", store_dir=tmp)
+        assert stored.index.is_unique and stored.index.is_monotonic_increasing
+        assert stored.index[-1] == pd.Timestamp(today)
+
+        print(f"Full history:   {full_rows:>6} rows downloaded in {full:.3f}s")
+        print(f"Incremental:    {downloader.rows_served:>6} rows downloaded in {incremental:.3f}s")
+        print(f"Stored rows:    {len(stored)}")
@@ -0,0 +1,79 @@
+import contextlib
+import io
+import timeit
+import numpy as np
+import pandas as pd
+import instrumentation
+from instrumentation import instrumented, stage, profiling
+from backtest_strategy import calculate_spread, calculate_zscore, backtest_strategy, calculate_performance_metrics
+
+
+def make_pair(n, seed=0):
+    rng = np.random.default_rng(seed)
+    silver = 25 + np.cumsum(0.01 * rng.standard_normal(n))
+    gold = 70 * silver + 500 + rng.standard_normal(n)
+    return pd.DataFrame({"Price_gold": gold, "Price_silver": silver},
+                        index=pd.date_range("2000-01-03", periods=n, freq="min", name="Date"))
+
+
+def run_stages(df):
+    df = calculate_spread(df, scaling_factor=70)
+    df = calculate_zscore(df, window=30)
+    df = backtest_strategy(df)
+    return calculate_performance_metrics(df)
+
+
+def plain(x):
+    return x
+
+
+@instrumented()
+def wrapped(x):
+    return x
+
+
+def with_stage(x):
+    with stage("block") as s:
+        s.rows = 1
+    return x
+
+
+if __name__ == "__main__":
+    assert instrumentation.active_profiler() is None
+    calls = 1_000_000
+    base = min(timeit.repeat(lambda: plain(1), number=calls, repeat=5)) / calls
+    off = min(timeit.repeat(lambda: wrapped(1), number=calls, repeat=5)) / calls
+    block = min(timeit.repeat(lambda: with_stage(1), number=calls, repeat=5)) / calls
+    print(f"Disabled overhead per call: decorator {(off - base) * 1e9:.0f} ns, stage block {(block - base) * 1e9:.0f} ns")
+
+    # The old unconditional print(df.head()) in calculate_spread, against the
+    # debug-level log call that replaces it
+    df = make_pair(1_000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        printed = min(timeit.repeat(lambda: print(df.head()), number=200, repeat=3)) / 200
+    print(f"print(df.head()) cost {printed * 1e3:.2f} ms per call, now skipped unless logging at DEBUG")
+
+    for n in [100_000, 1_000_000]:
+        df = make_pair(n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            disabled = min(timeit.repeat(lambda: run_stages(df.copy()), number=1, repeat=3))
+            with profiling(memory="rss") as profiler:
+                enabled = min(timeit.repeat(lambda: run_stages(df.copy()), number=1, repeat=3))
+        stages = profiler.report()["stages"]
+        assert set(stages) == {"calculate_spread", "calculate_zscore", "backtest_strategy",
+                               "calculate_performance_metrics"}
+        assert stages["backtest_strategy"]["rows"] == 3 * n
+        print(f"{n:>9,} rows: stages {disabled:.3f}s disabled, {enabled:.3f}s profiled (rss)")
+    profiler.print_report()
+
+    # Nested stages: the outer peak covers the inner one
+    with profiling(memory="tracemalloc") as profiler:
+        with stage("outer"):
+            with stage("inner"):
+                block = np.ones(10_000_000)
+            del block
+    stages = profiler.report()["stages"]
+    assert stages["inner"]["peak_memory_mb"] >= 76
+    assert stages["outer"]["peak_memory_mb"] >= stages["inner"]["peak_memory_mb"]
+    print(f"tracemalloc peaks: inner {stages['inner']['peak_memory_mb']:.0f} MB, "
+          f"outer {stages['outer']['peak_memory_mb']:.0f} MB")
@@ -0,0 +1,173 @@
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from price_store import write_ticker, read_combined, iter_combined, read_ticker, write_combined_chunks
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BARS_PER_DAY = 23 * 60
+CHUNK_ROWS = 100_000
+
+
+def write_minute_store(years, seed=0):
+    """
+    Fill data/store in the current directory with cointegrated 1-minute
+    GC=F/SI=F bars, each ticker missing a different ~1% of the minutes.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range("2020-01-01", periods=int(252 * years))
+    minutes = pd.to_timedelta(np.arange(BARS_PER_DAY), unit="min")
+    index = (days.values[:, None] + minutes.values[None, :]).ravel()
+    n = len(index)
+    factor = 2e-4 * rng.standard_normal(n).cumsum()
+    for ticker, base, noise in [("GC=F", 1800, 2e-4), ("SI=F", 25, 4e-4)]:
+        close = np.round(base * np.exp(factor + noise * rng.standard_normal(n)), 2)
+        keep = rng.random(n) > 0.01
+        frame = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close,
+                              "Volume": rng.integers(0, 500, size=n).astype(np.float64)},
+                             index=pd.DatetimeIndex(index, name="Date"))
+        write_ticker(frame[keep], ticker, compact=True)
+    return n
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process. VmHWM starts afresh on exec, unlike
+    ru_maxrss, which a subprocess inherits from the parent at fork time.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def run_stage(mode):
+    """
+    Run one mode in this process and return its timing, metrics and peak RSS.
+    """
+    from intraday import periods_per_year, run_intraday_pipeline
+    from pipeline import load_pair
+    from analyze_data import combine_prices
+    from backtest_strategy import calculate_spread, calculate_zscore, backtest_strategy, \
+        calculate_performance_metrics
+
+    start = time.perf_counter()
+    metrics = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "memory":
+            df = load_pair()
+            df = calculate_spread(df)
+            df = calculate_zscore(df)
+            df = backtest_strategy(df)
+            metrics = calculate_performance_metrics(df, periods_per_year=periods_per_year("1m"))
+        elif mode == "default":
+            metrics = run_intraday_pipeline(interval="1m", chunk_rows=CHUNK_ROWS).metrics
+        elif mode == "chunked":
+            metrics = run_intraday_pipeline(interval="1m", chunk_rows=CHUNK_ROWS, in_memory_rows=0).metrics
+    elapsed = time.perf_counter() - start
+    return {"mode": mode, "seconds": elapsed, "peak_rss_mb": peak_rss_mb(),
+            "metrics": {k: float(v) for k, v in (metrics or {}).items()}}
+
+
+def measure(mode, cwd):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), mode], cwd=cwd, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_chunked_matches(cwd):
+    """
+    The chunked join, rolling stats and metrics must agree with the in-memory path.
+    """
+    from analyze_data import combine_prices, load_prices
+    from backtest_strategy import calculate_spread, calculate_zscore
+    from intraday import combine_prices_chunked, zscore_chunks
+
+    os.chdir(cwd)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = combine_prices(load_prices("GC=F"), load_prices("SI=F"))
+        combine_prices_chunked(chunk_rows=CHUNK_ROWS)
+        combined = read_combined()
+        expected_z = calculate_zscore(calculate_spread(expected.copy()))
+    pd.testing.assert_frame_equal(combined, expected, check_freq=False)
+    z = pd.concat(zscore_chunks(iter_combined(columns=["Price_gold", "Price_silver"], chunk_rows=CHUNK_ROWS)))
+    np.testing.assert_allclose(z['Z_Score'], expected_z['Z_Score'], rtol=1e-7, atol=1e-9)
+    dtypes = read_ticker("GC=F").dtypes
+    print(f"Stored dtypes: {dict(dtypes.astype(str))}")
+
+
+def check_mixed_chunks(cwd):
+    """
+    A ticker whose later closes need float64 is combined as float64 throughout,
+    even though its first chunks would fit in float32, and a chunk stream
+    whose dtypes change part-way is refused rather than silently cast.
+    """
+    from analyze_data import combine_prices, load_prices
+    from intraday import combine_prices_chunked
+
+    os.chdir(cwd)
+    index = pd.date_range("2020-01-01", periods=1_000, freq="min", name="Date")
+    close = np.round(np.linspace(1800, 1900, len(index)), 2)
+    close[-10:] = 123456789.123  # float32 would round these to 123456792
+    for ticker, prices in [("GC=F", close), ("SI=F", close / 70)]:
+        write_ticker(pd.DataFrame({"Close": prices}, index=index), ticker, compact=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = combine_prices(load_prices("GC=F"), load_prices("SI=F"))
+        combine_prices_chunked(chunk_rows=100)
+    combined = read_combined()
+    assert combined["Price_gold"].dtype == np.float64, combined.dtypes
+    pd.testing.assert_frame_equal(combined, expected, check_freq=False)
+
+    chunks = [expected.iloc[:500].astype({"Price_gold": np.float32}), expected.iloc[500:]]
+    try:
+        write_combined_chunks(chunks)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("write_combined_chunks should refuse a chunk with a different schema")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(json.dumps(run_stage(sys.argv[1])))
+        sys.exit(0)
+
+    for years in [1, 3, 6]:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            n = write_minute_store(years)
+            if years == 1:
+                check_chunked_matches(tmp)
+
+            baseline = measure("imports", tmp)
+            memory = measure("memory", tmp)
+            chunked = measure("chunked", tmp)
+            default = measure("default", tmp)
+            for result in [chunked, default]:
+                for key, value in memory["metrics"].items():
+                    assert np.isclose(value, result["metrics"][key], rtol=1e-6, atol=1e-12), \
+                        (result["mode"], key, value, result["metrics"][key])
+
+            print(f"{years} year(s) of 1-minute bars ({n:,} per ticker):")
+            print(f"   imports only:         peak RSS {baseline['peak_rss_mb']:7.1f} MB")
+            for result in [memory, chunked, default]:
+                print(f"   {result['mode']:<8} pipeline:     peak RSS {result['peak_rss_mb']:7.1f} MB, "
+                      f"{result['seconds']:.2f}s")
+            os.chdir(SCRIPTS_DIR)
+    print("Chunked metrics match the in-memory pipeline")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_mixed_chunks(tmp)
+        os.chdir(SCRIPTS_DIR)
+    print("A ticker that needs float64 part-way through is combined as float64")
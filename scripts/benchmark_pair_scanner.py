@@ -0,0 +1,34 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from pair_scanner import scan_pairs
+
+
+def make_panel(n_series, n_bars, n_factors=5, seed=0):
+    """
+    Synthetic panel of log-price series driven by a handful of random-walk
+    factors, so series loading on the same factor are cointegrated.
+    """
+    rng = np.random.default_rng(seed)
+    factors = rng.standard_normal((n_bars, n_factors)).cumsum(axis=0)
+    loadings = rng.integers(0, n_factors, size=n_series)
+    noise = rng.standard_normal((n_bars, n_series))
+    prices = 100 + factors[:, loadings] * rng.uniform(0.5, 2.0, size=n_series) + noise
+    columns = [f"S{k:03d}" for k in range(n_series)]
+    return pd.DataFrame(prices, index=pd.bdate_range("2020-01-01", periods=n_bars), columns=columns)
+
+
+if __name__ == "__main__":
+    panel = make_panel(n_series=60, n_bars=750)
+    print(f"Panel: {panel.shape[1]} series x {panel.shape[0]} bars")
+
+    baseline = None
+    for workers in sorted({1, 2, 4, os.cpu_count()}):
+        start = time.perf_counter()
+        results = scan_pairs(panel, workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>3} workers: {elapsed:6.2f}s  speedup {baseline / elapsed:4.2f}x")
+
+    print(results.head(10).to_string(index=False))
@@ -0,0 +1,121 @@
+import asyncio
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from backtest_strategy import calculate_spread, calculate_zscore, backtest_strategy, simulate_trades
+from costs import CostModel
+from paper_trading import (ReplayFeed, SpreadSignal, SimulatedBroker, PaperTradingEngine, load_replay_frame,
+                           print_latency)
+from price_store import write_combined, write_ticker
+
+
+def make_pair(n, seed=0):
+    """
+    Daily gold/silver-like closes with a mean-reverting spread.
+    """
+    rng = np.random.default_rng(seed)
+    silver = 25 + np.cumsum(0.3 * rng.standard_normal(n))
+    noise = np.zeros(n)
+    shocks = rng.standard_normal(n)
+    for t in range(1, n):
+        noise[t] = 0.9 * noise[t - 1] + 5 * shocks[t]
+    gold = 70 * silver + 50 + noise
+    return pd.DataFrame({"Price_gold": gold, "Price_silver": silver},
+                        index=pd.bdate_range("2000-01-03", periods=n, name="Date"))
+
+
+def paper_trade(df, costs=None, speed=None, fill_delay=0.0):
+    engine = PaperTradingEngine(ReplayFeed(df, speed=speed),
+                                SimulatedBroker(cash=100000, costs=costs, fill_delay=fill_delay),
+                                SpreadSignal(scaling_factor=70, window=30, z_entry=1.5, z_exit=0.5),
+                                gold_units=2, silver_units=3)
+    return asyncio.run(engine.run())
+
+
+if __name__ == "__main__":
+    df = make_pair(5_000)
+    costs = CostModel(commission=0.5, commission_bps=1, slippage_bps=2, spread_bps=1, borrow_rate=0.03)
+
+    # The engine agrees with the batch path bar by bar
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch = backtest_strategy(calculate_zscore(calculate_spread(df.copy(), scaling_factor=70), window=30),
+                                  z_entry=1.5, z_exit=0.5)
+        batch, trades = simulate_trades(batch, gold_units=2, silver_units=3, record_trades=True, costs=costs)
+    start = time.perf_counter()
+    result = paper_trade(df, costs=costs)
+    elapsed = time.perf_counter() - start
+
+    bars = result.bars
+    np.testing.assert_allclose(bars['Z_Score'], batch['Z_Score'], rtol=1e-7, atol=1e-9, equal_nan=True)
+    assert (bars['Position'].to_numpy() == batch['Position'].to_numpy()).all()
+    assert (bars['Portfolio_Value'].to_numpy() == batch['Portfolio_Value'].to_numpy()).all()
+    np.testing.assert_allclose(bars['Net_Portfolio_Value'], batch['Net_Portfolio_Value'], rtol=1e-12)
+    assert result.fills.index.equals(trades.index)
+    print(f"Paper trading matches backtest_strategy + simulate_trades on {len(df)} bars "
+          f"({len(result.fills)} fills, {len(df) / elapsed:,.0f} bars/s)")
+    print_latency(result.latency)
+
+    # Missing prices blank the Z-score only until they leave the window, as in the batch path
+    gappy = df.copy()
+    gappy.iloc[[100, 101, 2_000], 0] = np.nan
+    gappy.iloc[3_500, 1] = np.nan
+    batch = backtest_strategy(calculate_zscore(calculate_spread(gappy.copy(), scaling_factor=70), window=30),
+                              z_entry=1.5, z_exit=0.5)
+    bars = paper_trade(gappy).bars
+    np.testing.assert_allclose(bars['Z_Score'], batch['Z_Score'], rtol=1e-7, atol=1e-9, equal_nan=True)
+    assert (bars['Position'].to_numpy() == batch['Position'].to_numpy()).all()
+    assert bars['Z_Score'].iloc[-100:].notna().all()
+
+    # A long session stays on the batch Z-scores (the sums are rebuilt every 10,000 bars)
+    long = make_pair(200_000, seed=1)
+    signal = SpreadSignal(scaling_factor=70, window=30, z_entry=1.5, z_exit=0.5)
+    z = np.array([signal.update(g, s)[1] for g, s in long.to_numpy()])
+    expected = calculate_zscore(calculate_spread(long.copy(), scaling_factor=70), window=30)['Z_Score']
+    np.testing.assert_allclose(z, expected, rtol=1e-7, atol=1e-9, equal_nan=True)
+    print(f"SpreadSignal recovers from missing prices and matches the batch Z-score over {len(long):,} bars")
+
+    # A simulated 2 ms venue round trip: order-to-fill shows the delay, and
+    # tick-to-order the time bars then wait in the queue behind the fills
+    delayed = paper_trade(df.iloc[:300], fill_delay=0.002)
+    print("With a 2 ms fill delay:")
+    print_latency(delayed.latency)
+    print(delayed.latency["order_to_fill"].to_frame().to_string(index=False))
+
+    # Paced replay: 100 daily bars at 50 days per second take about two seconds
+    sample = df.iloc[:100]
+    market_seconds = (sample.index[-1] - sample.index[0]).total_seconds()
+    start = time.perf_counter()
+    paper_trade(sample, speed=50 * 86400)
+    elapsed = time.perf_counter() - start
+    print(f"Paced replay: {market_seconds / 86400:.0f} market days in {elapsed:.2f}s "
+          f"(expected {market_seconds / 86400 / 50:.2f}s)")
+
+    # CSV replay: a combined file is read as is
+    with tempfile.TemporaryDirectory() as tmp:
+        df.to_csv(os.path.join(tmp, "processed_data.csv"))
+        pd.testing.assert_frame_equal(load_replay_frame(os.path.join(tmp, "*.csv")), df, check_freq=False)
+        print("load_replay_frame reads data/processed_data.csv-style files")
+
+        # Without paths the replay comes from the combined frame in the price store
+        store_dir = os.path.join(tmp, "store")
+        write_combined(df.assign(**{"Gold Returns": 0.0, "Silver Returns": 0.0}), store_dir=store_dir)
+        pd.testing.assert_frame_equal(load_replay_frame(store_dir=store_dir), df, check_freq=False)
+        print("load_replay_frame defaults to the price store")
+
+        # A store with only the ticker files fetch_data writes: the tickers are joined as load_pair does
+        # (dropping the first bar, which has no returns), and main.py --paper-trade runs on it
+        store_dir = os.path.join(tmp, "tickers", "data", "store")
+        for ticker, column in [("GC=F", "Price_gold"), ("SI=F", "Price_silver")]:
+            write_ticker(df[[column]].rename(columns={column: "Close"}), ticker, store_dir=store_dir)
+        pd.testing.assert_frame_equal(load_replay_frame(store_dir=store_dir), df.iloc[1:], check_freq=False)
+        main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "main.py")
+        output = subprocess.run([sys.executable, main, "--paper-trade"], cwd=os.path.join(tmp, "tickers"),
+                                check=True, capture_output=True, text=True).stdout
+        assert f"Paper traded {len(df) - 1} bars" in output, output
+        print("...and to the ticker files when there is no combined frame")
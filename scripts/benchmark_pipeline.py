@@ -0,0 +1,66 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from price_store import write_ticker, write_combined
+from analyze_data import combine_prices
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPTS_DIR)
+
+
+def write_synthetic_store(n=756, seed=0):
+    """
+    Fill data/store in the current directory with synthetic GC=F/SI=F bars.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2022-01-03", periods=n, name="Date")
+    factor = 0.01 * rng.standard_normal(n).cumsum()
+    prices = {}
+    for ticker, base, noise in [("GC=F", 1800, 0.005), ("SI=F", 25, 0.01)]:
+        close = base * np.exp(factor + noise * rng.standard_normal(n))
+        frame = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 0.0}, index=dates)
+        write_ticker(frame, ticker)
+        prices[ticker] = frame[["Close"]].rename(columns={"Close": "Price"})
+    write_combined(combine_prices(prices["GC=F"], prices["SI=F"]))
+
+
+def run(command, cwd):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL, env={**os.environ, "MPLBACKEND": "Agg"})
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_synthetic_store()
+
+        # Old flow: main.py shelled out to one interpreter per stage
+        old = min(
+            run([sys.executable, os.path.join(SCRIPTS_DIR, "test_cointegration.py")], tmp)
+            + run([sys.executable, os.path.join(SCRIPTS_DIR, "backtest_strategy.py")], tmp)
+            for _ in range(3)
+        )
+
+        # New flow: one interpreter runs every stage in process
+        new = min(run([sys.executable, os.path.join(ROOT_DIR, "main.py")], tmp) for _ in range(3))
+
+        # Batch jobs that are already running only pay for the stages themselves
+        from pipeline import load_pair, run_pipeline
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_pipeline()
+            start = time.perf_counter()
+            run_pipeline(load_pair())
+            warm = time.perf_counter() - start
+        os.chdir(ROOT_DIR)
+
+    print(f"os.system stages (2 interpreters):   {old:.2f}s")
+    print(f"main.py in one process:              {new:.2f}s  ({old - new:.2f}s saved)")
+    print(f"run_pipeline() in a warm process:    {warm:.3f}s")
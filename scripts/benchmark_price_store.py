@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from analyze_data import clean_data
+from price_store import write_ticker, read_ticker
+
+
+def write_yfinance_csv(path, n, seed=0):
+    """
+    Write n rows in the layout yfinance's to_csv produces (two extra header rows).
+    Dates repeat because pandas can't represent a million distinct trading days.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=5_000).strftime('%Y-%m-%d')
+    close = 1800 + rng.standard_normal(n).cumsum()
+    df = pd.DataFrame({
+        "Price": np.resize(dates, n),
+        "Close": close,
+        "High": close + 1,
+        "Low": close - 1,
+        "Open": close,
+        "Volume": rng.integers(1_000, 100_000, size=n),
+    })
+    with open(path, "w") as f:
+        f.write("Price,Close,High,Low,Open,Volume\nTicker,GC=F,GC=F,GC=F,GC=F,GC=F\nDate,,,,,\n")
+        df.to_csv(f, index=False, header=False)
+    return df
+
+
+def time_call(func, *args, repeat=3, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    n = 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "GC.csv")
+        raw = write_yfinance_csv(csv_path, n)
+
+        frame = raw.set_index(pd.to_datetime(raw.pop("Price")))
+        write_ticker(frame, "GC=F", store_dir=tmp)
+
+        csv_time = time_call(clean_data, csv_path)
+        store_time = time_call(read_ticker, "GC=F", columns=["Close"], store_dir=tmp)
+        full_time = time_call(read_ticker, "GC=F", store_dir=tmp)
+
+        print(f"Rows: {n:,}")
+        print(f"CSV clean_data:          {csv_time:.3f}s")
+        print(f"Parquet, Close column:   {store_time:.3f}s ({csv_time / store_time:.0f}x faster)")
+        print(f"Parquet, all columns:    {full_time:.3f}s")
+        print(f"CSV size:     {os.path.getsize(csv_path) / 1e6:.1f} MB")
+        print(f"Parquet size: {os.path.getsize(os.path.join(tmp, 'GC.parquet')) / 1e6:.1f} MB")
@@ -0,0 +1,121 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+import numpy as np
+from shared_prices import SharedCloses, write_shared_closes
+
+# Spawned workers re-import this module, so anything heavy (statsmodels via
+# pair_scanner) is only imported under __main__ below
+WORKERS = 4
+
+# Worker-side state for the benchmark pool
+_prices = None
+_init_seconds = None
+_barrier = None
+
+
+def memory_kb(field):
+    """
+    A field of /proc/self/smaps_rollup in KiB. Pss splits shared pages evenly
+    between the processes mapping them, so summing it over processes gives
+    the physical memory they use together; Rss counts shared pages in each.
+    """
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _init(source, barrier):
+    global _prices, _init_seconds, _barrier
+    start = time.perf_counter()
+    if isinstance(source, SharedCloses):
+        source = source.matrix()
+    _prices = source
+    _init_seconds = time.perf_counter() - start
+    _barrier = barrier
+
+
+def _touch(_):
+    # Read every price, then wait until all workers have done so, so each
+    # worker is measured while the others are still holding the data
+    total = float(np.nansum(_prices))
+    _barrier.wait()
+    usage = (os.getpid(), _init_seconds, memory_kb("Rss"), memory_kb("Pss"), total)
+    _barrier.wait()
+    return usage
+
+
+def run_pool(source):
+    """
+    Start WORKERS spawned workers holding the prices and return the wall time
+    until all of them have read the data, the mean initializer time, and the
+    workers' summed RSS and PSS in MB.
+    """
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(WORKERS)
+    start = time.perf_counter()
+    with context.Pool(WORKERS, initializer=_init, initargs=(source, barrier)) as pool:
+        usage = pool.map(_touch, range(WORKERS), chunksize=1)
+    elapsed = time.perf_counter() - start
+    assert len({pid for pid, *_ in usage}) == WORKERS
+    init = np.mean([u[1] for u in usage])
+    rss = sum(u[2] for u in usage) / 1024
+    pss = sum(u[3] for u in usage) / 1024
+    return elapsed, init, rss, pss, usage[0][4]
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    n_tickers, n_bars = 500, 20_000
+    prices = 100 + rng.standard_normal((n_tickers, n_bars)).cumsum(axis=1)
+    print(f"{n_tickers} tickers x {n_bars} bars ({prices.nbytes / 2**20:.0f} MB of closes), {WORKERS} spawned workers")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import pandas as pd
+        panel = pd.DataFrame(prices.T, index=pd.bdate_range("1950-01-02", periods=n_bars),
+                             columns=[f"S{k:03d}" for k in range(n_tickers)])
+        path = write_shared_closes(panel, os.path.join(tmp, "closes"))
+        closes = SharedCloses(path)
+        assert np.array_equal(closes.matrix(), prices)
+        assert np.array_equal(closes.close("S007", "1960-01-01", "1960-12-31"),
+                              panel.loc["1960-01-01":"1960-12-31", "S007"].to_numpy())
+        del panel
+
+        baseline = run_pool(np.empty((0, 0)))
+        pickled = run_pool(prices)
+        shared = run_pool(closes)
+        assert np.isclose(pickled[4], shared[4])
+
+        # Unpickling happens before the initializer runs, so it shows up in the
+        # start time; "attach" is the time the initializer takes to map the store
+        print(f"{'':<16}{'start':>9}{'attach':>10}{'sum RSS':>11}{'sum PSS':>11}")
+        for label, (elapsed, init, rss, pss, _) in [("no prices", baseline), ("pickled array", pickled),
+                                                    ("memory-mapped", shared)]:
+            print(f"{label:<16}{elapsed:8.2f}s{init * 1e3:8.2f}ms{rss:8.0f} MB{pss:8.0f} MB")
+
+        # The scanner gives the same answer from the mapped store as from a DataFrame
+        from benchmark_pair_scanner import make_panel
+        from pair_scanner import scan_pairs
+        small = make_panel(n_series=20, n_bars=500)
+        small_closes = SharedCloses(write_shared_closes(small, os.path.join(tmp, "small")))
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = scan_pairs(small, workers=2)
+            result = scan_pairs(small_closes, workers=2)
+        pd.testing.assert_frame_equal(result, expected)
+
+        # Missing closes: the complete dates are mapped for the workers, as panel.dropna() would keep
+        gappy = small.copy()
+        for k, column in enumerate(gappy.columns[:5]):
+            gappy.iloc[rng.choice(len(gappy), size=10, replace=False), k] = np.nan
+        gappy_closes = SharedCloses(write_shared_closes(gappy, os.path.join(tmp, "gappy")))
+        dates = gappy.index[[50, 450]]
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = scan_pairs(gappy.loc[dates[0]:dates[1]], workers=2)
+            result = scan_pairs(gappy_closes, workers=2, start=dates[0], end=dates[1])
+        pd.testing.assert_frame_equal(result, expected)
+        print("scan_pairs on the mapped store matches scan_pairs on the DataFrame, with and without missing closes")
@@ -0,0 +1,84 @@
+import contextlib
+import io
+import time
+import numpy as np
+import pandas as pd
+from backtest_strategy import simulate_trades
+
+
+def legacy_simulate_trades(df, gold_units=1, silver_units=1, cash=100000):
+    """
+    The original iterrows implementation of simulate_trades, kept as the reference.
+    """
+    gold_position = 0
+    silver_position = 0
+    portfolio_values = []
+
+    for index, row in df.iterrows():
+        signal = row['Position']
+        gold_price = row['Price_gold']
+        silver_price = row['Price_silver']
+
+        if signal == 1:
+            cash -= gold_price * gold_units
+            cash += silver_price * silver_units
+            gold_position += gold_units
+            silver_position -= silver_units
+        elif signal == -1:
+            cash += gold_price * gold_units
+            cash -= silver_price * silver_units
+            gold_position -= gold_units
+            silver_position += silver_units
+        elif signal == 0:
+            cash += gold_position * gold_price
+            cash += silver_position * silver_price
+            gold_position = 0
+            silver_position = 0
+
+        portfolio_value = cash + (gold_position * gold_price) + (silver_position * silver_price)
+        portfolio_values.append(portfolio_value)
+        print(f"Date: {index}, Signal: {signal}, Cash: {cash:.2f}, Gold Position: {gold_position}, Silver Position: {silver_position}, Portfolio Value: {portfolio_value:.2f}")
+
+    df['Portfolio_Value'] = portfolio_values
+    return df
+
+
+def make_trades_frame(n, seed=0):
+    """
+    Random gold/silver prices with a signal that holds each state for a few bars.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=n)
+    gold = 1800 + rng.standard_normal(n).cumsum()
+    silver = 25 + 0.1 * rng.standard_normal(n).cumsum()
+    signal = np.repeat(rng.choice([-1, 0, 1], size=n // 5 + 1), 5)[:n]
+    return pd.DataFrame({'Price_gold': gold, 'Price_silver': silver, 'Position': signal}, index=dates)
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+if __name__ == "__main__":
+    # The vectorized engine has to reproduce the loop bit for bit
+    for seed in range(5):
+        df = make_trades_frame(5_000, seed=seed)
+        expected = quiet(legacy_simulate_trades, df.copy(), gold_units=2, silver_units=3)['Portfolio_Value']
+        actual = quiet(simulate_trades, df.copy(), gold_units=2, silver_units=3)['Portfolio_Value']
+        assert np.array_equal(expected.to_numpy(), actual.to_numpy()), f"Portfolio values differ for seed {seed}"
+    print("simulate_trades matches the iterrows loop exactly")
+
+    print(f"{'Rows':>12} {'iterrows (s)':>14} {'Vectorized (s)':>16}")
+    for n in [10_000, 100_000, 1_000_000]:
+        df = make_trades_frame(n)
+        start = time.perf_counter()
+        quiet(simulate_trades, df.copy())
+        vectorized = time.perf_counter() - start
+        if n <= 100_000:
+            start = time.perf_counter()
+            quiet(legacy_simulate_trades, df.copy())
+            legacy = time.perf_counter() - start
+            print(f"{n:>12,} {legacy:>14.4f} {vectorized:>16.4f}")
+        else:
+            print(f"{n:>12,} {'-':>14} {vectorized:>16.4f}")
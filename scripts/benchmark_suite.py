@@ -0,0 +1,191 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from analyze_data import clean_data, combine_prices
+from backtest_strategy import (calculate_spread, calculate_zscore, backtest_strategy, calculate_performance_metrics,
+                               simulate_trades)
+from statarb_common.fast_coint import coint_batch
+from instrumentation import profiling, stage
+from synthetic_data import cointegrated_pair, write_ticker_csv
+
+SIZES = [10**3, 10**4, 10**5, 10**6]
+RESULTS_PATH = "benchmarks/results.json"
+BASELINE_PATH = "benchmarks/baseline.json"
+
+# Timings shorter than this are mostly noise and are never flagged
+MIN_SECONDS = 0.02
+
+
+def _profile(func, name, memory):
+    with contextlib.redirect_stdout(io.StringIO()), profiling(memory=memory) as profiler:
+        func()
+    return profiler.report()["stages"][name]
+
+
+def _print_result(result):
+    print(f"{result['stage']:<30}{result['rows']:>12,} rows {result['seconds']:>9.4f}s "
+          f"{result['rows_per_second'] or 0:>14,.0f} rows/s "
+          f"{result['memory_growth_mb'] or 0:>8.1f} MB", flush=True)
+
+
+def _measure(func, name, repeat, memory):
+    """
+    Time stage `name` (an instrumented function or a stage() block inside
+    func) as the best of repeat runs with memory tracking off, then run it
+    once more to measure how far its peak memory rose above the start.
+    """
+    timings = [_profile(func, name, None) for _ in range(repeat)]
+    best = min(t["seconds"] for t in timings)
+    rows = timings[-1]["rows"]
+    result = {
+        "stage": name,
+        "rows": rows,
+        "seconds": best,
+        "rows_per_second": rows / best if best else None,
+        "memory_growth_mb": _profile(func, name, memory)["memory_growth_mb"] if memory else None,
+    }
+    _print_result(result)
+    return result
+
+
+def _coint(df):
+    # Engle-Granger with one fixed lag: the autolag search grows with n^(1/4)
+    # lags and would dominate the timing at 10^7 rows
+    with stage("coint") as tested:
+        coint_batch(df['Price_gold'].to_numpy(), df['Price_silver'].to_numpy(), maxlag=1, autolag=None)
+        tested.rows = len(df)
+
+
+def run_suite(sizes=SIZES, repeat=3, memory="tracemalloc", interval="1m", seed=0):
+    """
+    Time every pipeline stage on synthetic cointegrated pairs of each size,
+    from the raw CSV through to simulate_trades and the Engle-Granger test.
+    Returns one result dict per stage and size.
+
+    memory="tracemalloc" reports the peak of the stage's own Python and NumPy
+    allocations; "rss" the rise in resident memory, which stays near zero
+    when the allocator reuses pages freed by an earlier stage.
+    """
+    results = []
+    for n in sizes:
+        df = cointegrated_pair(n, interval=interval, seed=seed)
+        runs = repeat if n < 10**6 else 1
+        with tempfile.TemporaryDirectory() as tmp:
+            gold_csv = write_ticker_csv(df['Price_gold'], os.path.join(tmp, "GC.csv"), seed=seed)
+            silver_csv = write_ticker_csv(df['Price_silver'], os.path.join(tmp, "SI.csv"), seed=seed + 1)
+            del df
+            results.append(_measure(lambda: clean_data(gold_csv), "clean_data", runs, memory))
+            with contextlib.redirect_stdout(io.StringIO()):
+                gold, silver = clean_data(gold_csv), clean_data(silver_csv)
+
+        results.append(_measure(lambda: combine_prices(gold, silver), "join", runs, memory))
+        combined = combine_prices(gold, silver)
+        del gold, silver
+        base = combined[['Price_gold', 'Price_silver']]
+        del combined
+
+        spread = calculate_spread(base.copy(), scaling_factor=70)
+        zscore = calculate_zscore(spread.copy())
+        backtest = backtest_strategy(zscore.copy())
+        stages = [
+            ("calculate_spread", lambda: calculate_spread(base.copy(), scaling_factor=70)),
+            ("calculate_zscore", lambda: calculate_zscore(spread.copy())),
+            ("backtest_strategy", lambda: backtest_strategy(zscore.copy())),
+            ("calculate_performance_metrics", lambda: calculate_performance_metrics(backtest)),
+            ("simulate_trades", lambda: simulate_trades(backtest.copy())),
+            ("coint", lambda: _coint(base)),
+        ]
+        for name, func in stages:
+            results.append(_measure(func, name, runs, memory))
+        del spread, zscore, backtest
+    return results
+
+
+def environment():
+    import scipy
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def save_results(results, path, memory):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "memory": memory, "results": results}, f, indent=2)
+    return path
+
+
+def compare(results, baseline, tolerance=0.25, memory_tolerance=0.25):
+    """
+    Compare results against a baseline file's results, matching on stage and
+    rows. Returns the regressions: runs more than `tolerance` slower (and
+    slower than MIN_SECONDS), or using more than `memory_tolerance` more
+    memory (by at least 1 MB), than the baseline.
+    """
+    previous = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["stage"], result["rows"]))
+        if before is None:
+            continue
+        slower = result["seconds"] / before["seconds"] if before["seconds"] else np.inf
+        if result["seconds"] > MIN_SECONDS and slower > 1 + tolerance:
+            regressions.append({**result, "metric": "seconds", "baseline": before["seconds"], "ratio": slower})
+        growth, before_growth = result.get("memory_growth_mb"), before.get("memory_growth_mb")
+        if growth is not None and before_growth is not None and growth - before_growth > 1:
+            ratio = growth / before_growth if before_growth else np.inf
+            if ratio > 1 + memory_tolerance:
+                regressions.append({**result, "metric": "memory_growth_mb", "baseline": before_growth,
+                                    "ratio": ratio})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument("--min-rows", type=float, default=SIZES[0], help="smallest size (default: 1e3)")
+    parser.add_argument("--max-rows", type=float, default=SIZES[-1],
+                        help="largest size, a power of ten from 1e3 to 1e7 (default: 1e6)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage below 1e6 rows, best time kept")
+    parser.add_argument("--memory", default="tracemalloc", choices=["tracemalloc", "rss", "none"],
+                        help="how to measure peak memory per stage (default: tracemalloc)")
+    parser.add_argument("--output", default=RESULTS_PATH, help=f"results JSON (default: {RESULTS_PATH})")
+    parser.add_argument("--baseline", default=BASELINE_PATH,
+                        help=f"baseline JSON to compare against, if it exists (default: {BASELINE_PATH})")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="slowdown or memory growth over the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    memory = None if args.memory == "none" else args.memory
+    sizes = [10**k for k in range(int(round(np.log10(args.min_rows))), int(round(np.log10(args.max_rows))) + 1)]
+    results = run_suite(sizes=sizes, repeat=args.repeat, memory=memory)
+    print(f"Results written to {save_results(results, args.output, memory)}")
+
+    if args.save_baseline:
+        print(f"Baseline written to {save_results(results, args.baseline, memory)}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, tolerance=args.tolerance, memory_tolerance=args.tolerance)
+        if not regressions:
+            print(f"No regressions against {args.baseline}")
+        for r in regressions:
+            print(f"REGRESSION {r['stage']} at {r['rows']:,} rows: {r['metric']} {r[r['metric']]:.4g} "
+                  f"vs baseline {r['baseline']:.4g} ({r['ratio']:.2f}x)")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,256 @@
+from collections import deque, namedtuple
+import numpy as np
+import pandas as pd
+from statarb_common.fast_coint import critical_values, mackinnon_pvalues
+
+StabilityState = namedtuple("StabilityState", ["hedge_ratio", "statistic", "pvalue", "half_life", "trade_enabled"])
+
+
+def _row_vectors(y, x, lags):
+    """
+    One row per ADF observation s = lags+1 .. n-1:
+    [1, x(s-1), y(s-1), dx(s), dy(s), dx(s-1), dy(s-1), ..., dx(s-lags), dy(s-lags)].
+
+    Every quantity in the window regressions is a linear function of these,
+    so the window sums of their outer products are all the state needed.
+    Differences are kept as their own columns rather than rebuilt from
+    levels, which keeps the sums of squared differences accurate.
+    """
+    s = np.arange(lags + 1, len(y))
+    dx, dy = np.diff(x), np.diff(y)
+    columns = [np.ones(len(s)), x[s - 1], y[s - 1]]
+    for j in range(lags + 1):
+        columns += [dx[s - j - 1], dy[s - j - 1]]
+    return np.column_stack(columns)
+
+
+def _window_statistics(level_sums, moments, transitions, window, lags):
+    """
+    Hedge ratio, Engle-Granger statistic (ADF with `lags` lagged differences
+    and no constant on the residuals, as in coint) and half-life for a stack
+    of windows, from the window sums of [1, x, y] (level_sums, (T, 3, 3)),
+    of the row vectors above over the ADF sample (moments, (T, p, p)) and of
+    their first five columns over all window-1 steps of the window
+    (transitions, (T, 5, 5)), which the half-life regression uses.
+    """
+    n = window
+    sum_x, sum_y = level_sums[:, 0, 1], level_sums[:, 0, 2]
+    sum_xx, sum_xy = level_sums[:, 1, 1], level_sums[:, 1, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x * sum_x)
+    alpha = (sum_y - beta * sum_x) / n
+
+    # Residual level e(s-1) and residual differences de(s-j) as vectors over the row layout
+    count, p = moments.shape[:2]
+    level = np.zeros((count, p))
+    level[:, 0], level[:, 1], level[:, 2] = -alpha, -beta, 1.0
+    diffs = []
+    for j in range(lags + 1):
+        d = np.zeros((count, p))
+        d[:, 3 + 2 * j], d[:, 4 + 2 * j] = -beta, 1.0
+        diffs.append(d)
+    target = diffs[0]
+    design = np.stack([level] + diffs[1:], axis=2)  # (T, p, k)
+
+    # Normal equations of the ADF regression: X'X = C'MC, X'y = C'Md
+    m_design = moments @ design
+    xtx = np.einsum("tpk,tpl->tkl", design, m_design)
+    xty = np.einsum("tpk,tp->tk", m_design, target)
+    yty = np.einsum("tp,tpq,tq->t", target, moments, target)
+
+    nobs, k = window - 1 - lags, lags + 1
+    finite = np.isfinite(beta)
+    statistic = np.full(count, np.nan)
+    half_life = np.full(count, np.nan)
+    if finite.any():
+        xtx_f, xty_f = xtx[finite], xty[finite]
+        coef = np.linalg.solve(xtx_f, xty_f[..., None])[..., 0]
+        ssr = np.maximum(yty[finite] - np.einsum("tk,tk->t", coef, xty_f), 0.0)
+        inv00 = np.linalg.inv(xtx_f)[:, 0, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            statistic[finite] = coef[:, 0] / np.sqrt(ssr / (nobs - k) * inv00)
+
+            # Half-life: de(s) on e(s-1) with an intercept over every step of
+            # the window, as pair_scanner computes it
+            steps = window - 1
+            sums = transitions[finite]
+            lag_vec, diff_vec = level[finite, :5], target[finite, :5]
+            lag_sum = np.einsum("tp,tp->t", sums[:, 0, :], lag_vec)
+            diff_sum = np.einsum("tp,tp->t", sums[:, 0, :], diff_vec)
+            lag_ss = np.einsum("tp,tpq,tq->t", lag_vec, sums, lag_vec) - lag_sum * lag_sum / steps
+            lag_diff = np.einsum("tp,tpq,tq->t", lag_vec, sums, diff_vec) - lag_sum * diff_sum / steps
+            speed = lag_diff / lag_ss
+            half_life[finite] = np.where(speed < 0, -np.log(2) / speed, np.inf)
+    return beta, statistic, half_life
+
+
+def _trade_enabled(pvalue, half_life, max_pvalue, max_half_life):
+    enabled = pvalue <= max_pvalue
+    if max_half_life is not None:
+        enabled &= half_life <= max_half_life
+    return enabled
+
+
+def _window_sums(rows, window):
+    """
+    Sums of the outer products of rows over each run of `window` consecutive
+    rows: every step adds the newest row's outer product and drops the oldest
+    (rank-one updates), done for the whole block with one cumulative sum.
+    """
+    outer = rows[:, :, None] * rows[:, None, :]
+    cumulative = np.concatenate((np.zeros((1,) + outer.shape[1:]), np.cumsum(outer, axis=0)))
+    return cumulative[window:] - cumulative[:-window]
+
+
+def rolling_cointegration(y, x, window=252, lags=0, max_pvalue=0.05, max_half_life=None, chunk_size=50_000):
+    """
+    Engle-Granger test and half-life of y against x over a trailing window,
+    for every bar.
+
+    The window regressions are rebuilt from running sums that are updated
+    one bar at a time instead of refitting each window, so a bar costs the
+    same however long the window is. History is processed chunk_size bars
+    at a time, each chunk with its own centring, so memory stays bounded and
+    the sums don't lose precision on long histories.
+
+    Returns a frame with the window hedge ratio, test statistic, p-value,
+    half-life (in bars) and 'Trade_Enabled': p-value at most max_pvalue and,
+    if given, half-life at most max_half_life. The first window-1 bars are
+    NaN and disabled.
+    """
+    index = y.index if isinstance(y, pd.Series) else None
+    y = np.asarray(y, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    n = len(y)
+    if window - 1 - lags <= lags + 1:
+        raise ValueError("window is too short for the number of lags")
+
+    beta = np.full(n, np.nan)
+    statistic = np.full(n, np.nan)
+    half_life = np.full(n, np.nan)
+    nobs = window - 1 - lags
+    for start in range(window - 1, n, chunk_size):
+        end = min(start + chunk_size, n)
+        first = start - window + 1  # first price the chunk's windows look at
+        block_y = y[first:end] - y[first:end].mean()
+        block_x = x[first:end] - x[first:end].mean()
+
+        levels = np.column_stack([np.ones(len(block_y)), block_x, block_y])
+        level_sums = _window_sums(levels, window)
+        moments = _window_sums(_row_vectors(block_y, block_x, lags), nobs)
+        if lags:
+            transitions = _window_sums(_row_vectors(block_y, block_x, 0), window - 1)
+        else:
+            transitions = moments
+        beta[start:end], statistic[start:end], half_life[start:end] = _window_statistics(
+            level_sums, moments, transitions, window, lags)
+
+    pvalue = np.full(n, np.nan)
+    ready = ~np.isnan(statistic)
+    pvalue[ready] = mackinnon_pvalues(statistic[ready], 2, "c")
+    result = pd.DataFrame({
+        "Hedge_Ratio": beta,
+        "Coint_Stat": statistic,
+        "Coint_PValue": pvalue,
+        "Half_Life": half_life,
+        "Trade_Enabled": _trade_enabled(pvalue, half_life, max_pvalue, max_half_life),
+    }, index=index)
+    result.attrs["critical_values"] = critical_values(window - 1, 2, "c")
+    return result
+
+
+def calculate_stability(df, window=252, lags=0, max_pvalue=0.05, max_half_life=None):
+    """
+    Add the rolling cointegration monitor for gold on silver to the frame:
+    'Coint_PValue', 'Half_Life' and 'Trade_Enabled'. Pass 'Trade_Enabled'
+    to backtest_strategy to only open positions while the pair is tradeable.
+    """
+    monitor = rolling_cointegration(df['Price_gold'], df['Price_silver'], window=window, lags=lags,
+                                    max_pvalue=max_pvalue, max_half_life=max_half_life)
+    df['Coint_PValue'] = monitor['Coint_PValue']
+    df['Half_Life'] = monitor['Half_Life']
+    df['Trade_Enabled'] = monitor['Trade_Enabled']
+    return df
+
+
+class StabilityMonitor:
+    """
+    Live version of rolling_cointegration: feed it one bar at a time.
+
+    The window sums are kept as two small matrices; each bar adds the outer
+    product of the newest row and subtracts that of the row leaving the
+    window. Every resync bars they are rebuilt from the window itself, so
+    rounding can't build up over a long session.
+    """
+
+    def __init__(self, window=252, lags=0, max_pvalue=0.05, max_half_life=None, resync=10_000):
+        if window - 1 - lags <= lags + 1:
+            raise ValueError("window is too short for the number of lags")
+        self.window = window
+        self.lags = lags
+        self.max_pvalue = max_pvalue
+        self.max_half_life = max_half_life
+        self.resync = resync
+
+        self._origin = None
+        self._prices = deque(maxlen=window)
+        self._rows = deque(maxlen=window - 1 - lags)
+        self._steps = deque(maxlen=window - 1)
+        self._level_sums = np.zeros((3, 3))
+        self._moments = np.zeros((5 + 2 * lags, 5 + 2 * lags))
+        self._transitions = np.zeros((5, 5))
+        self._bars = 0
+
+    def _row(self, lags):
+        # Only the last lags + 2 prices are needed (deque ends are O(1) to index)
+        prices = np.array([self._prices[-k] for k in range(lags + 2, 0, -1)])
+        return _row_vectors(prices[:, 0], prices[:, 1], lags)[-1]
+
+    def update(self, price_y, price_x):
+        """
+        Add one bar and return the monitor's StabilityState for the window
+        ending at it (NaN and disabled until the window has filled).
+        """
+        if self._origin is None:
+            # Measure prices from the first bar so the sums stay small
+            self._origin = (price_y, price_x)
+        y, x = price_y - self._origin[0], price_x - self._origin[1]
+
+        if len(self._prices) == self.window:
+            old_y, old_x = self._prices[0]
+            old = np.array([1.0, old_x, old_y])
+            self._level_sums -= np.outer(old, old)
+        self._prices.append((y, x))
+        new = np.array([1.0, x, y])
+        self._level_sums += np.outer(new, new)
+
+        if len(self._prices) >= 2:
+            if len(self._steps) == self._steps.maxlen:
+                self._transitions -= np.outer(self._steps[0], self._steps[0])
+            step = self._row(0)
+            self._steps.append(step)
+            self._transitions += np.outer(step, step)
+
+        if len(self._prices) >= self.lags + 2:
+            if len(self._rows) == self._rows.maxlen:
+                self._moments -= np.outer(self._rows[0], self._rows[0])
+            row = self._row(self.lags)
+            self._rows.append(row)
+            self._moments += np.outer(row, row)
+
+        self._bars += 1
+        if self._bars % self.resync == 0:
+            levels = np.column_stack([np.ones(len(self._prices)), np.array(self._prices)[:, ::-1]])
+            self._level_sums = levels.T @ levels
+            rows = np.array(self._rows)
+            self._moments = rows.T @ rows
+            steps = np.array(self._steps)
+            self._transitions = steps.T @ steps
+
+        if len(self._prices) < self.window:
+            return StabilityState(np.nan, np.nan, np.nan, np.nan, False)
+        beta, statistic, half_life = _window_statistics(self._level_sums[None], self._moments[None],
+                                                        self._transitions[None], self.window, self.lags)
+        pvalue = mackinnon_pvalues(statistic, 2, "c")
+        enabled = _trade_enabled(pvalue, half_life, self.max_pvalue, self.max_half_life)
+        return StabilityState(beta[0], statistic[0], pvalue[0], half_life[0], bool(enabled[0]))
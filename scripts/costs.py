@@ -0,0 +1,94 @@
+import copy
+import numpy as np
+
+
+class CostModel:
+    """
+    Execution costs for the spread trade: two legs by default, or a basket of
+    `legs` legs. With weights (signed notional per unit of position in each
+    leg, see with_weights) return costs scale with each leg's weight instead
+    of charging one unit of notional per leg.
+
+    - commission: dollars per unit traded on each leg (dollar accounting only)
+    - commission_bps, slippage_bps, spread_bps: basis points of traded notional
+      (spread_bps is the half bid-ask spread paid on each fill)
+    - borrow_rate: annual rate charged on the value of the short leg while held
+
+    Costs are computed from position changes over whole arrays, so applying
+    them costs a few vector operations per backtest.
+    """
+
+    def __init__(self, commission=0.0, commission_bps=0.0, slippage_bps=0.0, spread_bps=0.0, borrow_rate=0.0,
+                 periods_per_year=252, legs=2, weights=None):
+        self.commission = commission
+        self.commission_bps = commission_bps
+        self.slippage_bps = slippage_bps
+        self.spread_bps = spread_bps
+        self.borrow_rate = borrow_rate
+        self.periods_per_year = periods_per_year
+        self.legs = legs
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        if self.weights is not None:
+            self.legs = len(self.weights)
+
+    def with_weights(self, weights):
+        """
+        Copy of this model for a basket traded in proportion to weights, e.g.
+        the basket_weights of a Johansen vector (first leg 1).
+        """
+        model = copy.copy(self)
+        model.weights = np.asarray(weights, dtype=np.float64)
+        model.legs = len(model.weights)
+        return model
+
+    @property
+    def fill_rate(self):
+        """
+        Proportional cost per unit of notional traded.
+        """
+        return (self.commission_bps + self.slippage_bps + self.spread_bps) / 1e4
+
+    def return_costs(self, position):
+        """
+        Per-bar cost in the units of Strategy_Return for a Position series.
+
+        One unit of position is one unit of notional in each leg (or |weight|
+        units with weights), so a change of position trades every leg. The
+        trade made at bar t is charged on bar t, and borrow is charged on bar t
+        for the short legs held into it.
+        """
+        position = np.nan_to_num(np.asarray(position, dtype=np.float64))
+        held = np.concatenate(([0.0], position[:-1]))
+        if self.weights is None:
+            turnover, short = self.legs, np.abs(held)
+        else:
+            turnover = np.abs(self.weights).sum()
+            short = np.maximum(-held[:, None] * self.weights, 0).sum(axis=1)
+        trading = np.abs(position - held) * turnover * self.fill_rate
+        borrow = short * self.borrow_rate / self.periods_per_year
+        return trading + borrow
+
+    def dollar_costs(self, gold_position, silver_position, gold_price, silver_price):
+        """
+        Per-bar cost in dollars for the holdings computed by simulate_trades.
+        """
+        return self.leg_dollar_costs(np.column_stack((gold_position, silver_position)),
+                                     np.column_stack((gold_price, silver_price)))
+
+    def leg_dollar_costs(self, positions, prices):
+        """
+        Per-bar cost in dollars for (bars x legs) arrays of holdings and
+        prices, as computed by simulate_basket_trades.
+        """
+        positions = np.asarray(positions, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        traded = np.abs(np.diff(positions, axis=0, prepend=0.0))
+
+        commission = self.commission * traded.sum(axis=1)
+        fills = self.fill_rate * (traded * prices).sum(axis=1)
+
+        # Borrow on whatever is short going into the bar
+        held = np.concatenate((np.zeros((1, positions.shape[1])), positions[:-1]))
+        short = np.maximum(-held, 0)
+        borrow = self.borrow_rate / self.periods_per_year * (short * prices).sum(axis=1)
+        return commission + fills + borrow
@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+import numpy as np
+from backtest_strategy import calculate_spread, calculate_zscore
+from instrumentation import instrumented
+from price_store import STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+FEATURE_DIR = os.path.join(STORE_DIR, "features")
+FEATURE_COLUMNS = ['Spread', 'Spread_Mean', 'Spread_Std', 'Z_Score']
+
+# Bump when the way features are computed changes, so old entries stop matching
+CACHE_VERSION = 1
+
+
+def fingerprint(*parts):
+    """
+    Content hash of arrays and parameters: the same prices and parameters
+    always give the same key, whatever frame or file they came from. SHA-256
+    is hardware accelerated on current CPUs, which makes it the fastest of
+    hashlib's algorithms on large arrays.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+            digest.update(f"{part.dtype.str}{part.shape}".encode())
+            digest.update(part.data)
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+class FeatureCache:
+    """
+    Two-tier cache of computed feature arrays, keyed by fingerprint.
+
+    Recently used entries stay in memory, least recently used going first
+    once they take more than max_memory_bytes. Every entry is also saved as
+    a .npy file under cache_dir so later runs can reuse it; when the files
+    take more than max_disk_bytes the least recently used are deleted.
+    Nothing is invalidated when the price files change: keys are content
+    hashes of the prices themselves, so new prices simply miss and the
+    entries they replace age out through eviction. Hit and miss counts are
+    in .stats.
+    """
+
+    def __init__(self, cache_dir=FEATURE_DIR, max_memory_bytes=256 * 2**20, max_disk_bytes=2 * 2**30):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "memory_evictions": 0,
+                      "disk_evictions": 0}
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy") if self.cache_dir else None
+
+    def get(self, key):
+        values = self._memory.get(key)
+        if values is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return values
+
+        path = self._path(key)
+        if path and os.path.exists(path):
+            values = np.load(path)
+            os.utime(path)  # mark as recently used for disk eviction
+            self._remember(key, values)
+            self.stats["disk_hits"] += 1
+            return values
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, values):
+        values.setflags(write=False)
+        self._remember(key, values)
+        path = self._path(key)
+        if path:
+            self._save(path, values)
+            self._evict_disk()
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached array for key, computing and storing it on a miss.
+        """
+        values = self.get(key)
+        if values is None:
+            values = np.asarray(compute())
+            self.put(key, values)
+        return values
+
+    def _remember(self, key, values):
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key).nbytes
+        self._memory[key] = values
+        self._memory_bytes += values.nbytes
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.stats["memory_evictions"] += 1
+
+    def _save(self, path, values):
+        # Same write-then-rename as the price store, so a reader never loads a partial file
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, values)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def disk_bytes(self):
+        return sum(size for _, size, _ in self._entries()) if self.cache_dir and os.path.isdir(self.cache_dir) else 0
+
+    def _evict_disk(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        # Oldest first, never the entry just written
+        for _, size, path in entries[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+            self.stats["disk_evictions"] += 1
+
+    def clear(self):
+        """
+        Drop every entry from both tiers.
+        """
+        self._memory.clear()
+        self._memory_bytes = 0
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for _, _, path in self._entries():
+                os.remove(path)
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return hits / lookups if lookups else float("nan")
+
+    def print_stats(self):
+        s = self.stats
+        print(f"Feature cache: {s['memory_hits']} memory hits, {s['disk_hits']} disk hits, {s['misses']} misses "
+              f"({self.hit_rate():.0%} hit rate), {s['memory_evictions'] + s['disk_evictions']} evictions")
+
+
+@instrumented()
+def cached_zscore(df, scaling_factor=1, window=30, cache=None):
+    """
+    calculate_spread followed by calculate_zscore, served from the cache when
+    the same prices, scaling_factor and window have been seen before. Adds the
+    same columns with the same values as the two functions do.
+    """
+    if cache is None:
+        return calculate_zscore(calculate_spread(df, scaling_factor=scaling_factor), window=window)
+
+    gold = df['Price_gold'].to_numpy(dtype=np.float64)
+    silver = df['Price_silver'].to_numpy(dtype=np.float64)
+    scaling = np.asarray(scaling_factor, dtype=np.float64) if np.ndim(scaling_factor) else float(scaling_factor)
+    key = fingerprint(CACHE_VERSION, "zscore", window, scaling, gold, silver)
+
+    def compute():
+        frame = calculate_zscore(calculate_spread(df[['Price_gold', 'Price_silver']].copy(),
+                                                  scaling_factor=scaling_factor), window=window)
+        return frame[FEATURE_COLUMNS].to_numpy(dtype=np.float64).T
+
+    features = cache.get_or_compute(key, compute)
+    for column, values in zip(FEATURE_COLUMNS, features):
+        # Read-only, so pandas copies it before any write and the cache entry can't change
+        df[column] = values
+    return df
@@ -1,54 +1,183 @@
-import yfinance as yf
-import os
-import glob
-import sys
 import datetime
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from instrumentation import configure_logging
+from price_store import STORE_DIR, append_ticker, last_date
 
-def fetch_stock_data(gold_ticker, silver_ticker, save_dir="data"):
-    print("DEBUG: This is the correct fetch_data.py!")
+logger = logging.getLogger(__name__)
 
-    # Fetch stocks from Yahoo Finance
-    print(f"Fetching stock data for {gold_ticker} and {silver_ticker}")
+HISTORY_DAYS = 3 * 365  # How far back to go for a ticker with no stored data
 
-    # Stop script execution if tickers are incorrect
-    if gold_ticker != "GC=F" or silver_ticker != "SI=F":
-        print("Error: Incorrect tickers provided!")
-        sys.exit(1)  # Stop script immediately
+# Yahoo only serves recent history for intraday intervals
+INTRADAY_HISTORY_DAYS = {"1m": 7, "2m": 59, "5m": 59, "15m": 59, "30m": 59, "60m": 729, "90m": 59, "1h": 729}
 
-    # Clear existing CSV files
-    for file in glob.glob(os.path.join(save_dir, "*.csv")):
-        os.remove(file)
-        print(f"Deleted old file: {file}")
 
-    # Dynamically calculate the date range for the past 3 years
-    end_date = datetime.datetime.today().strftime('%Y-%m-%d')  # Today's date
-    start_date = (datetime.datetime.today() - datetime.timedelta(days=3*365)).strftime('%Y-%m-%d')  # Past 3 years
+class RateLimitError(Exception):
+    """
+    Raised by a downloader when the data provider is throttling requests.
+    """
 
-    print(f"Fetching data from {start_date} to {end_date}")
 
-    # Fetch stock data
-    gold_stock = yf.download(gold_ticker, start=start_date, end=end_date)
-    print(f"Fetched data for {gold_ticker}")
+class YahooDownloader:
+    """
+    Downloads bars from Yahoo Finance, daily by default or any intraday
+    interval Yahoo supports ("1m", "5m", "1h", ...). Anything with the same
+    download() method can be passed to update_ticker instead, e.g. a local
+    fake in tests.
 
-    silver_stock = yf.download(silver_ticker, start=start_date, end=end_date)
-    print(f"Fetched data for {silver_ticker}")
+    All requests share one HTTP session so connections are reused across
+    tickers and threads.
+    """
 
-    # Check if data was fetched
-    print("Gold Data (first 5 rows):")
-    print(gold_stock.head())
-    print("Silver Data (first 5 rows):")
-    print(silver_stock.head())
+    def __init__(self, session=None, interval="1d"):
+        if session is None:
+            from curl_cffi import requests as curl_requests
+            session = curl_requests.Session(impersonate="chrome")
+        self.session = session
+        self.interval = interval
 
-    # Save to CSV files
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir)
-        print(f"Created directory: {save_dir}")
+    def download(self, ticker, start, end):
+        import yfinance as yf
 
-    gold_stock.to_csv(os.path.join(save_dir, f"{gold_ticker.replace('=F', '')}.csv"))
-    silver_stock.to_csv(os.path.join(save_dir, f"{silver_ticker.replace('=F', '')}.csv"))
+        # Ticker.history keeps no global state, unlike yf.download, so it is
+        # safe to call from several threads at once
+        try:
+            return yf.Ticker(ticker, session=self.session).history(start=start, end=end, interval=self.interval,
+                                                                   raise_errors=True)
+        except yf.exceptions.YFRateLimitError as e:
+            raise RateLimitError(str(e)) from e
 
-    print(f"Data saved for {gold_ticker} and {silver_ticker} in {save_dir}")
+
+class RequestThrottle:
+    """
+    Spaces out request start times across threads by at least min_interval
+    seconds, and lets a rate-limited request push every thread back.
+    """
+
+    def __init__(self, min_interval=0.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        time.sleep(max(0.0, slot - now))
+
+    def pause(self, seconds):
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def update_ticker(ticker, downloader, save_dir=STORE_DIR, today=None):
+    """
+    Download only the bars after the last stored date for a ticker and append
+    them to the price store. Returns the number of new rows.
+
+    For intraday downloaders the last stored day is fetched again, since it
+    may have been partial, and the bars are stored as float32 where
+    precision allows.
+    """
+    today = today or datetime.date.today()
+    end_date = today + datetime.timedelta(days=1)  # Yahoo's end date is exclusive
+    interval = getattr(downloader, "interval", "1d")
+    intraday = interval in INTRADAY_HISTORY_DAYS
+
+    last = last_date(ticker, save_dir)
+    if last is None:
+        history_days = INTRADAY_HISTORY_DAYS[interval] if intraday else HISTORY_DAYS
+        start_date = today - datetime.timedelta(days=history_days)
+    elif intraday:
+        start_date = last.date()
+    else:
+        start_date = last.date() + datetime.timedelta(days=1)
+
+    if start_date >= end_date:
+        logger.info("%s is up to date (last bar %s)", ticker, last.date())
+        return 0
+
+    logger.info("Fetching %s from %s to %s", ticker, start_date, today)
+    new_bars = downloader.download(ticker, start=start_date.strftime('%Y-%m-%d'), end=end_date.strftime('%Y-%m-%d'))
+    if new_bars is None or new_bars.empty:
+        logger.info("No new data for %s", ticker)
+        return 0
+
+    added = append_ticker(new_bars, ticker, save_dir, compact=intraday)
+    logger.info("Added %d rows for %s", added, ticker)
+    return added
+
+
+REPORT_COLUMNS = ["Ticker", "Status", "Rows", "Attempts", "Error"]
+
+
+def _update_with_retry(ticker, downloader, save_dir, throttle, retries, backoff, today):
+    """
+    Run update_ticker, retrying failures with exponential backoff plus jitter.
+    Returns one row of the fetch report (see REPORT_COLUMNS).
+    """
+    for attempt in range(1, retries + 2):
+        throttle.wait()
+        try:
+            rows = update_ticker(ticker, downloader, save_dir, today=today)
+            return {"Ticker": ticker, "Status": "ok", "Rows": rows, "Attempts": attempt, "Error": None}
+        except Exception as e:
+            if attempt > retries:
+                logger.error("Giving up on %s after %d attempts: %s", ticker, attempt, e)
+                return {"Ticker": ticker, "Status": "failed", "Rows": 0, "Attempts": attempt, "Error": repr(e)}
+            delay = backoff * 2 ** (attempt - 1) * random.uniform(1.0, 1.5)
+            if isinstance(e, RateLimitError):
+                # Throttled: hold back every thread, not just this one
+                throttle.pause(delay)
+            logger.warning("Retrying %s in %.2fs (%s)", ticker, delay, e)
+            time.sleep(delay)
+
+
+def fetch_universe(tickers, save_dir=STORE_DIR, downloader=None, max_workers=8, retries=3,
+                   backoff=1.0, min_interval=0.0, today=None):
+    """
+    Bring the stored history of every ticker up to date, several at a time.
+
+    Downloads run on a pool of max_workers threads sharing one downloader (and
+    so one HTTP session). A failing ticker is retried with exponential backoff
+    and then reported, without stopping the others. Returns a report with one
+    row per ticker.
+    """
+    downloader = downloader or YahooDownloader()
+    throttle = RequestThrottle(min_interval)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_update_with_retry, ticker, downloader, save_dir, throttle, retries, backoff, today)
+            for ticker in tickers
+        ]
+        report = pd.DataFrame([future.result() for future in futures], columns=REPORT_COLUMNS)
+
+    failed = report[report["Status"] == "failed"]
+    logger.info("Fetched %d of %d tickers", len(report) - len(failed), len(report))
+    for row in failed.itertuples():
+        logger.warning("   %s: %s", row.Ticker, row.Error)
+    return report
+
+
+def fetch_stock_data(gold_ticker, silver_ticker, save_dir=STORE_DIR, downloader=None):
+    logger.info("Fetching stock data for %s and %s", gold_ticker, silver_ticker)
+
+    # Only the bars missing from the store are downloaded
+    report = fetch_universe([gold_ticker, silver_ticker], save_dir=save_dir, downloader=downloader)
+
+    failed = report.loc[report["Status"] == "failed", "Ticker"].tolist()
+    if failed:
+        logger.warning("Could not update %s; the store in %s may be stale", ", ".join(failed), save_dir)
+    else:
+        logger.info("Data saved for %s and %s in %s", gold_ticker, silver_ticker, save_dir)
+    return report
 
 if __name__ == "__main__":
+    configure_logging()
     fetch_stock_data("GC=F", "SI=F")
-
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+
+def rolling_ols_beta(y, x, window=60):
+    """
+    Slope of y on x (with intercept) over a trailing window, for every bar.
+
+    The window sums of x, y, x*x and x*y come from differences of cumulative
+    sums, so each bar costs O(1) however long the window is. The first
+    window-1 values are NaN.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    beta = np.full(len(y), np.nan)
+    if len(y) < window:
+        return beta
+
+    # Centre the data first so the cumulative sums stay small and the
+    # differences below don't lose precision on long histories
+    y = y - y.mean()
+    x = x - x.mean()
+
+    def window_sum(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return cumulative[window:] - cumulative[:-window]
+
+    sum_x = window_sum(x)
+    sum_y = window_sum(y)
+    sum_xx = window_sum(x * x)
+    sum_xy = window_sum(x * y)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta[window - 1:] = (window * sum_xy - sum_x * sum_y) / (window * sum_xx - sum_x * sum_x)
+    return beta
+
+
+def kalman_beta(y, x, delta=1e-4, observation_var=1.0):
+    """
+    Time-varying hedge ratio from a Kalman filter on y = beta * x + alpha.
+
+    beta and alpha follow independent random walks with step variance
+    delta / (1 - delta); observation_var is the variance of the measurement
+    noise. Only the 2x2 state covariance is carried between bars,
+    and it is kept as plain floats so the single pass stays cheap.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    n = len(y)
+    beta_out = np.empty(n)
+    drift = delta / (1 - delta)
+
+    beta, alpha = 0.0, 0.0
+    # State covariance [[p_bb, p_ba], [p_ba, p_aa]]
+    p_bb, p_ba, p_aa = 1.0, 0.0, 1.0
+    for t in range(n):
+        xt = x[t]
+        # Predict: beta and alpha each take an independent random-walk step
+        p_bb += drift
+        p_aa += drift
+
+        # Update with the new observation, H = [xt, 1]
+        error = y[t] - (beta * xt + alpha)
+        ph_b = p_bb * xt + p_ba
+        ph_a = p_ba * xt + p_aa
+        variance = ph_b * xt + ph_a + observation_var
+        gain_b = ph_b / variance
+        gain_a = ph_a / variance
+        beta += gain_b * error
+        alpha += gain_a * error
+        p_bb -= gain_b * ph_b
+        p_ba -= gain_b * ph_a
+        p_aa -= gain_a * ph_a
+
+        beta_out[t] = beta
+    return beta_out
+
+
+def calculate_hedge_ratio(df, method="rolling_ols", window=60, delta=1e-4, observation_var=1.0):
+    """
+    Add a time-varying 'Hedge_Ratio' column (units of silver per unit of gold).
+    Pass it to calculate_spread as the scaling factor.
+    """
+    if method == "rolling_ols":
+        beta = rolling_ols_beta(df['Price_gold'], df['Price_silver'], window=window)
+    elif method == "kalman":
+        beta = kalman_beta(df['Price_gold'], df['Price_silver'], delta=delta, observation_var=observation_var)
+    else:
+        raise ValueError(f"Unknown hedge ratio method: {method}")
+
+    df['Hedge_Ratio'] = pd.Series(beta, index=df.index)
+    return df
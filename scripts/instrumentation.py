@@ -0,0 +1,326 @@
+import functools
+import json
+import logging
+import os
+import resource
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "%(message)s"
+
+# The active Profiler, or None while instrumentation is off
+_profiler = None
+
+
+def configure_logging(level="INFO"):
+    """
+    Send the pipeline's log messages to stderr as plain lines. INFO shows the
+    usual progress messages, DEBUG adds the frame previews and a JSON record
+    per profiled stage, WARNING keeps only problems.
+    """
+    logging.basicConfig(level=getattr(logging, str(level).upper()), format=LOG_FORMAT, force=True)
+
+
+def _rss_peak():
+    # High-water mark of the resident set in bytes; resettable on Linux
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _rss_current():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _rss_reset():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux >= 4.0);
+    # elsewhere the peak is the process-wide one
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _tracemalloc_peak():
+    import tracemalloc
+    return tracemalloc.get_traced_memory()[1]
+
+
+def _tracemalloc_current():
+    import tracemalloc
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _tracemalloc_reset():
+    import tracemalloc
+    tracemalloc.reset_peak()
+
+
+class _Stage:
+    """
+    One running stage. Set .rows inside a `with stage(...)` block to report
+    how many rows it processed.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.peak = 0
+        self.base = 0
+        self.start = None
+
+
+class _NullStage:
+    # Handed out while instrumentation is off: entering, leaving and setting
+    # rows on it all do nothing
+    __slots__ = ()
+    name = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """
+    Collects per-stage wall time, calls, rows processed and peak memory, plus
+    free-form counters.
+
+    memory="rss" measures the peak resident set of the process during each
+    stage (cheap, includes Arrow and other native buffers); "tracemalloc"
+    measures the peak of Python and NumPy allocations exactly, at a large
+    cost in speed; None skips memory. Each stage reports its peak and how far
+    that peak rose above the memory in use when it started. Nested stages are
+    supported: a stage's peak includes the peaks of the stages run inside it.
+    """
+
+    def __init__(self, memory="rss"):
+        self._started_tracing = False
+        if memory == "tracemalloc":
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._read_peak, self._read_current, self._reset_peak = (_tracemalloc_peak, _tracemalloc_current,
+                                                                     _tracemalloc_reset)
+        elif memory == "rss":
+            self._read_peak, self._read_current, self._reset_peak = _rss_peak, _rss_current, _rss_reset
+        elif memory is None:
+            self._read_peak = self._read_current = self._reset_peak = None
+        else:
+            raise ValueError(f"Unsupported memory mode: {memory!r}")
+        self.memory = memory
+        self.stages = {}
+        self.counters = {}
+        self._stack = []
+
+    def start(self, name):
+        stage = _Stage(name)
+        if self._read_peak is not None:
+            if self._stack:
+                # The reset below would hide the parent's peak so far
+                self._stack[-1].peak = max(self._stack[-1].peak, self._read_peak())
+            self._reset_peak()
+            stage.base = self._read_current()
+        self._stack.append(stage)
+        stage.start = time.perf_counter()
+        return stage
+
+    def stop(self, stage):
+        seconds = time.perf_counter() - stage.start
+        self._stack.pop()
+        if self._read_peak is not None:
+            stage.peak = max(stage.peak, self._read_peak())
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, stage.peak)
+
+        totals = self.stages.setdefault(stage.name, {"calls": 0, "seconds": 0.0, "rows": 0, "peak_memory_mb": None,
+                                                     "memory_growth_mb": None})
+        totals["calls"] += 1
+        totals["seconds"] += seconds
+        if stage.rows is not None:
+            totals["rows"] += int(stage.rows)
+        if self._read_peak is not None:
+            totals["peak_memory_mb"] = max(totals["peak_memory_mb"] or 0.0, stage.peak / 2**20)
+            growth = max(stage.peak - stage.base, 0) / 2**20
+            totals["memory_growth_mb"] = max(totals["memory_growth_mb"] or 0.0, growth)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({"stage": stage.name, "seconds": seconds, "rows": stage.rows,
+                                     "peak_memory_mb": stage.peak / 2**20 if self._read_peak else None}))
+
+    def close(self):
+        # Tracing slows every allocation, so stop it if this profiler started it
+        if self._started_tracing:
+            import tracemalloc
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self):
+        """
+        The collected numbers as a JSON-serializable dict; stages also get
+        rows per second.
+        """
+        stages = {}
+        for name, totals in self.stages.items():
+            stages[name] = dict(totals)
+            stages[name]["rows_per_second"] = totals["rows"] / totals["seconds"] if totals["seconds"] else None
+        return {"memory": self.memory, "stages": stages, "counters": dict(self.counters)}
+
+    def write_report(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def print_report(self):
+        print("Stage timings:")
+        print(f"{'stage':<30}{'calls':>6}{'seconds':>10}{'rows':>12}{'rows/s':>12}{'peak MB':>10}")
+        for name, s in self.report()["stages"].items():
+            rate = f"{s['rows_per_second']:,.0f}" if s["rows_per_second"] else "-"
+            peak = f"{s['peak_memory_mb']:.0f}" if s["peak_memory_mb"] is not None else "-"
+            print(f"{name:<30}{s['calls']:>6}{s['seconds']:>10.3f}{s['rows']:>12,}{rate:>12}{peak:>10}")
+        for name, value in self.counters.items():
+            print(f"{name}: {value:,}")
+
+
+def enable(memory="rss"):
+    """
+    Start collecting into a new Profiler and return it.
+    """
+    global _profiler
+    _profiler = Profiler(memory=memory)
+    return _profiler
+
+
+def disable():
+    """
+    Stop collecting and return the Profiler that was active (or None).
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+
+def active_profiler():
+    return _profiler
+
+
+@contextmanager
+def profiling(memory="rss", report_path=None):
+    """
+    Profile the block: `with profiling() as profiler: run_pipeline()`. With
+    report_path the JSON report is written when the block ends.
+    """
+    profiler = enable(memory=memory)
+    try:
+        yield profiler
+    finally:
+        disable()
+        if report_path is not None:
+            profiler.write_report(report_path)
+
+
+class _StageContext:
+    __slots__ = ("profiler", "stage")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.stage = profiler.start(name)
+
+    def __enter__(self):
+        return self.stage
+
+    def __exit__(self, *exc):
+        self.profiler.stop(self.stage)
+        return False
+
+
+def stage(name):
+    """
+    Time a block as a stage: `with stage("join") as s: ...; s.rows = len(df)`.
+    Costs one global lookup while instrumentation is off.
+    """
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_STAGE
+    return _StageContext(profiler, name)
+
+
+def count(name, n=1):
+    """
+    Add n to a named counter of the active profiler, if any.
+    """
+    profiler = _profiler
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def _rows_of(value):
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(value)
+    return None
+
+
+def instrumented(name=None):
+    """
+    Decorator timing every call of a function as a stage (named after the
+    function unless name is given). Rows are those of the first argument
+    when it is a frame, series or array, or else of the returned one. While
+    instrumentation is off the wrapper only checks one global.
+    """
+
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            current = profiler.start(stage_name)
+            try:
+                result = func(*args, **kwargs)
+                rows = _rows_of(args[0]) if args else None
+                current.rows = rows if rows is not None else _rows_of(result)
+                return result
+            finally:
+                profiler.stop(current)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,270 @@
+import logging
+import re
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from price_store import STORE_DIR, CHUNK_ROWS, downcast_prices, iter_ticker, iter_combined, read_ticker, \
+    stored_rows, write_combined_chunks
+from analyze_data import combine_prices
+from backtest_strategy import calculate_zscore, backtest_strategy, print_performance_metrics
+from instrumentation import count, stage
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+
+# COMEX gold and silver futures trade about 23 hours a day
+TRADING_HOURS_PER_DAY = 23
+
+# Bars per ticker up to which run_intraday_pipeline works in memory: below
+# this the chunked path's fixed overhead (Parquet row-group buffers, per-chunk
+# frames) costs more than it saves, see benchmark_intraday
+IN_MEMORY_ROWS = 500_000
+
+IntradayResult = namedtuple("IntradayResult", ["rows", "metrics", "net_metrics"])
+
+
+def periods_per_year(interval="1d", hours_per_day=TRADING_HOURS_PER_DAY):
+    """
+    Number of bars in a trading year for a yfinance-style interval such as
+    "1m", "5m", "1h" or "1d". Used to annualize per-bar returns.
+    """
+    match = re.fullmatch(r"(\d+)\s*(m|min|h|d)", interval.strip().lower())
+    if match is None:
+        raise ValueError(f"Unsupported bar interval: {interval!r}")
+    size, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return TRADING_DAYS_PER_YEAR / size
+    minutes = size * 60 if unit == "h" else size
+    return TRADING_DAYS_PER_YEAR * hours_per_day * 60 / minutes
+
+
+def join_chunks(gold_chunks, silver_chunks):
+    """
+    Inner-join two date-sorted streams of 'Price' chunks on their index.
+
+    Like DataFrame.join(how='inner') on the whole series, but only the
+    unmatched tail of each stream is held between chunks, so memory is bounded
+    by the chunk size instead of the length of the history.
+    """
+    gold_chunks, silver_chunks = iter(gold_chunks), iter(silver_chunks)
+    gold = silver = None
+    gold_done = silver_done = False
+    while True:
+        if (gold is None or gold.empty) and not gold_done:
+            gold = next(gold_chunks, None)
+            gold_done = gold is None
+        if (silver is None or silver.empty) and not silver_done:
+            silver = next(silver_chunks, None)
+            silver_done = silver is None
+        if gold is None or silver is None or gold.empty or silver.empty:
+            # One side has run out, so nothing left on the other can match
+            if gold_done or silver_done:
+                return
+            continue
+
+        # Every bar up to the earlier of the two last timestamps can be matched now
+        cutoff = min(gold.index[-1], silver.index[-1])
+        ready_gold = gold.index <= cutoff
+        ready_silver = silver.index <= cutoff
+        joined = gold[ready_gold].join(silver[ready_silver], how='inner', lsuffix="_gold", rsuffix="_silver")
+        gold, silver = gold[~ready_gold], silver[~ready_silver]
+        if len(joined):
+            yield joined
+
+
+def combine_chunks(joined_chunks):
+    """
+    combine_prices for a stream of joined chunks: add 'Gold Returns' and
+    'Silver Returns', carrying the previous chunk's last prices across the
+    boundary, and drop the first bar of the stream.
+    """
+    previous = None
+    for chunk in joined_chunks:
+        prices = chunk[['Price_gold', 'Price_silver']].astype(np.float64)
+        if previous is not None:
+            prices = pd.concat([previous, prices])
+        returns = prices.pct_change().iloc[len(prices) - len(chunk):]
+        previous = prices.iloc[-1:]
+
+        chunk = chunk.copy()
+        chunk['Gold Returns'] = returns['Price_gold'].to_numpy()
+        chunk['Silver Returns'] = returns['Price_silver'].to_numpy()
+        chunk = chunk.dropna()
+        if len(chunk):
+            yield chunk
+
+
+def combine_prices_chunked(gold_ticker="GC=F", silver_ticker="SI=F", chunk_rows=CHUNK_ROWS,
+                           store_dir=STORE_DIR, compact=True):
+    """
+    Out-of-core analyze_data: stream both tickers' closes from the price store,
+    join and combine them chunk by chunk, and write the combined frame to the
+    store. With compact=True prices are kept as float32 where precision
+    allows anywhere in a ticker's history; the choice is made once per ticker,
+    since the first chunk fixes the combined file's schema. Returns the file
+    path and the number of rows written.
+    """
+    def price_dtype(ticker):
+        # An extra pass over the closes, stopping at the first one float32 can't hold
+        for chunk in iter_ticker(ticker, columns=["Close"], chunk_rows=chunk_rows, store_dir=store_dir):
+            if chunk["Close"].dtype == np.float32:
+                break  # stored compact already
+            if downcast_prices(chunk)["Close"].dtype == np.float64:
+                return np.float64
+        return np.float32
+
+    def closes(ticker):
+        dtype = price_dtype(ticker) if compact else None
+        for chunk in iter_ticker(ticker, columns=["Close"], chunk_rows=chunk_rows, store_dir=store_dir):
+            chunk = chunk.dropna().rename(columns={"Close": "Price"})
+            yield chunk if dtype is None else chunk.astype(dtype)
+
+    with stage("combine_prices_chunked") as combined:
+        joined = join_chunks(closes(gold_ticker), closes(silver_ticker))
+        path, rows = write_combined_chunks(combine_chunks(joined), store_dir=store_dir)
+        combined.rows = rows
+    logger.info("Combined %d rows into %s", rows, path)
+    return path, rows
+
+
+def zscore_chunks(chunks, window=30, scaling_factor=1):
+    """
+    calculate_spread and calculate_zscore for a stream of price chunks.
+
+    The last window - 1 spreads of each chunk are prepended to the next one,
+    so the rolling mean and std dev match a pass over the whole series.
+    """
+    tail = None
+    for chunk in chunks:
+        frame = chunk.copy()
+        frame['Spread'] = frame['Price_gold'].astype(np.float64) - scaling_factor * frame['Price_silver'].astype(np.float64)
+        if tail is not None:
+            frame = pd.concat([tail, frame])
+        frame = calculate_zscore(frame, window=window)
+        tail = frame[['Spread']].iloc[max(len(frame) - (window - 1), 0):]
+        yield frame.iloc[len(frame) - len(chunk):]
+
+
+class ReturnStats:
+    """
+    Running version of the calculate_performance_metrics figures, fed one
+    chunk of Strategy_Return values at a time.
+
+    Mean and variance are merged across chunks with Chan's parallel update,
+    and the compounded growth and running peak are carried over, so the
+    results match a single pass over the whole series up to rounding.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.growth = 1.0
+        self.peak = np.nan
+        self.max_drawdown = np.nan
+        self.last = np.nan
+
+    def update(self, returns):
+        returns = np.asarray(returns, dtype=np.float64)
+        if not len(returns):
+            return
+        missing = np.isnan(returns)
+        valid = returns[~missing]
+        if len(valid):
+            n = len(valid)
+            mean = valid.mean()
+            m2 = np.sum((valid - mean) ** 2)
+            total = self.count + n
+            delta = mean - self.mean
+            self.mean += delta * n / total
+            self.m2 += m2 + delta * delta * self.count * n / total
+            self.count = total
+
+        # (1 + r).cumprod() - 1, skipping NaN returns like pandas does
+        growth = self.growth * np.cumprod(np.where(missing, 1.0, 1.0 + returns))
+        cumulative = np.where(missing, np.nan, growth - 1)
+        peak = np.fmax.accumulate(np.concatenate(([self.peak], cumulative)))[1:]
+        drawdown = peak - cumulative
+        if not np.isnan(drawdown).all():
+            self.max_drawdown = np.fmax(self.max_drawdown, np.nanmax(drawdown))
+        self.growth = growth[-1]
+        self.peak = peak[-1]
+        self.last = cumulative[-1]
+
+    def result(self, periods_per_year=TRADING_DAYS_PER_YEAR):
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+        annualized_return = self.mean * periods_per_year if self.count else np.nan
+        annualized_volatility = std * np.sqrt(periods_per_year)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe_ratio = np.float64(annualized_return) / annualized_volatility
+        return {
+            "Cumulative_Return": self.last,
+            "Annualized_Return": annualized_return,
+            "Annualized_Volatility": annualized_volatility,
+            "Sharpe_Ratio": sharpe_ratio,
+            "Max_Drawdown": self.max_drawdown,
+        }
+
+
+def backtest_chunked(chunks, window=30, z_entry=2, z_exit=0.5, scaling_factor=1, costs=None,
+                     periods_per_year=TRADING_DAYS_PER_YEAR):
+    """
+    Run spread -> Z-score -> backtest -> metrics over a stream of combined
+    price chunks without holding the whole history in memory.
+
+    Each chunk is backtested with backtest_strategy after prepending the last
+    bar of the previous chunk, so Strategy_Return and costs at the boundary use
+    the position held into it. Returns the gross metrics and the net metrics
+    (None when costs is None), as calculate_performance_metrics would.
+    """
+    gross = ReturnStats()
+    net = ReturnStats() if costs is not None else None
+    previous = None
+    rows = 0
+    for chunk in zscore_chunks(chunks, window=window, scaling_factor=scaling_factor):
+        frame = chunk if previous is None else pd.concat([previous, chunk])
+        frame = backtest_strategy(frame, z_entry=z_entry, z_exit=z_exit, costs=costs)
+        frame = frame.iloc[len(frame) - len(chunk):]
+        gross.update(frame['Strategy_Return'].to_numpy())
+        if net is not None:
+            net.update(frame['Net_Strategy_Return'].to_numpy())
+        previous = chunk[['Spread', 'Z_Score']].iloc[-1:]
+        rows += len(chunk)
+        count("backtest_chunks")
+
+    metrics = gross.result(periods_per_year)
+    print_performance_metrics(metrics)
+    net_metrics = None
+    if net is not None:
+        net_metrics = net.result(periods_per_year)
+        print_performance_metrics(net_metrics, net=True)
+    return IntradayResult(rows, metrics, net_metrics)
+
+
+def run_intraday_pipeline(gold_ticker="GC=F", silver_ticker="SI=F", interval="1m", window=30, z_entry=2,
+                          z_exit=0.5, scaling_factor=1, costs=None, chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR,
+                          in_memory_rows=IN_MEMORY_ROWS):
+    """
+    Combine and backtest a pair of stored tickers in chunks of chunk_rows rows.
+
+    Peak memory depends on chunk_rows and window, not on how many bars are
+    stored, so years of minute bars fit in a fixed budget. Pairs with at most
+    in_memory_rows bars per ticker are combined and backtested in one piece
+    without writing the combined file, which uses less memory at that size.
+    Metrics are annualized for the given bar interval.
+    """
+    tickers = [gold_ticker, silver_ticker]
+    if max(stored_rows(ticker, store_dir) for ticker in tickers) <= in_memory_rows:
+        df = combine_prices(*[read_ticker(ticker, columns=["Close"], store_dir=store_dir).dropna()
+                              .rename(columns={"Close": "Price"}) for ticker in tickers])
+        chunks = [df[["Price_gold", "Price_silver"]]]
+    else:
+        combine_prices_chunked(gold_ticker, silver_ticker, chunk_rows=chunk_rows, store_dir=store_dir)
+        chunks = iter_combined(columns=["Price_gold", "Price_silver"], chunk_rows=chunk_rows, store_dir=store_dir)
+    with stage("backtest_chunked") as backtested:
+        result = backtest_chunked(chunks, window=window, z_entry=z_entry, z_exit=z_exit,
+                                  scaling_factor=scaling_factor, costs=costs,
+                                  periods_per_year=periods_per_year(interval))
+        backtested.rows = result.rows
+    return result
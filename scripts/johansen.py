@@ -0,0 +1,249 @@
+import functools
+import itertools
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from instrumentation import instrumented
+
+JohansenResult = namedtuple("JohansenResult", ["eigenvalues", "eigenvectors", "trace_stat", "max_eig_stat",
+                                               "trace_crit", "max_eig_crit", "nobs"])
+
+
+@functools.lru_cache(maxsize=None)
+def johansen_critical_values(n_vars, det_order=0):
+    """
+    90%, 95% and 99% critical values of the trace and maximum eigenvalue
+    statistics for each rank r = 0 .. n_vars-1, as (trace, max_eig) arrays of
+    shape (n_vars, 3). Cached, since every basket of a size shares them.
+    """
+    from statsmodels.tsa.coint_tables import c_sja, c_sjt
+
+    trace = np.array([c_sjt(n_vars - r, det_order) for r in range(n_vars)])
+    max_eig = np.array([c_sja(n_vars - r, det_order) for r in range(n_vars)])
+    trace.setflags(write=False)
+    max_eig.setflags(write=False)
+    return trace, max_eig
+
+
+def _detrend(x, order):
+    # Residuals of every column on a polynomial trend, like coint_johansen's detrend
+    if order == -1:
+        return x
+    trend = np.vander(np.linspace(-1, 1, len(x)), order + 1)
+    coef, *_ = np.linalg.lstsq(trend, x, rcond=None)
+    return x - trend @ coef
+
+
+def _moments(prices, det_order, k_ar_diff):
+    """
+    Cross-product matrix of every series' differences, levels and lagged
+    differences, filtered exactly as statsmodels' coint_johansen filters a
+    basket. Each basket's moment matrices are sub-blocks of this one, so it
+    is computed once for the whole universe. Returns it with the number of
+    observations.
+    """
+    f = 0 if det_order > -1 else -1
+    x = _detrend(np.asarray(prices, dtype=np.float64), det_order)
+    n_obs, n_series = x.shape
+    dx = np.diff(x, axis=0)
+    nobs = len(dx) - k_ar_diff
+    blocks = [dx[k_ar_diff:], x[1:n_obs - k_ar_diff]]  # differences, then levels (coint_johansen's lx)
+    blocks += [dx[k_ar_diff - lag:len(dx) - lag] for lag in range(1, k_ar_diff + 1)]
+    w = _detrend(np.hstack(blocks), f)
+    return w.T @ w, nobs
+
+
+def _singular(s, floor, tol=1e-10):
+    """
+    Mask of the (B, m, m) moment blocks that are singular to working
+    precision: a series whose scale is at most floor (it never moves, up to
+    the rounding left by detrending), or series that are exact linear
+    combinations of each other (e.g. one leg twice another).
+    """
+    scale = np.sqrt(np.diagonal(s, axis1=1, axis2=2))
+    flat = ~(scale > floor)
+    scale = np.where(flat, 1.0, scale)
+    corr = s / (scale[:, :, None] * scale[:, None, :])
+    return flat.any(axis=1) | ~(np.linalg.eigvalsh(corr)[:, 0] > tol)
+
+
+def _basket_statistics(moments, nobs, baskets, n_series, k_ar_diff):
+    """
+    Johansen eigenvalues and eigenvectors for a (B, k) array of baskets,
+    from the universe moment matrix: partial the lagged differences out
+    with one batched solve, then one batched symmetric eigendecomposition.
+    Baskets whose differences or levels are singular (see _singular) have
+    no defined statistics and get NaN.
+    """
+    count, k = baskets.shape
+    diff_idx, level_idx = baskets, baskets + n_series
+    lag_idx = np.concatenate([baskets + (2 + lag) * n_series for lag in range(k_ar_diff)], axis=1) \
+        if k_ar_diff else np.empty((count, 0), dtype=baskets.dtype)
+
+    def block(rows, cols):
+        return moments[rows[:, :, None], cols[:, None, :]]
+
+    s00, s11, s10 = block(diff_idx, diff_idx), block(level_idx, level_idx), block(level_idx, diff_idx)
+    # Flat means 1e-8 of the largest series' scale, far below any traded price's moves
+    scale = np.sqrt(np.diagonal(moments))
+    singular = (_singular(s00, 1e-8 * scale[:n_series].max())
+                | _singular(s11, 1e-8 * scale[n_series:2 * n_series].max()))
+    if singular.any():
+        eigenvalues, eigenvectors = np.full((count, k), np.nan), np.full((count, k, k), np.nan)
+        if not singular.all():
+            eigenvalues[~singular], eigenvectors[~singular] = _basket_statistics(
+                moments, nobs, baskets[~singular], n_series, k_ar_diff)
+        return eigenvalues, eigenvectors
+    if k_ar_diff:
+        szz = block(lag_idx, lag_idx)
+        sz0, sz1 = block(lag_idx, diff_idx), block(lag_idx, level_idx)
+        b0 = np.linalg.solve(szz, sz0)
+        b1 = np.linalg.solve(szz, sz1)
+        s00 = s00 - sz0.swapaxes(1, 2) @ b0
+        s11 = s11 - sz1.swapaxes(1, 2) @ b1
+        s10 = s10 - sz1.swapaxes(1, 2) @ b0
+    s00, s11, s10 = s00 / nobs, s11 / nobs, s10 / nobs
+
+    # Generalized symmetric problem S10 S00^-1 S01 v = lambda S11 v, reduced with
+    # S11 = L L' to an ordinary one for L^-1 S10 S00^-1 S01 L^-T
+    sig = s10 @ np.linalg.solve(s00, s10.swapaxes(1, 2))
+    chol = np.linalg.cholesky(s11)
+    half = np.linalg.solve(chol, sig)
+    reduced = np.linalg.solve(chol, half.swapaxes(1, 2))
+    reduced = (reduced + reduced.swapaxes(1, 2)) / 2
+    eigenvalues, vectors = np.linalg.eigh(reduced)
+    eigenvalues, vectors = eigenvalues[:, ::-1], vectors[:, :, ::-1]
+    # Back to the original coordinates, normalized so v' S11 v = 1 like coint_johansen
+    eigenvectors = np.linalg.solve(chol.swapaxes(1, 2), vectors)
+    # Sign: first leg positive in every vector
+    eigenvectors *= np.where(eigenvectors[:, :1, :] < 0, -1.0, 1.0)
+    return eigenvalues, eigenvectors
+
+
+@instrumented()
+def johansen_batch(prices, baskets, det_order=0, k_ar_diff=1, chunk_size=4096, moments=None):
+    """
+    Johansen cointegration test of many baskets of the columns of prices
+    (observations x series), as statsmodels' coint_johansen would give for
+    each basket on its own.
+
+    baskets is a (B, k) array of column indices, all of the same size k.
+    The moment matrix of the whole universe is built once (or passed in,
+    from _moments, to share it between calls) and every basket reads its
+    blocks from it; baskets are then processed chunk_size at a time with
+    batched solves and eigendecompositions.
+
+    Returns a JohansenResult: eigenvalues (B, k) in decreasing order,
+    eigenvectors (B, k, k) as columns (first leg positive), trace and
+    maximum eigenvalue statistics (B, k) for r = 0 .. k-1, and their
+    critical values (k, 3), shared by all baskets.
+    """
+    if det_order not in (-1, 0, 1):
+        raise ValueError("det_order must be -1, 0 or 1")
+    prices = np.asarray(prices, dtype=np.float64)
+    baskets = np.atleast_2d(np.asarray(baskets, dtype=np.intp))
+    count, k = baskets.shape
+    if moments is None:
+        moments = _moments(prices, det_order, k_ar_diff)
+    matrix, nobs = moments
+
+    eigenvalues = np.empty((count, k))
+    eigenvectors = np.empty((count, k, k))
+    for start in range(0, count, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        try:
+            eigenvalues[chunk], eigenvectors[chunk] = _basket_statistics(matrix, nobs, baskets[chunk],
+                                                                         prices.shape[1], k_ar_diff)
+        except np.linalg.LinAlgError:
+            # A basket near enough singular to get past _singular: solve the chunk one basket at a time
+            for b in range(start, min(start + chunk_size, count)):
+                try:
+                    values, vectors = _basket_statistics(matrix, nobs, baskets[b:b + 1], prices.shape[1],
+                                                         k_ar_diff)
+                    eigenvalues[b], eigenvectors[b] = values[0], vectors[0]
+                except np.linalg.LinAlgError:
+                    eigenvalues[b], eigenvectors[b] = np.nan, np.nan
+
+    log_terms = np.log1p(-eigenvalues)
+    trace_stat = -nobs * np.cumsum(log_terms[:, ::-1], axis=1)[:, ::-1]
+    max_eig_stat = -nobs * log_terms
+    trace_crit, max_eig_crit = johansen_critical_values(k, det_order)
+    return JohansenResult(eigenvalues, eigenvectors, trace_stat, max_eig_stat, trace_crit, max_eig_crit, nobs)
+
+
+def coint_johansen(prices, det_order=0, k_ar_diff=1):
+    """
+    Johansen test of one basket: all columns of prices. Returns a
+    JohansenResult with the leading basket axis dropped.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    result = johansen_batch(prices, np.arange(prices.shape[1])[None, :], det_order=det_order, k_ar_diff=k_ar_diff)
+    return result._replace(eigenvalues=result.eigenvalues[0], eigenvectors=result.eigenvectors[0],
+                           trace_stat=result.trace_stat[0], max_eig_stat=result.max_eig_stat[0])
+
+
+def cointegration_rank(trace_stat, trace_crit, level=1):
+    """
+    Number of cointegrating relations: how many of the hypotheses rank <= r,
+    r = 0, 1, ..., are rejected in a row by the trace test. level indexes
+    the critical values (0: 90%, 1: 95%, 2: 99%). Works on one basket or a
+    (B, k) batch.
+    """
+    rejected = np.asarray(trace_stat) > np.asarray(trace_crit)[:, level]
+    return np.cumprod(rejected, axis=-1).sum(axis=-1)
+
+
+def basket_weights(eigenvectors, legs=None):
+    """
+    Spread weights from the first (most strongly mean-reverting) Johansen
+    eigenvector, scaled so the first leg has weight 1. With legs, a Series
+    indexed by leg name; otherwise an array (or (B, k) array for a batch).
+    """
+    vector = np.asarray(eigenvectors)[..., :, 0]
+    weights = vector / vector[..., :1]
+    return pd.Series(weights, index=legs) if legs is not None else weights
+
+
+def screen_baskets(panel, size=3, det_order=0, k_ar_diff=1, level=1, chunk_size=4096, top=None):
+    """
+    Johansen-test every `size`-leg basket of the panel's columns and rank
+    them by how far the rank-0 trace statistic exceeds its critical value.
+
+    All baskets share one moment matrix of the panel, and they are tested
+    chunk_size at a time with batched linear algebra, so thousands of 3-4
+    leg combinations take seconds rather than minutes.
+    """
+    names = list(panel.columns)
+    prices = panel.dropna().to_numpy(dtype=np.float64)
+    baskets = np.array(list(itertools.combinations(range(len(names)), size)), dtype=np.intp)
+    result = johansen_batch(prices, baskets, det_order=det_order, k_ar_diff=k_ar_diff, chunk_size=chunk_size)
+
+    weights = basket_weights(result.eigenvectors)
+    results = pd.DataFrame({
+        "Basket": [tuple(names[i] for i in basket) for basket in baskets],
+        "Trace_Stat": result.trace_stat[:, 0],
+        "Trace_Crit": result.trace_crit[0, level],
+        "Max_Eig_Stat": result.max_eig_stat[:, 0],
+        "Max_Eig_Crit": result.max_eig_crit[0, level],
+        "Rank": cointegration_rank(result.trace_stat, result.trace_crit, level),
+        "Weights": [tuple(w) for w in weights],
+    })
+    results["Margin"] = results["Trace_Stat"] / results["Trace_Crit"]
+    results = results.sort_values("Margin", ascending=False).reset_index(drop=True)
+    return results.head(top) if top else results
+
+
+if __name__ == "__main__":
+    import argparse
+    from price_store import read_ticker, ticker_key
+
+    parser = argparse.ArgumentParser(description="Screen baskets of stored tickers with the Johansen test.")
+    parser.add_argument("tickers", nargs="+", help="tickers in the price store, e.g. GC=F SI=F PL=F GDX")
+    parser.add_argument("--size", type=int, default=3, help="legs per basket (default: 3)")
+    parser.add_argument("--k-ar-diff", type=int, default=1, help="lagged differences in the VECM (default: 1)")
+    parser.add_argument("--top", type=int, default=20, help="baskets to show (default: 20)")
+    args = parser.parse_args()
+
+    panel = pd.concat({ticker_key(t): read_ticker(t, columns=["Close"])["Close"] for t in args.tickers},
+                      axis=1, join="inner")
+    print(screen_baskets(panel, size=args.size, k_ar_diff=args.k_ar_diff, top=args.top).to_string(index=False))
@@ -0,0 +1,147 @@
+import contextlib
+import itertools
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from statarb_common.fast_coint import coint_batch
+from instrumentation import configure_logging
+from price_store import read_combined
+from shared_prices import SharedCloses, write_shared_closes
+
+logger = logging.getLogger(__name__)
+
+# Price matrix shared by the functions below; each worker process gets its own
+# copy once, through the pool initializer, instead of once per work unit.
+# When scanning a SharedCloses store, workers map the store file instead and
+# no prices are copied at all.
+_prices = None
+
+
+def _complete_dates(closes, start=None, end=None):
+    """
+    Mask of the dates from start to end of a SharedCloses store on which no
+    ticker is missing (the equivalent of panel.dropna()).
+    """
+    return ~np.isnan(closes.matrix(start=start, end=end)).any(axis=0)
+
+
+def _init_worker(prices, start=None, end=None):
+    global _prices
+    if isinstance(prices, SharedCloses):
+        # scan_pairs only hands workers a store with no missing dates in range,
+        # so this stays a view into the map
+        prices = prices.matrix(start=start, end=end).T
+    _prices = prices
+
+
+def hedge_ratio_and_half_life(y, x):
+    """
+    OLS hedge ratio of y on x (with intercept) and the mean-reversion half-life
+    of the resulting spread, in bars.
+    """
+    X = np.column_stack([np.ones_like(x), x])
+    (intercept, hedge_ratio), *_ = np.linalg.lstsq(X, y, rcond=None)
+    spread = y - hedge_ratio * x - intercept
+
+    # Regress the change in the spread on its lagged level: dS = lambda * S(t-1)
+    lagged = spread[:-1] - spread[:-1].mean()
+    speed = np.dot(lagged, np.diff(spread)) / np.dot(lagged, lagged)
+    half_life = -np.log(2) / speed if speed < 0 else np.inf
+    return hedge_ratio, half_life
+
+
+def _test_pairs(pairs):
+    """
+    Run the Engle-Granger test on one chunk of (i, j) column pairs, batched
+    over the whole chunk with fast_coint.coint_batch.
+    """
+    i, j = np.array(pairs).reshape(-1, 2).T
+    tests = coint_batch(_prices[:, i].T, _prices[:, j].T)
+    rows = []
+    for k in range(len(pairs)):
+        hedge_ratio, half_life = hedge_ratio_and_half_life(_prices[:, i[k]], _prices[:, j[k]])
+        rows.append((i[k], j[k], tests.statistic[k], tests.pvalue[k], hedge_ratio, half_life))
+    return rows
+
+
+def candidate_pairs(prices, min_correlation=0.5):
+    """
+    All column pairs whose price correlation is at least min_correlation.
+    Weakly correlated pairs are very unlikely to be cointegrated, so they are
+    skipped before running the expensive tests.
+    """
+    corr = np.corrcoef(prices, rowvar=False)
+    i, j = np.triu_indices(prices.shape[1], k=1)
+    keep = np.abs(corr[i, j]) >= min_correlation
+    return list(zip(i[keep], j[keep]))
+
+
+def scan_pairs(panel, min_correlation=0.5, max_half_life=None, workers=None, chunk_size=20, start=None, end=None):
+    """
+    Screen every pair of columns in a panel of aligned prices for cointegration.
+
+    The pairwise tests are split into chunks of chunk_size pairs and spread
+    across a pool of worker processes. Returns a table with the test statistic,
+    p-value, hedge ratio and half-life of each tested pair, sorted by p-value.
+
+    panel can also be a shared_prices.SharedCloses store, optionally limited
+    to the dates from start to end. Workers then attach to the memory-mapped
+    file instead of receiving a pickled copy of the prices. If any ticker is
+    missing a date in that range, the complete dates are first written to a
+    temporary store, once, for the workers to map instead.
+    """
+    with contextlib.ExitStack() as stack:
+        if isinstance(panel, SharedCloses):
+            tickers = list(panel.symbols)
+            complete = _complete_dates(panel, start, end)
+            if not complete.all():
+                dates = panel.dates[panel.date_slice(start, end)][complete]
+                frame = pd.DataFrame(panel.matrix(start=start, end=end)[:, complete].T, index=dates,
+                                     columns=tickers, copy=False)
+                tmp = stack.enter_context(tempfile.TemporaryDirectory())
+                panel = SharedCloses(write_shared_closes(frame, tmp, dtype=panel.values.dtype))
+                start = end = None
+                del frame
+            source = (panel, start, end)
+            prices = panel.matrix(start=start, end=end).T
+        else:
+            panel = panel.dropna()
+            tickers = list(panel.columns)
+            prices = panel.to_numpy(dtype=np.float64)
+            source = (prices,)
+
+        pairs = candidate_pairs(prices, min_correlation)
+        logger.info("Testing %d of %d pairs (correlation >= %s)",
+                    len(pairs), len(tickers) * (len(tickers) - 1) // 2, min_correlation)
+
+        chunks = [pairs[k:k + chunk_size] for k in range(0, len(pairs), chunk_size)]
+        workers = workers or os.cpu_count()
+        if workers == 1:
+            _init_worker(prices)
+            rows = list(itertools.chain.from_iterable(map(_test_pairs, chunks)))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=source) as pool:
+                rows = list(itertools.chain.from_iterable(pool.map(_test_pairs, chunks)))
+
+    results = pd.DataFrame(rows, columns=["i", "j", "Test_Statistic", "P_Value", "Hedge_Ratio", "Half_Life"])
+    results.insert(0, "Ticker_A", [tickers[i] for i in results["i"]])
+    results.insert(1, "Ticker_B", [tickers[j] for j in results["j"]])
+    results = results.drop(columns=["i", "j"])
+
+    if max_half_life is not None:
+        results = results[results["Half_Life"] <= max_half_life]
+
+    return results.sort_values("P_Value").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    configure_logging()
+
+    # Load the gold and silver prices from the price store
+    panel = read_combined(columns=["Price_gold", "Price_silver"])
+
+    results = scan_pairs(panel)
+    print(results.to_string(index=False))
@@ -0,0 +1,363 @@
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import math
+import os
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from price_store import COMBINED_FILE, STORE_DIR, read_combined, read_ticker
+from statarb_common.rolling_moments import RollingMoments
+
+Bar = namedtuple("Bar", ["timestamp", "price_gold", "price_silver", "received"])
+Order = namedtuple("Order", ["timestamp", "gold_quantity", "silver_quantity", "price_gold", "price_silver", "sent"])
+Fill = namedtuple("Fill", ["timestamp", "gold_quantity", "silver_quantity", "price_gold", "price_silver", "cost"])
+PaperTradingResult = namedtuple("PaperTradingResult", ["bars", "fills", "latency"])
+
+def load_replay_frame(paths=None, store_dir=STORE_DIR, gold_ticker="GC=F", silver_ticker="SI=F"):
+    """
+    Load the bars to replay: by default the combined gold/silver frame in
+    the price store (as analyze_data writes it), or, when there is none yet,
+    the two tickers' stored closes joined with combine_prices; or CSV files
+    given as a path, a glob or a list of paths.
+
+    A file that already has 'Price_gold' and 'Price_silver' columns (such as
+    data/processed_data.csv) is used as is. Otherwise two raw ticker files
+    as downloaded by yfinance, gold first, are cleaned and joined the same way
+    analyze_data does it.
+    """
+    if paths is None:
+        if os.path.exists(os.path.join(store_dir, COMBINED_FILE)):
+            return read_combined(columns=['Price_gold', 'Price_silver'], store_dir=store_dir).dropna()
+        from analyze_data import combine_prices
+        gold, silver = (read_ticker(ticker, columns=["Close"], store_dir=store_dir).dropna()
+                        .rename(columns={"Close": "Price"}) for ticker in (gold_ticker, silver_ticker))
+        return combine_prices(gold, silver)[['Price_gold', 'Price_silver']]
+    if isinstance(paths, str):
+        paths = sorted(glob.glob(paths)) or [paths]
+    for path in paths:
+        header = pd.read_csv(path, nrows=0).columns
+        if "Price_gold" in header and "Price_silver" in header:
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+            return df[['Price_gold', 'Price_silver']].dropna()
+
+    if len(paths) != 2:
+        raise ValueError(f"Expected a combined CSV or a gold and a silver CSV, got {paths}")
+    from analyze_data import clean_data, combine_prices
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = combine_prices(clean_data(paths[0]), clean_data(paths[1]))
+    return df[['Price_gold', 'Price_silver']]
+
+
+class ReplayFeed:
+    """
+    Plays a frame of gold and silver closes back as a live bar feed.
+
+    speed is how many seconds of market time pass per second of wall time
+    (86400 plays one daily bar a second); None replays as fast as the
+    consumer keeps up. Bars are scheduled against the start of the replay,
+    so time spent downstream doesn't make the feed drift.
+    """
+
+    def __init__(self, df, speed=None):
+        self.df = df
+        self.speed = speed
+
+    @classmethod
+    def from_store(cls, store_dir=STORE_DIR, speed=None):
+        return cls(load_replay_frame(store_dir=store_dir), speed=speed)
+
+    @classmethod
+    def from_csv(cls, paths, speed=None):
+        return cls(load_replay_frame(paths), speed=speed)
+
+    async def bars(self):
+        loop = asyncio.get_running_loop()
+        timestamps = self.df.index
+        gold = self.df['Price_gold'].to_numpy(dtype=np.float64)
+        silver = self.df['Price_silver'].to_numpy(dtype=np.float64)
+        start = loop.time()
+        for i, timestamp in enumerate(timestamps):
+            if self.speed:
+                offset = (timestamp - timestamps[0]).total_seconds() / self.speed
+                await asyncio.sleep(max(start + offset - loop.time(), 0))
+            else:
+                await asyncio.sleep(0)  # let the consumer run between bars
+            yield Bar(timestamp, gold[i], silver[i], time.perf_counter())
+
+
+class SpreadSignal:
+    """
+    Incremental version of calculate_spread -> calculate_zscore -> backtest_strategy.
+
+    Each update() takes the latest closes and returns the spread, its Z-score
+    against the last `window` spreads and the position for the bar. The
+    rolling mean and std dev come from a rolling_moments.RollingMoments, so
+    a bar costs the same whatever the window, a missing price only blanks
+    the Z-score until it leaves the window, and rounding is reset every
+    resync bars.
+    """
+
+    def __init__(self, scaling_factor=1, window=30, z_entry=2, z_exit=0.5, resync=10_000):
+        self.scaling_factor = scaling_factor
+        self.window = window
+        self.z_entry = z_entry
+        self.z_exit = z_exit
+        self._moments = RollingMoments(window, resync=resync)
+
+    def update(self, price_gold, price_silver):
+        spread = price_gold - self.scaling_factor * price_silver
+        self._moments.push(spread)
+        z_score = self._moments.zscore(spread)
+
+        # Same rules as backtest_strategy, bar by bar
+        position = 0
+        if z_score > self.z_entry:
+            position = -1
+        elif z_score < -self.z_entry:
+            position = 1
+        if abs(z_score) < self.z_exit:
+            position = 0
+        return spread, z_score, position
+
+
+class LatencyHistogram:
+    """
+    Log-spaced histogram of latencies in seconds, from `low` to `high` with
+    buckets_per_decade buckets per factor of ten. Recording is a bucket
+    increment, so it can stay on in the hot path; percentiles are reported
+    as the upper edge of their bucket.
+    """
+
+    def __init__(self, low=1e-6, high=10.0, buckets_per_decade=10):
+        decades = math.log10(high / low)
+        self.edges = low * 10 ** (np.arange(int(round(decades * buckets_per_decade)) + 1) / buckets_per_decade)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)  # plus under- and overflow
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[np.searchsorted(self.edges, seconds, side="right")] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def percentile(self, q):
+        if not self.count:
+            return math.nan
+        rank = np.searchsorted(np.cumsum(self.counts), q / 100 * self.count)
+        return self.max if rank >= len(self.edges) else min(self.edges[rank], self.max)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else math.nan,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+    def to_frame(self):
+        """
+        Non-empty buckets as a frame of [Lower, Upper) edges in seconds and counts.
+        """
+        lower = np.concatenate(([0.0], self.edges))
+        upper = np.concatenate((self.edges, [np.inf]))
+        frame = pd.DataFrame({"Lower": lower, "Upper": upper, "Count": self.counts})
+        return frame[frame["Count"] > 0].reset_index(drop=True)
+
+
+def print_latency(latency):
+    """
+    Print a summary line per histogram as returned in PaperTradingResult.latency.
+    """
+    for name, histogram in latency.items():
+        s = histogram.summary()
+        print(f"{name}: {s['count']} samples, mean {s['mean'] * 1e6:.1f}us, p50 {s['p50'] * 1e6:.1f}us, "
+              f"p90 {s['p90'] * 1e6:.1f}us, p99 {s['p99'] * 1e6:.1f}us, max {s['max'] * 1e6:.1f}us")
+
+
+class Broker:
+    """
+    Interface the engine trades through. on_bar() is called with every bar
+    before any order for it, submit() sends an order and returns its Fill,
+    and account() returns (cash, gold position, silver position, cumulative
+    costs). Implement these three to route orders to a real venue.
+    """
+
+    async def on_bar(self, bar):
+        pass
+
+    async def submit(self, order):
+        raise NotImplementedError
+
+    def account(self):
+        raise NotImplementedError
+
+
+class SimulatedBroker(Broker):
+    """
+    Fills every order at the bar's close with the same accounting as
+    simulate_trades: cash moves by the traded notional of the gold leg and
+    then the silver leg, and with a costs.CostModel commission, fills and
+    borrow on the short leg held into each bar are charged as dollar_costs
+    does. fill_delay (seconds) simulates the round trip to a venue.
+    """
+
+    def __init__(self, cash=100000, costs=None, fill_delay=0.0):
+        self.cash = cash
+        self.costs = costs
+        self.fill_delay = fill_delay
+        self.gold_position = 0
+        self.silver_position = 0
+        self.total_costs = 0.0
+
+    async def on_bar(self, bar):
+        if self.costs is not None and self.costs.borrow_rate:
+            short = (max(-self.gold_position, 0) * bar.price_gold + max(-self.silver_position, 0) * bar.price_silver)
+            self.total_costs += self.costs.borrow_rate / self.costs.periods_per_year * short
+
+    async def submit(self, order):
+        if self.fill_delay:
+            await asyncio.sleep(self.fill_delay)
+        self.cash += -order.gold_quantity * order.price_gold
+        self.cash += -order.silver_quantity * order.price_silver
+        self.gold_position += order.gold_quantity
+        self.silver_position += order.silver_quantity
+
+        cost = 0.0
+        if self.costs is not None:
+            gold_traded, silver_traded = abs(order.gold_quantity), abs(order.silver_quantity)
+            cost = (self.costs.commission * (gold_traded + silver_traded)
+                    + self.costs.fill_rate * (gold_traded * order.price_gold + silver_traded * order.price_silver))
+            self.total_costs += cost
+        return Fill(order.timestamp, order.gold_quantity, order.silver_quantity,
+                    order.price_gold, order.price_silver, cost)
+
+    def account(self):
+        return self.cash, self.gold_position, self.silver_position, self.total_costs
+
+
+class PaperTradingEngine:
+    """
+    Event loop that turns a live feed into orders.
+
+    The feed runs as its own task and hands bars over through a queue. For
+    every bar the signal is updated and, following simulate_trades, a
+    position of 1 buys gold_units of gold and sells silver_units of silver,
+    -1 does the opposite and 0 closes out whatever is held. Tick-to-order
+    (bar received to order sent) and order-to-fill latencies are recorded
+    in LatencyHistograms.
+    """
+
+    def __init__(self, feed, broker, signal, gold_units=1, silver_units=1, queue_size=1024):
+        self.feed = feed
+        self.broker = broker
+        self.signal = signal
+        self.gold_units = gold_units
+        self.silver_units = silver_units
+        self.queue_size = queue_size
+        self.latency = {"tick_to_order": LatencyHistogram(), "order_to_fill": LatencyHistogram()}
+
+    async def _produce(self, queue):
+        async for bar in self.feed.bars():
+            await queue.put(bar)
+        await queue.put(None)
+
+    def _order(self, bar, position):
+        cash, gold_held, silver_held, _ = self.broker.account()
+        if position == 0:
+            if not gold_held and not silver_held:
+                return None
+            gold_quantity, silver_quantity = -gold_held, -silver_held
+        else:
+            gold_quantity, silver_quantity = position * self.gold_units, -position * self.silver_units
+        return Order(bar.timestamp, gold_quantity, silver_quantity, bar.price_gold, bar.price_silver,
+                     time.perf_counter())
+
+    async def run(self):
+        """
+        Trade the feed to its end and return a PaperTradingResult: one row per
+        bar (signal and account), the fills, and the latency histograms.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        producer = asyncio.create_task(self._produce(queue))
+        rows, fills = [], []
+        try:
+            while (bar := await queue.get()) is not None:
+                await self.broker.on_bar(bar)
+                spread, z_score, position = self.signal.update(bar.price_gold, bar.price_silver)
+                order = self._order(bar, position)
+                if order is not None:
+                    self.latency["tick_to_order"].record(order.sent - bar.received)
+                    fill = await self.broker.submit(order)
+                    self.latency["order_to_fill"].record(time.perf_counter() - order.sent)
+                    fills.append(fill)
+
+                cash, gold_held, silver_held, costs = self.broker.account()
+                value = cash + gold_held * bar.price_gold + silver_held * bar.price_silver
+                rows.append((bar.timestamp, bar.price_gold, bar.price_silver, spread, z_score, position,
+                             cash, gold_held, silver_held, value, value - costs))
+        finally:
+            producer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await producer
+
+        bars = pd.DataFrame(rows, columns=['Date', 'Price_gold', 'Price_silver', 'Spread', 'Z_Score', 'Position',
+                                           'Cash', 'Gold_Position', 'Silver_Position', 'Portfolio_Value',
+                                           'Net_Portfolio_Value']).set_index('Date')
+        fills = pd.DataFrame(fills, columns=Fill._fields).set_index('timestamp')
+        return PaperTradingResult(bars, fills, self.latency)
+
+
+def run_paper_trading(df=None, paths=None, speed=None, scaling_factor=1, window=30, z_entry=2,
+                      z_exit=0.5, gold_units=1, silver_units=1, cash=100000, costs=None, broker=None):
+    """
+    Replay df (or the CSV files at paths, or else the combined frame in the
+    price store) through a PaperTradingEngine with a SimulatedBroker, or the
+    given broker, and print the outcome.
+    """
+    if df is not None:
+        feed = ReplayFeed(df, speed=speed)
+    elif paths:
+        feed = ReplayFeed.from_csv(paths, speed=speed)
+    else:
+        feed = ReplayFeed.from_store(speed=speed)
+    if broker is None:
+        broker = SimulatedBroker(cash=cash, costs=costs)
+    signal = SpreadSignal(scaling_factor=scaling_factor, window=window, z_entry=z_entry, z_exit=z_exit)
+    engine = PaperTradingEngine(feed, broker, signal, gold_units=gold_units, silver_units=silver_units)
+    result = asyncio.run(engine.run())
+
+    if len(result.bars):
+        print(f"Paper traded {len(result.bars)} bars, {len(result.fills)} fills")
+        print(f"Final portfolio value: ${result.bars['Portfolio_Value'].iloc[-1]:.2f}")
+        if costs is not None:
+            print(f"Final portfolio value after costs: ${result.bars['Net_Portfolio_Value'].iloc[-1]:.2f}")
+    print_latency(result.latency)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paper trade the strategy on a replayed price feed.")
+    parser.add_argument("paths", nargs="*",
+                        help="combined CSV, or gold then silver ticker CSVs (default: the price store's "
+                             "combined frame)")
+    parser.add_argument("--speed", type=float,
+                        help="seconds of market time per second (default: as fast as possible)")
+    parser.add_argument("--scaling-factor", type=float, default=1)
+    parser.add_argument("--window", type=int, default=30)
+    parser.add_argument("--z-entry", type=float, default=2)
+    parser.add_argument("--z-exit", type=float, default=0.5)
+    args = parser.parse_args()
+
+    paths = args.paths[0] if len(args.paths) == 1 else args.paths or None
+    run_paper_trading(paths=paths, speed=args.speed, scaling_factor=args.scaling_factor, window=args.window,
+                      z_entry=args.z_entry, z_exit=args.z_exit)
@@ -0,0 +1,103 @@
+from collections import namedtuple
+import numpy as np
+from analyze_data import load_prices, combine_prices, combine_legs
+from backtest_strategy import (backtest_strategy, calculate_basket_spread, calculate_performance_metrics,
+                               calculate_zscore, simulate_basket_trades)
+from test_cointegration import cointegration_test
+from cointegration_monitor import calculate_stability
+from feature_cache import cached_zscore
+from instrumentation import instrumented
+from johansen import basket_weights, coint_johansen, cointegration_rank
+
+PipelineResult = namedtuple("PipelineResult", ["data", "cointegration", "metrics", "net_metrics"])
+
+
+def load_pair(gold_ticker="GC=F", silver_ticker="SI=F"):
+    """
+    Load both tickers from the price store and combine them into one frame.
+    """
+    return combine_prices(load_prices(gold_ticker), load_prices(silver_ticker))
+
+
+@instrumented()
+def run_pipeline(df=None, run_backtest=True, scaling_factor=1, window=30, z_entry=2, z_exit=0.5, costs=None,
+                 periods_per_year=252, stability_window=None, feature_cache=None):
+    """
+    Run every stage in this process, passing the DataFrame from one stage to
+    the next: load -> clean -> cointegration test -> spread -> Z-score ->
+    backtest -> metrics. Pass df to start from an already combined frame, and
+    periods_per_year (see intraday.periods_per_year) for non-daily bars.
+    With stability_window, positions are only opened while the rolling
+    cointegration test over that many bars still passes. With a
+    feature_cache.FeatureCache the spread and Z-score are reused from earlier
+    runs on the same prices and parameters.
+
+    Returns the final frame, the cointegration test result, and the gross and
+    net-of-costs metrics (None when run_backtest is False or costs is None).
+    """
+    if df is None:
+        df = load_pair()
+
+    cointegration = cointegration_test(df['Price_gold'], df['Price_silver'])
+    if not run_backtest:
+        return PipelineResult(df, cointegration, None, None)
+
+    df = cached_zscore(df, scaling_factor=scaling_factor, window=window, cache=feature_cache)
+    trade_enabled = None
+    if stability_window:
+        df = calculate_stability(df, window=stability_window)
+        trade_enabled = df['Trade_Enabled']
+    df = backtest_strategy(df, z_entry=z_entry, z_exit=z_exit, costs=costs, trade_enabled=trade_enabled)
+    metrics = calculate_performance_metrics(df, periods_per_year=periods_per_year)
+    net_metrics = None
+    if costs is not None:
+        net_metrics = calculate_performance_metrics(df, net=True, periods_per_year=periods_per_year)
+    return PipelineResult(df, cointegration, metrics, net_metrics)
+
+
+BasketResult = namedtuple("BasketResult", ["data", "johansen", "weights", "metrics", "net_metrics"])
+
+
+@instrumented()
+def run_basket_pipeline(legs=None, df=None, det_order=0, k_ar_diff=1, window=30, z_entry=2, z_exit=0.5, costs=None,
+                        periods_per_year=252, units=None, cash=100000):
+    """
+    run_pipeline for a basket of any number of legs: join the legs (see
+    analyze_data.combine_legs), Johansen-test the basket, and trade the
+    spread weighted by its first cointegrating vector through the same
+    Z-score, backtest and metrics stages. Pass df to start from a frame of
+    'Price_<leg>' columns instead of legs. costs is a CostModel; its legs and
+    weights are taken from the basket (see CostModel.with_weights).
+
+    The trades are then simulated in dollars with simulate_basket_trades,
+    holding units of each leg per unit of signal (by default the spread
+    weights), which adds 'Portfolio_Value' (and with costs 'Trading_Costs'
+    and 'Net_Portfolio_Value') to the frame.
+
+    Returns the final frame, the johansen.JohansenResult, the spread weights
+    (first leg 1) and the gross and net-of-costs metrics.
+    """
+    if df is None:
+        df = combine_legs(legs)
+    columns = [column for column in df.columns if column.startswith('Price_')]
+
+    result = coint_johansen(df[columns].to_numpy(dtype=np.float64), det_order=det_order, k_ar_diff=k_ar_diff)
+    weights = basket_weights(result.eigenvectors, legs=columns)
+    rank = cointegration_rank(result.trace_stat, result.trace_crit)
+    print(f"Johansen trace statistic: {result.trace_stat[0]:.2f} (95% critical value {result.trace_crit[0, 1]:.2f}), "
+          f"cointegrating relations: {rank}")
+    if not np.isfinite(weights).all():
+        raise ValueError(f"The Johansen test is undefined for the basket {columns}: a leg is constant or an "
+                         "exact combination of the others")
+    print("Basket weights: " + ", ".join(f"{column}={weight:.4f}" for column, weight in weights.items()))
+    if costs is not None:
+        costs = costs.with_weights(weights.to_numpy())
+
+    df = calculate_zscore(calculate_basket_spread(df, weights), window=window)
+    df = backtest_strategy(df, z_entry=z_entry, z_exit=z_exit, costs=costs)
+    df = simulate_basket_trades(df, weights if units is None else units, cash=cash, costs=costs)
+    metrics = calculate_performance_metrics(df, periods_per_year=periods_per_year)
+    net_metrics = None
+    if costs is not None:
+        net_metrics = calculate_performance_metrics(df, net=True, periods_per_year=periods_per_year)
+    return BasketResult(df, result, weights, metrics, net_metrics)
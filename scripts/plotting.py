@@ -0,0 +1,28 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def load_pyplot(headless=False):
+    """
+    Import matplotlib.pyplot on first use. headless=True selects the Agg
+    backend, which draws to files and never opens a window.
+    """
+    import matplotlib
+    if headless:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def show_or_save(fig, save_path=None):
+    """
+    Show the figure, or write it to save_path and close it in headless mode.
+    """
+    plt = load_pyplot()
+    if save_path is None:
+        plt.show()
+    else:
+        fig.savefig(save_path)
+        plt.close(fig)
+        logger.info("Figure saved to %s", save_path)
@@ -0,0 +1,227 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+STORE_DIR = os.path.join("data", "store")
+
+# Stable on-disk schema for a single ticker: Date index plus these float64
+# columns (float32 for files written with compact=True, see downcast_prices)
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+COMBINED_FILE = "processed.parquet"
+
+# Largest change float32 storage may make to a stored value: a tenth of a cent
+FLOAT32_TOLERANCE = 1e-3
+
+# Rows per batch when reading or writing a file in chunks
+CHUNK_ROWS = 250_000
+
+
+def ticker_key(ticker):
+    """
+    File name stem for a ticker, e.g. "GC=F" -> "GC" (same naming as the old CSVs).
+    """
+    return ticker.replace('=F', '').replace('^', '')
+
+
+def ticker_path(ticker, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"{ticker_key(ticker)}.parquet")
+
+
+def normalize_prices(df):
+    """
+    Coerce a downloaded price frame (e.g. from yfinance) into the store schema.
+    """
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        # yfinance returns (Price, Ticker) columns even for a single ticker
+        df.columns = df.columns.get_level_values(0)
+    df = df.reindex(columns=PRICE_COLUMNS).astype(np.float64)
+    df.columns.name = None
+    df.index = pd.DatetimeIndex(df.index, name="Date")
+    if df.index.tz is not None:
+        # Ticker.history returns exchange-local timestamps; store them tz-naive
+        df.index = df.index.tz_localize(None)
+    return df[~df.index.isna()].sort_index()
+
+
+def downcast_prices(df, tolerance=FLOAT32_TOLERANCE):
+    """
+    Store each float64 column as float32 when that changes no value by more
+    than tolerance, halving its memory and disk footprint. Columns that would
+    lose precision (e.g. large volumes) are left as float64.
+    """
+    df = df.copy()
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if values.dtype != np.float64:
+            continue
+        compact = values.astype(np.float32)
+        with np.errstate(invalid="ignore"):
+            error = np.abs(compact.astype(np.float64) - values)
+        if not np.nanmax(error, initial=0.0) > tolerance:
+            df[column] = compact
+    return df
+
+
+def _write_parquet(df, path):
+    # Write to a temp file and rename it over the target, so readers never see
+    # a half-written file and a failed write leaves the old data in place.
+    # Row groups of CHUNK_ROWS bound what a chunked reader has to decode at once
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, engine="pyarrow", index=True, row_group_size=CHUNK_ROWS)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def write_ticker(df, ticker, store_dir=STORE_DIR, compact=False):
+    """
+    Save the price history for one ticker and return the file path.
+    With compact=True columns are stored as float32 where precision allows.
+    """
+    path = ticker_path(ticker, store_dir)
+    df = normalize_prices(df)
+    _write_parquet(downcast_prices(df) if compact else df, path)
+    return path
+
+
+def read_ticker(ticker, columns=None, store_dir=STORE_DIR):
+    """
+    Load the price history for one ticker, reading only the requested columns.
+    """
+    return pd.read_parquet(ticker_path(ticker, store_dir), columns=columns, engine="pyarrow")
+
+
+def _iter_parquet(path, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Read a store file chunk_rows rows at a time as DataFrames indexed by Date,
+    so only one batch of the file is in memory at once.
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    if columns is not None:
+        columns = ["Date"] + list(columns)
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+        df = batch.to_pandas()
+        if "Date" in df.columns:
+            df = df.set_index("Date")
+        df.index = pd.DatetimeIndex(df.index, name="Date")
+        yield df
+
+
+def iter_ticker(ticker, columns=None, chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR):
+    """
+    Stream the price history for one ticker in chunks of chunk_rows rows.
+    """
+    return _iter_parquet(ticker_path(ticker, store_dir), columns=columns, chunk_rows=chunk_rows)
+
+
+def stored_rows(ticker, store_dir=STORE_DIR):
+    """
+    Number of bars stored for a ticker, read from the file footer; 0 if nothing is stored yet.
+    """
+    import pyarrow.parquet as pq
+
+    path = ticker_path(ticker, store_dir)
+    if not os.path.exists(path):
+        return 0
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def last_date(ticker, store_dir=STORE_DIR):
+    """
+    Latest stored date for a ticker, or None if nothing is stored yet.
+    """
+    path = ticker_path(ticker, store_dir)
+    if not os.path.exists(path):
+        return None
+    dates = pd.read_parquet(path, columns=[], engine="pyarrow").index
+    return dates.max() if len(dates) else None
+
+
+def append_ticker(df, ticker, store_dir=STORE_DIR, compact=False):
+    """
+    Add new bars to a ticker's stored history and return the number of rows added.
+    Bars already in the store are replaced by the newer download.
+    """
+    new = normalize_prices(df)
+    path = ticker_path(ticker, store_dir)
+    if os.path.exists(path):
+        old = pd.read_parquet(path, engine="pyarrow")
+        added = len(new.index.difference(old.index))
+        combined = pd.concat([old[~old.index.isin(new.index)], new]).sort_index()
+    else:
+        added = len(new)
+        combined = new
+    _write_parquet(downcast_prices(combined) if compact else combined, path)
+    return added
+
+
+def write_combined(df, store_dir=STORE_DIR):
+    """
+    Save the combined gold/silver frame built by analyze_data.
+    """
+    path = os.path.join(store_dir, COMBINED_FILE)
+    _write_parquet(df, path)
+    return path
+
+
+def write_combined_chunks(chunks, store_dir=STORE_DIR):
+    """
+    Save the combined frame from an iterator of DataFrame chunks, writing each
+    chunk as it arrives instead of building the whole frame in memory.
+    Every chunk must have the first chunk's column dtypes, which fix the file
+    schema; a chunk that differs raises ValueError rather than being cast.
+    Returns the file path and the number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = os.path.join(store_dir, COMBINED_FILE)
+    os.makedirs(store_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, suffix=".tmp")
+    os.close(fd)
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=True)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            elif not table.schema.equals(writer.schema):
+                raise ValueError(f"Chunk schema does not match the first chunk's:\n"
+                                 f"{table.schema.remove_metadata()}\nexpected:\n{writer.schema.remove_metadata()}")
+            writer.write_table(table)
+            rows += len(chunk)
+        if writer is None:
+            raise ValueError("No rows to write")
+        writer.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        os.remove(tmp_path)
+        raise
+    return path, rows
+
+
+def read_combined(columns=None, store_dir=STORE_DIR):
+    """
+    Load the combined gold/silver frame, reading only the requested columns.
+    """
+    return pd.read_parquet(os.path.join(store_dir, COMBINED_FILE), columns=columns, engine="pyarrow")
+
+
+def iter_combined(columns=None, chunk_rows=CHUNK_ROWS, store_dir=STORE_DIR):
+    """
+    Stream the combined gold/silver frame in chunks of chunk_rows rows.
+    """
+    return _iter_parquet(os.path.join(store_dir, COMBINED_FILE), columns=columns, chunk_rows=chunk_rows)
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from price_store import STORE_DIR, read_ticker
+
+logger = logging.getLogger(__name__)
+
+# Memory-mapped close prices live next to the Parquet files
+SHARED_DIR = os.path.join(STORE_DIR, "closes")
+
+CLOSES_FILE = "closes.bin"  # (symbols, dates) matrix, one contiguous row per ticker
+DATES_FILE = "dates.npy"    # datetime64[ns] date of each column
+INDEX_FILE = "index.json"   # symbols in row order, dtype and shape
+
+
+def _replace_file(path, write):
+    # Same write-then-rename as the Parquet store, so readers never map a
+    # half-written file
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _write_layout(symbols, dates, rows, out_dir, dtype):
+    """
+    Write the matrix file from an iterator of one row of closes per symbol,
+    then the dates and the index. Only one row is in memory at a time.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    shape = (len(symbols), len(dates))
+
+    def write_closes(path):
+        if not all(shape):
+            open(path, "wb").close()
+            return
+        matrix = np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+        for k, row in enumerate(rows):
+            matrix[k] = row
+        matrix.flush()
+        del matrix
+
+    def write_dates(path):
+        with open(path, "wb") as f:
+            np.save(f, np.asarray(dates, dtype="datetime64[ns]"))
+
+    def write_index(path):
+        with open(path, "w") as f:
+            json.dump({"symbols": list(symbols), "dtype": np.dtype(dtype).name, "shape": list(shape)}, f)
+
+    _replace_file(os.path.join(out_dir, CLOSES_FILE), write_closes)
+    _replace_file(os.path.join(out_dir, DATES_FILE), write_dates)
+    _replace_file(os.path.join(out_dir, INDEX_FILE), write_index)
+    return out_dir
+
+
+def write_shared_closes(panel, out_dir=SHARED_DIR, dtype=np.float64):
+    """
+    Lay out a panel of aligned closes (dates x tickers DataFrame) as a
+    memory-mapped matrix that SharedCloses can attach to.
+    """
+    rows = (panel[column].to_numpy(dtype=dtype) for column in panel.columns)
+    return _write_layout([str(c) for c in panel.columns], panel.index, rows, out_dir, dtype)
+
+
+def build_shared_closes(tickers, store_dir=STORE_DIR, out_dir=None, dtype=np.float64, how="outer"):
+    """
+    Build the memory-mapped close matrix from tickers in the price store.
+
+    how="outer" keeps every date any ticker traded (missing closes are NaN),
+    how="inner" only the dates all of them traded. Tickers are read one at a
+    time, so the panel is never held in memory as a whole.
+    """
+    out_dir = out_dir or os.path.join(store_dir, "closes")
+    dates = None
+    for ticker in tickers:
+        index = read_ticker(ticker, columns=["Close"], store_dir=store_dir).dropna().index
+        if dates is None:
+            dates = index
+        else:
+            dates = dates.union(index) if how == "outer" else dates.intersection(index)
+    dates = pd.DatetimeIndex([] if dates is None else dates, name="Date")
+
+    rows = (
+        read_ticker(ticker, columns=["Close"], store_dir=store_dir)["Close"].reindex(dates).to_numpy(dtype=dtype)
+        for ticker in tickers
+    )
+    path = _write_layout(tickers, dates, rows, out_dir, dtype)
+    logger.info("Mapped %d tickers x %d dates into %s", len(tickers), len(dates), path)
+    return path
+
+
+class SharedCloses:
+    """
+    Read-only, zero-copy view of the memory-mapped close matrix.
+
+    The matrix is mapped from the file rather than read into memory, so every
+    process attached to the same store shares one physical copy through the
+    page cache. Pickling an instance sends only the directory path: passing it
+    to a worker process (e.g. as a pool initializer argument) costs nothing,
+    and the worker maps the file itself when it unpickles it.
+    """
+
+    def __init__(self, path=SHARED_DIR):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.symbols = index["symbols"]
+        self._rows = {symbol: k for k, symbol in enumerate(self.symbols)}
+        self.dates = pd.DatetimeIndex(np.load(os.path.join(path, DATES_FILE)), name="Date")
+        shape = tuple(index["shape"])
+        if all(shape):
+            self.values = np.memmap(os.path.join(path, CLOSES_FILE), dtype=index["dtype"], mode="r", shape=shape)
+        else:
+            self.values = np.empty(shape, dtype=index["dtype"])
+
+    def __reduce__(self):
+        return (SharedCloses, (self.path,))
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def date_slice(self, start=None, end=None):
+        """
+        Column slice covering the dates from start to end, both inclusive.
+        """
+        first = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side="left")
+        last = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side="right")
+        return slice(first, last)
+
+    def close(self, ticker, start=None, end=None):
+        """
+        Closes of one ticker between start and end, as a view into the map.
+        """
+        return self.values[self._rows[ticker], self.date_slice(start, end)]
+
+    def matrix(self, tickers=None, start=None, end=None):
+        """
+        (tickers, dates) block of closes. All tickers, or a run of tickers
+        adjacent in the store, give a view into the map; any other selection
+        is gathered into a new array.
+        """
+        columns = self.date_slice(start, end)
+        if tickers is None:
+            return self.values[:, columns]
+        rows = [self._rows[ticker] for ticker in tickers]
+        if rows and rows == list(range(rows[0], rows[0] + len(rows))):
+            return self.values[rows[0]:rows[0] + len(rows), columns]
+        return self.values[rows, columns]
+
+    def frame(self, tickers=None, start=None, end=None):
+        """
+        Closes as a dates x tickers DataFrame, like a panel read from the store.
+        """
+        columns = self.date_slice(start, end)
+        return pd.DataFrame(self.matrix(tickers, start, end).T, index=self.dates[columns],
+                            columns=list(tickers) if tickers is not None else self.symbols)
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from intraday import periods_per_year
+
+# Bar interval -> pandas frequency of the generated index
+_FREQUENCIES = {"d": "B", "h": "h", "m": "min"}
+
+
+def bar_index(n, interval="1d", start="2000-01-03"):
+    """
+    Timestamps for n consecutive bars of the given interval ("1d", "1h", "5m", ...).
+    Daily bars skip weekends; intraday bars run around the clock.
+    """
+    size, unit = int(interval[:-1]), interval[-1]
+    return pd.date_range(start, periods=n, freq=f"{size}{_FREQUENCIES[unit]}", name="Date")
+
+
+def ar1(shocks, phi):
+    """
+    AR(1) series x(t) = phi * x(t-1) + shock(t) along the last axis, with
+    x(0) = shock(0), computed as a linear filter rather than a loop.
+    """
+    from scipy.signal import lfilter
+    return lfilter([1.0], [1.0, -phi], shocks, axis=-1)
+
+
+def _random_walk(rng, shape, volatility, interval):
+    # Log-price random walk with the given annualized volatility per bar
+    step = volatility / np.sqrt(periods_per_year(interval))
+    return np.cumsum(step * rng.standard_normal(shape), axis=-1)
+
+
+def _break_mask(n, breaks):
+    broken = np.zeros(n, dtype=bool)
+    for start, end in breaks:
+        broken[int(start * n):int(end * n)] = True
+    return broken
+
+
+def cointegrated_pair(n, interval="1d", hedge_ratio=70.0, intercept=50.0, silver_start=25.0, volatility=0.25,
+                      noise=1.0, ar=0.9, breaks=(), break_noise=2.0, seed=0, start="2000-01-03"):
+    """
+    Synthetic gold and silver closes with a known cointegrating relation.
+
+    Silver follows a geometric random walk with the given annualized
+    volatility (scaled to the bar interval, so long intraday samples stay
+    realistic), and gold = hedge_ratio * silver + intercept + an AR(1)
+    spread with shock size `noise` and coefficient `ar`. breaks is a list of
+    (start, end) fractions of the sample during which the relation breaks:
+    the spread also takes random-walk steps of size break_noise, leaving a
+    shifted intercept once the break ends.
+
+    Returns a frame with 'Price_gold' and 'Price_silver' on a Date index,
+    the layout combine_prices produces.
+    """
+    rng = np.random.default_rng(seed)
+    silver = silver_start * np.exp(_random_walk(rng, n, volatility, interval))
+    spread = ar1(noise * rng.standard_normal(n), ar)
+    if breaks:
+        spread += np.cumsum(np.where(_break_mask(n, breaks), break_noise * rng.standard_normal(n), 0.0))
+    gold = hedge_ratio * silver + intercept + spread
+    return pd.DataFrame({"Price_gold": gold, "Price_silver": silver}, index=bar_index(n, interval, start))
+
+
+def cointegrated_panel(n_series, n_bars, interval="1d", n_factors=5, volatility=0.25, noise=1.0, ar=0.9,
+                       independent=0.0, seed=0, start="2000-01-03"):
+    """
+    Synthetic panel of closes in which series driven by the same random-walk
+    factor are cointegrated: each series is a loading times its factor plus an
+    intercept and its own AR(1) noise. A fraction `independent` of the series
+    get a random walk of their own instead, so they cointegrate with nothing.
+
+    Returns a (bars x series) frame with columns S000, S001, ...; the factor
+    of each series (-1 for independent ones) is in attrs["factors"].
+    """
+    rng = np.random.default_rng(seed)
+    n_own = int(round(independent * n_series))
+    factors = 100 * np.exp(_random_walk(rng, (n_factors + n_own, n_bars), volatility, interval))
+    assignment = rng.integers(0, n_factors, size=n_series)
+    assignment[n_series - n_own:] = n_factors + np.arange(n_own)
+    loadings = rng.uniform(0.5, 2.0, size=n_series)
+    intercepts = rng.uniform(-20.0, 20.0, size=n_series)
+    prices = (loadings[:, None] * factors[assignment] + intercepts[:, None]
+              + ar1(noise * rng.standard_normal((n_series, n_bars)), ar))
+
+    panel = pd.DataFrame(prices.T, index=bar_index(n_bars, interval, start),
+                         columns=[f"S{k:03d}" for k in range(n_series)])
+    panel.attrs["factors"] = np.where(assignment < n_factors, assignment, -1)
+    return panel
+
+
+def write_ticker_csv(prices, path, seed=0):
+    """
+    Write a close series as a yfinance-style CSV (two extra header rows, Price,
+    Adj Close, Close, High, Low, Open and Volume columns) that clean_data reads.
+    """
+    rng = np.random.default_rng(seed)
+    close = np.asarray(prices, dtype=np.float64)
+    spread = np.abs(rng.standard_normal(len(close))) * 0.001 * close
+    columns = {
+        "Price": close,
+        "Adj Close": close,
+        "Close": close,
+        "High": close + spread,
+        "Low": close - spread,
+        "Open": close,
+        "Volume": rng.integers(1_000, 100_000, size=len(close)),
+    }
+    frame = pd.DataFrame(columns, index=prices.index.strftime("%Y-%m-%d %H:%M:%S"))
+    with open(path, "w") as f:
+        f.write("Price,Adj Close,Close,High,Low,Open,Volume\n")
+        f.write("Ticker,,,,,,\n")
+        frame.to_csv(f, header=False)
+    return path
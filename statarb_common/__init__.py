@@ -0,0 +1,7 @@
+"""
+Code shared by the main tree (scripts/) and Phoenix-Branch-One: batched
+cointegration tests (fast_coint) and streaming rolling moments
+(rolling_moments). Install it with `pip install -e .` from the repository
+root (requirements.txt does this), then import it explicitly, e.g.
+`from statarb_common.fast_coint import coint_batch`.
+"""
@@ -0,0 +1,253 @@
+import functools
+from collections import namedtuple
+import numpy as np
+
+ADFResult = namedtuple("ADFResult", ["statistic", "pvalue", "lags", "nobs", "critical_values"])
+EngleGrangerResult = namedtuple("EngleGrangerResult",
+                                ["statistic", "pvalue", "critical_values", "lags", "hedge_ratio", "intercept"])
+
+# Same collinearity cut-off as statsmodels.tsa.stattools.coint
+_SQRTEPS = np.sqrt(np.finfo(np.float64).eps)
+
+
+@functools.lru_cache(maxsize=None)
+def _pvalue_table(regression, n_vars):
+    """
+    MacKinnon (1994) p-value coefficients for one regression type and number
+    of I(1) series, reordered for np.polyval, or None if unavailable.
+
+    statsmodels keeps these tables private (adfvalues._tau_*), so this is the
+    one place they are read; if a statsmodels release moves them,
+    mackinnon_pvalues falls back to the public mackinnonp.
+    """
+    from statsmodels.tsa import adfvalues
+
+    k = n_vars - 1
+    try:
+        return (
+            adfvalues._tau_maxs[regression][k],
+            adfvalues._tau_mins[regression][k],
+            adfvalues._tau_stars[regression][k],
+            np.asarray(adfvalues._tau_smallps[regression][k])[::-1],
+            np.asarray(adfvalues._tau_largeps[regression][k])[::-1],
+        )
+    except (AttributeError, KeyError, IndexError):
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def critical_values(nobs, n_vars=1, regression="c"):
+    """
+    MacKinnon (2010) 1%, 5% and 10% critical values for a sample size, from
+    mackinnoncrit. Cached, so a screen over thousands of equal-length series
+    evaluates the response surface once.
+    """
+    from statsmodels.tsa.adfvalues import mackinnoncrit
+
+    values = np.asarray(mackinnoncrit(N=n_vars, regression=regression, nobs=nobs), dtype=np.float64)
+    values.setflags(write=False)
+    return values
+
+
+def mackinnon_pvalues(statistics, n_vars=1, regression="c"):
+    """
+    MacKinnon's approximate p-values (mackinnonp) for an array of ADF or
+    Engle-Granger statistics at once.
+    """
+    from scipy.special import ndtr
+
+    statistics = np.asarray(statistics, dtype=np.float64)
+    table = _pvalue_table(regression, n_vars)
+    if table is None:
+        from statsmodels.tsa.adfvalues import mackinnonp
+
+        pvalues = [mackinnonp(statistic, regression, n_vars) for statistic in statistics.ravel()]
+        return np.asarray(pvalues, dtype=np.float64).reshape(statistics.shape)
+
+    tau_max, tau_min, tau_star, small, large = table
+    with np.errstate(invalid="ignore"):
+        curve = np.where(statistics <= tau_star, np.polyval(small, statistics), np.polyval(large, statistics))
+        pvalues = ndtr(curve)
+    pvalues = np.where(statistics > tau_max, 1.0, np.where(statistics < tau_min, 0.0, pvalues))
+    return pvalues
+
+
+def _default_maxlag(n_obs, regression):
+    # Schwert's rule, capped the way adfuller caps it
+    ntrend = 0 if regression == "n" else len(regression)
+    maxlag = int(np.ceil(12.0 * np.power(n_obs / 100.0, 1 / 4.0)))
+    maxlag = min(n_obs // 2 - ntrend - 1, maxlag)
+    if maxlag < 0:
+        raise ValueError("sample size is too short to use selected regression component")
+    return maxlag
+
+
+def _adf_design(x, lags, regression):
+    """
+    ADF regression for every row of x with a fixed lag: the first difference
+    on the lagged level, `lags` lagged differences and (for "c") a constant.
+    Returns the design (series, nobs, k) and target (series, nobs).
+    """
+    n = x.shape[1]
+    diff = np.diff(x, axis=1)
+    nobs = n - 1 - lags
+    columns = [x[:, lags:n - 1]]
+    columns += [diff[:, lags - j:n - 1 - j] for j in range(1, lags + 1)]
+    if regression == "c":
+        columns.append(np.ones_like(columns[0]))
+    design = np.stack(columns, axis=2)
+    return design, diff[:, -nobs:] if nobs else diff[:, :0]
+
+
+def _batched_ols(design, target):
+    """
+    Least squares for a stack of regressions via batched QR. Returns the
+    coefficients, the residual sum of squares and the standard error of the
+    first coefficient, for every regression in the stack.
+    """
+    q, r = np.linalg.qr(design)
+    qty = np.einsum("snk,sn->sk", q, target)
+    beta = np.linalg.solve(r, qty[..., None])[..., 0]
+    resid = target - np.einsum("snk,sk->sn", design, beta)
+    ssr = np.einsum("sn,sn->s", resid, resid)
+    nobs, k = design.shape[1:]
+    r_inv = np.linalg.inv(r)
+    # (X'X)^-1 = R^-1 R^-T, so its [0, 0] entry is the squared norm of R^-1's first row
+    se = np.sqrt(ssr / (nobs - k) * np.einsum("sk,sk->s", r_inv[:, 0, :], r_inv[:, 0, :]))
+    return beta, ssr, se
+
+
+def _information_criterion(ssr, nobs, k, autolag):
+    # OLS log-likelihood and AIC/BIC exactly as statsmodels computes them
+    nobs2 = nobs / 2.0
+    llf = -nobs2 * np.log(2 * np.pi) - nobs2 * np.log(ssr / nobs) - nobs2
+    penalty = 2 * k if autolag == "aic" else np.log(nobs) * k
+    return -2 * llf + penalty
+
+
+def adf_batch(x, maxlag=None, autolag="aic", regression="c", chunk_size=512):
+    """
+    Augmented Dickey-Fuller test on every row of x (series, observations).
+
+    Mirrors statsmodels' adfuller: with autolag ("aic" or "bic") the lag is
+    chosen per series among 0..maxlag on a common sample and the regression
+    is refit with that lag; with autolag=None maxlag lags are used. The lag
+    search takes one batched QR for all series and lags, the final fits one
+    per distinct lag, and series are processed chunk_size at a time to bound
+    memory. regression is "c" (constant) or "n" (none).
+
+    Returns an ADFResult of arrays, one entry per series.
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    n_series, n_obs = x.shape
+    if regression not in ("c", "n"):
+        raise ValueError(f"Unsupported regression: {regression!r}")
+    if maxlag is None:
+        maxlag = _default_maxlag(n_obs, regression)
+    elif maxlag > n_obs // 2 - (regression == "c") - 1:
+        raise ValueError("maxlag must be less than (nobs/2 - 1 - ntrend)")
+    if autolag is not None:
+        autolag = autolag.lower()
+        if autolag not in ("aic", "bic"):
+            raise ValueError(f"Unsupported autolag: {autolag!r}")
+    if n_series and np.any(x.max(axis=1) == x.min(axis=1)):
+        raise ValueError("Invalid input, x is constant")
+
+    statistic = np.empty(n_series)
+    lags = np.full(n_series, maxlag, dtype=np.int64)
+    for start in range(0, n_series, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        series = x[chunk]
+
+        if autolag is not None:
+            # Every lag is fit on the sample of the longest one, so the criteria
+            # compare. With the constant first and the lags in order, one QR of
+            # the full design gives the fit of every shorter prefix: the SSR with
+            # k columns is the full SSR plus the squares of Q'y beyond column k.
+            design, target = _adf_design(series, maxlag, regression)
+            if regression == "c":
+                design = np.roll(design, 1, axis=2)
+            nobs, n_columns = design.shape[1:]
+            q, _ = np.linalg.qr(design)
+            qty = np.einsum("snk,sn->sk", q, target)
+            resid = target - np.einsum("snk,sk->sn", q, qty)
+            full_ssr = np.einsum("sn,sn->s", resid, resid)
+            tail = np.cumsum((qty * qty)[:, ::-1], axis=1)[:, ::-1]
+            n_trend = n_columns - (maxlag + 1)
+            criteria = np.empty((maxlag + 1, len(series)))
+            for lag in range(maxlag + 1):
+                k = n_trend + lag + 1
+                ssr = full_ssr + (tail[:, k] if k < n_columns else 0.0)
+                criteria[lag] = _information_criterion(ssr, nobs, k, autolag)
+            lags[chunk] = np.argmin(criteria, axis=0)  # first minimum: the shortest lag wins ties
+
+        # Final regression, batched over the series that share a lag length
+        chunk_lags = lags[chunk]
+        chunk_stat = np.empty(len(series))
+        for lag in np.unique(chunk_lags):
+            rows = chunk_lags == lag
+            design, target = _adf_design(series[rows], int(lag), regression)
+            beta, _, se = _batched_ols(design, target)
+            chunk_stat[rows] = beta[:, 0] / se
+        statistic[chunk] = chunk_stat
+
+    nobs = n_obs - 1 - lags
+    critical = np.array([critical_values(int(n), 1, regression) for n in nobs]).reshape(n_series, 3)
+    return ADFResult(statistic, mackinnon_pvalues(statistic, 1, regression), lags, nobs, critical)
+
+
+def coint_batch(y, x, trend="c", maxlag=None, autolag="aic", chunk_size=512):
+    """
+    Engle-Granger cointegration test of each row of y against the same row
+    of x, as statsmodels' coint(y, x) computes it: regress y on x (plus a
+    constant for trend="c"), run the ADF test without constant on the
+    residuals, and compare against the MacKinnon (2010) N=2 tables.
+
+    y and x are (pairs, observations) arrays, or 1-D for a single pair.
+    Use a small fixed lag (e.g. maxlag=1, autolag=None) for fast screening.
+    Returns an EngleGrangerResult of arrays, one entry per pair.
+    """
+    if trend not in ("c", "n"):
+        raise ValueError(f"Unsupported trend: {trend!r}")
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    n_obs = y.shape[1]
+
+    # Cointegrating regression in closed form (centred sums for the constant)
+    if trend == "c":
+        x_mean = x.mean(axis=1, keepdims=True)
+        y_mean = y.mean(axis=1, keepdims=True)
+        xc, yc = x - x_mean, y - y_mean
+        hedge_ratio = np.einsum("sn,sn->s", xc, yc) / np.einsum("sn,sn->s", xc, xc)
+        intercept = y_mean[:, 0] - hedge_ratio * x_mean[:, 0]
+        total = np.einsum("sn,sn->s", yc, yc)
+    else:
+        hedge_ratio = np.einsum("sn,sn->s", x, y) / np.einsum("sn,sn->s", x, x)
+        intercept = np.zeros(len(y))
+        total = np.einsum("sn,sn->s", y, y)
+    resid = y - hedge_ratio[:, None] * x - intercept[:, None]
+    rsquared = 1 - np.einsum("sn,sn->s", resid, resid) / total
+
+    statistic = np.full(len(y), -np.inf)
+    lags = np.zeros(len(y), dtype=np.int64)
+    usable = rsquared < 1 - 100 * _SQRTEPS  # (almost) collinear pairs get -inf, as in coint
+    if usable.any():
+        adf = adf_batch(resid[usable], maxlag=maxlag, autolag=autolag, regression="n", chunk_size=chunk_size)
+        statistic[usable] = adf.statistic
+        lags[usable] = adf.lags
+
+    if trend == "c":
+        critical = critical_values(n_obs - 1, 2, trend)
+    else:
+        critical = np.full(3, np.nan)
+    pvalue = mackinnon_pvalues(statistic, 2, trend)
+    return EngleGrangerResult(statistic, pvalue, np.tile(critical, (len(y), 1)), lags, hedge_ratio, intercept)
+
+
+def engle_granger(y, x, trend="c", maxlag=None, autolag="aic"):
+    """
+    Single-pair coint_batch returning (score, p_value, critical_values), the
+    same tuple as statsmodels' coint.
+    """
+    result = coint_batch(y, x, trend=trend, maxlag=maxlag, autolag=autolag)
+    return float(result.statistic[0]), float(result.pvalue[0]), result.critical_values[0]
@@ -0,0 +1,91 @@
+import math
+import numpy as np
+
+
+class RollingMoments:
+    """
+    Mean and sample standard deviation of the last `window` values, updated
+    in constant time per value with a windowed Welford update over a ring
+    buffer.
+
+    Matches pandas' rolling(window).mean() and .std(): both are NaN until the
+    window has filled and while it holds a non-finite value, and come back
+    once that value has left the window (non-finite values are kept out of
+    the sums). Every resync values the sums are rebuilt from the buffer, so
+    rounding can't build up over a long session.
+    """
+
+    def __init__(self, window, resync=10_000):
+        self.window = window
+        self.resync = resync
+        self._buffer = np.full(window, np.nan)
+        self._count = 0  # values pushed so far
+        self._n = 0  # finite values in the window
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean
+
+    def push(self, x):
+        """
+        Add one value, dropping the oldest once the window is full.
+        """
+        slot = self._count % self.window
+        old = self._buffer[slot]  # NaN while the window is still filling
+        finite = math.isfinite(x)
+        if finite and math.isfinite(old):
+            # Replace the oldest value in place
+            old_mean = self._mean
+            self._mean += (x - old) / self._n
+            self._m2 += (x - old) * (x - self._mean + old - old_mean)
+        else:
+            if math.isfinite(old):
+                self._remove(old)
+            if finite:
+                self._add(x)
+        self._buffer[slot] = x if finite else math.nan
+        self._count += 1
+        if self._count % self.resync == 0:
+            self._rebuild()
+
+    def _add(self, x):
+        self._n += 1
+        delta = x - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x):
+        if self._n == 1:
+            self._n, self._mean, self._m2 = 0, 0.0, 0.0
+            return
+        delta = x - self._mean
+        self._n -= 1
+        self._mean -= delta / self._n
+        self._m2 -= delta * (x - self._mean)
+
+    def _rebuild(self):
+        values = self._buffer[np.isfinite(self._buffer)]
+        self._n = len(values)
+        self._mean = float(values.mean()) if self._n else 0.0
+        self._m2 = float(((values - self._mean) ** 2).sum()) if self._n else 0.0
+
+    @property
+    def ready(self):
+        """
+        True once the window is full and every value in it is finite.
+        """
+        return self._n == self.window
+
+    @property
+    def mean(self):
+        return self._mean if self.ready else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(max(self._m2, 0.0) / (self.window - 1)) if self.ready else math.nan
+
+    def zscore(self, x):
+        """
+        Z-score of x against the window, NaN while the window isn't ready or
+        has no spread.
+        """
+        std = self.std
+        return (x - self._mean) / std if std > 0 else math.nan